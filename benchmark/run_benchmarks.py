@@ -0,0 +1,312 @@
+# Floyd Rose Tuner
+# Copyright (C) 2018  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks of the processors and of the applications on synthesized signals.
+
+Every benchmark is run at the default parameters, then sweeping one parameter at a time among
+fft resolution, peak precision, sample rate, buffer duration, processing rate, polyphony and zoom fft (only the parameters
+it depends on). The time of each chunk is measured and the results are saved as json:
+
+    python benchmark/run_benchmarks.py --output var/output/benchmark.json
+    python benchmark/run_benchmarks.py --compare var/output/benchmark.json --threshold 0.2
+
+With --compare, the benchmarks slower than the baseline by more than threshold are reported
+as regressions and the exit status is 1.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from audioprocessing.application.guitar_tuner import NotesTranscriber as GuitarTuner, LowLatencyTuner, \
+    SIX_STRINGS_GUITAR_BANDS
+from audioprocessing.application.notes_transcriber import NotesTranscriber
+from audioprocessing.application.song_analyzer import SongAnalyzer
+from audioprocessing.io.synthesizer import GeneratedSoundReader, SoundSynthesizer
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.band_peak_finder import BandPeakFinder
+from audioprocessing.processor.buffer import Buffer
+from audioprocessing.processor.envelope import EnvelopeProcessor
+from audioprocessing.processor.harmony_analyzer import HarmonyAnalyzer
+from audioprocessing.processor.note_tracker import NoteTracker
+from audioprocessing.processor.pitch_tracker import PitchTracker
+from audioprocessing.processor.spectrum_analyzer import SpectrumAnalyzer
+from audioprocessing.processor.spectrum_cache import SpectrumCache
+from audioprocessing.processor.yin import YinPitchDetector
+
+logger = logging.getLogger(__name__)
+
+BEAT = 120.0
+CHORD_VALUE = 1.0 / 4.0
+NOTES_POOL = [Pitch.parse(n) for n in "E2 A2 D3 G3 B3 E4 C3 F3 A3 C4 G4 D5".split()]
+
+DEFAULT_PARAMS = {
+    "fft_resolution_hz": None,  # default of each processor
+    "precision_cents": None,
+    "sample_rate": 44100,
+    "buffer_duration": 5.0,
+    "processing_rate": 8.0,
+    "polyphony": 3,
+    "use_zoom_fft": None,  # chosen by the band peak finder from the signal length
+}
+
+SWEEPS = {
+    "fft_resolution_hz": [0.1, 0.5, 2.0],
+    "precision_cents": [1.0],
+    "sample_rate": [22050, 48000],
+    "buffer_duration": [1.0, 20.0],
+    "processing_rate": [4.0, 16.0],
+    "polyphony": [1, 6],
+    "use_zoom_fft": [True, False],
+}
+
+DEFAULT_DURATION_S = 8.0
+DEFAULT_THRESHOLD = 0.2
+
+
+def synthesize(sample_rate, polyphony, duration):
+    """Chords of polyphony notes from NOTES_POOL, one every CHORD_VALUE
+    """
+    synthesizer = SoundSynthesizer(sample_rate, BEAT)
+    chord_duration = synthesizer.value_to_duration(CHORD_VALUE)
+    notes = []
+    for i in range(int(np.ceil(duration / chord_duration))):
+        for j in range(polyphony):
+            pitch = NOTES_POOL[(i + 5 * j) % len(NOTES_POOL)]
+            notes.append((i * chord_duration, 0.5 / polyphony, pitch.frequency, CHORD_VALUE))
+    return np.concatenate(list(synthesizer.create_oscillator_bank(notes).blocks()))
+
+
+def chunks(signal, sample_rate, processing_rate):
+    chunk_size = int(sample_rate / processing_rate)
+    return [signal[i:i + chunk_size] for i in range(0, len(signal) - chunk_size + 1, chunk_size)]
+
+
+def resolution_kwargs(params):
+    kwargs = {}
+    if params["fft_resolution_hz"] is not None:
+        kwargs["fft_resolution_hz"] = params["fft_resolution_hz"]
+    if params.get("precision_cents") is not None:
+        kwargs["precision_cents"] = params["precision_cents"]
+    return kwargs
+
+
+def time_chunks(process, inputs):
+    times = np.empty(len(inputs))
+    for i, chunk_inputs in enumerate(inputs):
+        start = time.perf_counter()
+        process(chunk_inputs)
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def bench_buffer(params, signal):
+    buffer = Buffer(params["sample_rate"], params["buffer_duration"])
+    return time_chunks(buffer.process, chunks(signal, params["sample_rate"], params["processing_rate"]))
+
+
+def bench_envelope(params, signal):
+    envelope_processor = EnvelopeProcessor(params["sample_rate"])
+    signal_chunks = chunks(signal, params["sample_rate"], params["processing_rate"])
+    return time_chunks(lambda chunk_inputs: envelope_processor.process(*chunk_inputs),
+                       [(chunk, i * len(chunk)) for i, chunk in enumerate(signal_chunks)])
+
+
+def bench_spectrum_analyzer(params, signal):
+    spectrum_analyzer = SpectrumAnalyzer(params["sample_rate"], **resolution_kwargs(params))
+    return time_chunks(lambda chunk: spectrum_analyzer.process(chunk, spectrum_cache=SpectrumCache()),
+                       chunks(signal, params["sample_rate"], params["processing_rate"]))
+
+
+def buffered_chunks(params, signal):
+    buffer = Buffer(params["sample_rate"], params["buffer_duration"])
+    return [buffer.process(chunk)["buffered_signal"].copy()
+            for chunk in chunks(signal, params["sample_rate"], params["processing_rate"])]
+
+
+def bench_band_peak_finder(params, signal):
+    band_peak_finder = BandPeakFinder(params["sample_rate"], bands=SIX_STRINGS_GUITAR_BANDS,
+                                      use_zoom_fft=params["use_zoom_fft"], **resolution_kwargs(params))
+    return time_chunks(lambda buffered: band_peak_finder.process(buffered, spectrum_cache=SpectrumCache()),
+                       buffered_chunks(params, signal))
+
+
+def bench_harmony_analyzer(params, signal):
+    harmony_analyzer = HarmonyAnalyzer(params["sample_rate"], **resolution_kwargs(params))
+    return time_chunks(lambda buffered: harmony_analyzer.process(buffered, spectrum_cache=SpectrumCache()),
+                       buffered_chunks(params, signal))
+
+
+def tracker_inputs(params, signal):
+    spectrum_analyzer = SpectrumAnalyzer(params["sample_rate"])
+    chunk_size = int(params["sample_rate"] / params["processing_rate"])
+    return [{"source_signal": chunk, "current_sample": i * chunk_size, "sample_rate": params["sample_rate"],
+             "pitches": spectrum_analyzer.process(chunk)["pitches"]}
+            for i, chunk in enumerate(chunks(signal, params["sample_rate"], params["processing_rate"]))]
+
+
+def bench_yin_pitch_detector(params, signal):
+    yin_pitch_detector = YinPitchDetector(params["sample_rate"])
+    return time_chunks(yin_pitch_detector.process, chunks(signal, params["sample_rate"], params["processing_rate"]))
+
+
+def bench_pitch_tracker(params, signal):
+    pitch_tracker = PitchTracker()
+    return time_chunks(lambda signals: pitch_tracker.process(**signals), tracker_inputs(params, signal))
+
+
+def bench_note_tracker(params, signal):
+    inputs = tracker_inputs(params, signal)
+    pitch_tracker = PitchTracker()
+    for signals in inputs:
+        signals.update(pitch_tracker.process(**signals))
+    note_tracker = NoteTracker(bpm=BEAT)
+    return time_chunks(lambda signals: note_tracker.process(**signals), inputs)
+
+
+def bench_application(application_cls):
+    def bench(params, signal):
+        audio_source = GeneratedSoundReader(params["sample_rate"], params["processing_rate"], BEAT, lambda _: signal)
+        application = application_cls(audio_source, update_output=lambda **other_signals: None)
+        times = []
+        with audio_source:
+            application._init()
+            while not audio_source.eos():
+                start = time.perf_counter()
+                application.run_once()
+                times.append(time.perf_counter() - start)
+        return np.array(times)
+    return bench
+
+
+# benchmark name -> (function, parameters it depends on)
+BENCHMARKS = {
+    "buffer": (bench_buffer, ["sample_rate", "buffer_duration", "processing_rate"]),
+    "envelope": (bench_envelope, ["sample_rate", "processing_rate"]),
+    "spectrum_analyzer": (bench_spectrum_analyzer,
+                          ["fft_resolution_hz", "precision_cents", "sample_rate", "processing_rate", "polyphony"]),
+    "band_peak_finder": (bench_band_peak_finder,
+                         ["fft_resolution_hz", "precision_cents", "sample_rate", "buffer_duration", "use_zoom_fft"]),
+    "harmony_analyzer": (bench_harmony_analyzer, ["fft_resolution_hz", "sample_rate", "buffer_duration"]),
+    "yin_pitch_detector": (bench_yin_pitch_detector, ["sample_rate", "processing_rate"]),
+    "pitch_tracker": (bench_pitch_tracker, ["processing_rate", "polyphony"]),
+    "note_tracker": (bench_note_tracker, ["sample_rate", "processing_rate", "polyphony"]),
+    "notes_transcriber": (bench_application(NotesTranscriber), ["sample_rate", "processing_rate", "polyphony"]),
+    "song_analyzer": (bench_application(SongAnalyzer), ["sample_rate", "processing_rate", "polyphony"]),
+    "guitar_tuner": (bench_application(GuitarTuner), ["sample_rate", "processing_rate", "polyphony"]),
+    "low_latency_tuner": (bench_application(LowLatencyTuner), ["sample_rate", "processing_rate"]),
+}
+
+
+def sweep(swept_params):
+    """The default parameters, then each swept parameter changed one at a time
+    """
+    yield dict(DEFAULT_PARAMS)
+    for name in swept_params:
+        for value in SWEEPS[name]:
+            yield dict(DEFAULT_PARAMS, **{name: value})
+
+
+def run_benchmarks(names, duration):
+    signals = {}
+    results = []
+    for name in names:
+        function, swept_params = BENCHMARKS[name]
+        for params in sweep(swept_params):
+            signal_key = (params["sample_rate"], params["polyphony"])
+            if signal_key not in signals:
+                signals[signal_key] = synthesize(params["sample_rate"], params["polyphony"], duration)
+            times = function(params, signals[signal_key])
+            chunk_duration = 1.0 / params["processing_rate"]
+            result = {
+                "benchmark": name,
+                "params": params,
+                "chunks": len(times),
+                "mean_s": float(np.mean(times)),
+                "median_s": float(np.median(times)),
+                "p90_s": float(np.percentile(times, 90)),
+                "max_s": float(np.max(times)),
+                "realtime_factor": chunk_duration / float(np.median(times)),
+            }
+            logger.info("%s %r median %.6f s, %.1fx real time",
+                        name, params, result["median_s"], result["realtime_factor"])
+            results.append(result)
+    return results
+
+
+def result_key(result):
+    return result["benchmark"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline_results, threshold):
+    """Returns the results slower than the baseline by more than threshold, with their baseline median
+    """
+    baseline = {result_key(r): r for r in baseline_results}
+    regressions = []
+    for result in results:
+        reference = baseline.get(result_key(result))
+        if reference is not None and result["median_s"] > reference["median_s"] * (1.0 + threshold):
+            regressions.append((result, reference["median_s"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the processors and the applications")
+    parser.add_argument("--output", help="json file for the results")
+    parser.add_argument("--compare", help="json file of a baseline run, to flag regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown of the median flagged as a regression")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_S, help="seconds of synthesized audio")
+    parser.add_argument("--benchmarks", nargs="*", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.benchmarks, args.duration)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "duration_s": args.duration,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info("results saved to %r", args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for result, baseline_median in regressions:
+            logger.warning("REGRESSION %s %r median %.6f s, baseline %.6f s", result["benchmark"], result["params"],
+                           result["median_s"], baseline_median)
+        if regressions:
+            return 1
+        logger.info("no regressions above %r", args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("audioprocessing").setLevel(logging.WARNING)
+    sys.exit(main())
@@ -15,17 +15,39 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import time
+import numpy as np
+
+from audioprocessing.application.graph import ProcessingGraph, consumed_signals
+from audioprocessing.processor.spectrum_cache import SpectrumCache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 32
+
 
 class SingleSourceApplication(object):
-    def __init__(self, audio_source, update_output, **_kvargs):
+    """Runs processors on the chunks of an audio source and passes the signals of each chunk to update_output.
+
+    Applications either override ``_run_once`` or set ``self.graph`` in ``_init`` with ``_create_graph``:
+    the processors needed by the signals consumed by update_output are then evaluated on demand.
+    The consumed signals are the named parameters of update_output, unless ``output_signals`` is given.
+
+    With ``metrics`` (an ApplicationMetrics) the source read, each processor of the graph and update_output
+    are timed, as well as each frame against its real time budget. Without it nothing is timed.
+    """
+
+    def __init__(self, audio_source, update_output, output_signals=None, metrics=None, **_kvargs):
         self.audio_source = audio_source
         self.update_output = update_output
+        self.output_signals = output_signals
+        self.metrics = metrics
+        self.graph = None
+        self.batch_processors = ()
         self.iteration = 0
         self.current_sample = 0
         self.t =0
+        self.spectrum_cache = SpectrumCache()
 
     def run(self):
         with self.audio_source:
@@ -33,28 +55,112 @@ class SingleSourceApplication(object):
             logger.info("Starting application")
             while not self.audio_source.eos():
                 self.run_once()
-        logger.info("Application completed after %d iterations", self.iteration)
+        self._log_completed()
+
+    def run_batch(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Runs the application offline, on an audio source able to read many chunks at once (read_frames).
+
+        The chunks are read ``batch_size`` at a time as a 2-D array: ``_run_batch`` processes all of them together,
+        e.g. with one batched fft, then ``_run_once_batched`` and ``update_output`` are called for each chunk.
+        """
+        with self.audio_source:
+            self._init()
+            logger.info("Starting application in batch mode, batch size %r", batch_size)
+            while not self.audio_source.eos():
+                self.run_batch_once(batch_size)
+        self._log_completed()
 
     def run_once(self):
-        signals = {
+        if self.metrics is not None:
+            return self._run_once_measured()
+        signals = self._new_frame_signals()
+        signals.update(self.audio_source.read())
+        self._run_once(signals)
+        self._complete_frame(signals)
+        return signals
+
+    def _run_once_measured(self):
+        start = time.perf_counter()
+        signals = self._new_frame_signals()
+        signals.update(self.audio_source.read())
+        t = self.metrics.record("read", start)
+        self._run_once(signals)
+        t = self.metrics.record("process", t)
+        budget = float(len(signals["source_signal"])) / float(self.audio_source.get_sample_rate())
+        self._complete_frame(signals)
+        end = self.metrics.record("update_output", t)
+        self.metrics.record_frame(start, budget, end)
+        return signals
+
+    def run_batch_once(self, batch_size=DEFAULT_BATCH_SIZE):
+        source_signal = self.audio_source.read_frames(batch_size)
+        n_frames, frame_size = source_signal.shape
+        batch_signals = {
+            "iteration": self.iteration + np.arange(n_frames),
+            "current_sample": self.current_sample + frame_size * np.arange(n_frames),
+            "source_signal": source_signal,
+            "sample_rate": self.audio_source.get_sample_rate(),
+        }
+        self._run_batch(batch_signals)
+        frame_keys = [k for k, v in batch_signals.items() if k not in ("iteration", "current_sample", "sample_rate")]
+        for i in range(n_frames):
+            signals = self._new_frame_signals()
+            signals["sample_rate"] = batch_signals["sample_rate"]
+            signals.update({k: batch_signals[k][i] for k in frame_keys})
+            self._run_once_batched(signals)
+            self._complete_frame(signals)
+
+    def _new_frame_signals(self):
+        self.spectrum_cache.clear()
+        return {
             "iteration": self.iteration,
             "current_sample": self.current_sample,
             "t": self.t,
+            "spectrum_cache": self.spectrum_cache,
         }
-        signals.update(self.audio_source.read())
-        samples_read = len(signals["source_signal"])
-        self._run_once(signals)
+
+    def _log_completed(self):
+        logger.info("Application completed after %d iterations", self.iteration)
+        logger.info("Spectrum cache stats %r", self.spectrum_cache.stats())
+        if self.metrics is not None:
+            logger.info("Metrics %r", self.metrics.snapshot())
+            if self.metrics.dump_filename is not None:
+                self.metrics.dump()
+
+    def _complete_frame(self, signals):
         self.update_output(**signals)
         self.iteration += 1
-        self.current_sample += samples_read
+        self.current_sample += len(signals["source_signal"])
         self.t = self.current_sample * self.audio_source.get_sample_rate()
-        return signals
 
     def _init(self):
         raise Exception("_init should be overridden")
 
+    def _create_graph(self, nodes):
+        output_signals = self.output_signals
+        if output_signals is None:
+            output_signals = consumed_signals(self.update_output)
+        return ProcessingGraph(nodes, output_signals, metrics=self.metrics)
+
     def _run_once(self, signals):
-        raise Exception("_run_once should be overridden")
+        if self.graph is None:
+            raise Exception("_run_once should be overridden, or a graph created in _init")
+        self.graph.evaluate(signals)
+
+    def _run_batch(self, signals):
+        """Processes many chunks at once, signals values have one item per chunk, e.g. source_signal is 2-D.
+
+        The signals added to the dictionary must have one item per chunk as well. The processors run here must be
+        listed in ``self.batch_processors``: the graph does not run them again for each chunk, even when their outputs
+        are consumed, e.g. by an update_output taking only ``**kwargs``.
+        """
+        raise Exception("_run_batch should be overridden to run in batch mode")
+
+    def _run_once_batched(self, signals):
+        """Completes the processing of one chunk after _run_batch, e.g. running the stateful processors
+        """
+        if self.graph is not None:
+            self.graph.evaluate(signals, skipped=self.batch_processors)
 
     @staticmethod
     def remap(d, mapping):
@@ -0,0 +1,179 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Analyzes many wav files in parallel, writing one json line per file.
+
+Usage example::
+
+    python -m audioprocessing.application.batch_transcriber --application notes --workers 4 \\
+        --output notes.jsonl "recordings/*.wav" more_recordings/
+"""
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from audioprocessing.application.notes_transcriber import NotesTranscriber
+from audioprocessing.application.song_analyzer import SongAnalyzer
+from audioprocessing.application import guitar_tuner
+from audioprocessing.io.wav_file import WavFileReader, DEFAULT_PROCESSING_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_APPLICATION = "notes"
+
+
+def notes_collector(results):
+    def collect(notes, **other_signals):
+        results.extend({
+            "pitch": "{}{}".format(n.pitch.note, n.pitch.octave),
+            "frequency": float(n.pitch.frequency),
+            "start_s": n.start_s,
+            "end_s": n.end_s,
+            "value": n.value,
+        } for n in notes)
+    return collect
+
+
+def harmony_collector(results):
+    def collect(powerful_semitones, current_sample, sample_rate, **other_signals):
+        if len(powerful_semitones) > 0:
+            results.append({
+                "start_s": float(current_sample) / float(sample_rate),
+                "semitones": [p.note for p in powerful_semitones],
+            })
+    return collect
+
+
+def tuner_collector(results):
+    def collect(sounds_split_points, bands_peak, sample_rate, **other_signals):
+        for i, (start, end) in enumerate(sounds_split_points):
+            # bands_peak is found only on split_sound, the last sound of the chunk
+            last_sound = i == len(sounds_split_points) - 1
+            results.append({
+                "start_s": float(start) / float(sample_rate),
+                "end_s": float(end) / float(sample_rate),
+                "bands_peak": [None if p is None else float(p) for p in bands_peak] if last_sound else None,
+            })
+    return collect
+
+
+#: Application class and output collector, by application name
+APPLICATIONS = {
+    "notes": (NotesTranscriber, notes_collector),
+    "harmony": (SongAnalyzer, harmony_collector),
+    "tuner": (guitar_tuner.NotesTranscriber, tuner_collector),
+}
+
+
+def find_wav_files(paths):
+    """Expands directories (searched recursively) and glob patterns into a sorted list of wav files
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, "**", "*.wav"), recursive=True))
+        else:
+            files.update(f for f in glob.glob(path) if os.path.isfile(f))
+    return sorted(files)
+
+
+def analyze_file(filename, application=DEFAULT_APPLICATION, processing_rate=DEFAULT_PROCESSING_RATE):
+    """Runs the application on the file in batch mode, returning a json serializable dictionary.
+
+    Exceptions are reported in the "error" field, so that a failure does not stop the other files.
+    """
+    start_time = time.time()
+    result = {"file": filename, "application": application}
+    try:
+        application_cls, collector = APPLICATIONS[application]
+        outputs = []
+        audio_source = WavFileReader(filename, processing_rate=processing_rate)
+        app = application_cls(audio_source, update_output=collector(outputs))
+        app.run_batch()
+        result["duration_s"] = float(app.current_sample) / float(audio_source.get_sample_rate())
+        result["results"] = outputs
+    except Exception as e:
+        logger.warning("Failed analyzing %r: %r", filename, e)
+        result["error"] = repr(e)
+    result["processing_s"] = time.time() - start_time
+    return result
+
+
+def _analyze_file_args(args):
+    return analyze_file(*args)
+
+
+def analyze_files(filenames, output, application=DEFAULT_APPLICATION, processing_rate=DEFAULT_PROCESSING_RATE,
+                  workers=None):
+    """Analyzes the files with a pool of worker processes, writing each result to output as soon as it is ready.
+
+    :return: a dictionary with the number of files, failures, seconds of audio and wall seconds
+    """
+    start_time = time.time()
+    stats = {"files": 0, "failures": 0, "duration_s": 0.0}
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(_analyze_file_args,
+                                          [(f, application, processing_rate) for f in filenames]):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            stats["files"] += 1
+            if "error" in result:
+                stats["failures"] += 1
+            else:
+                stats["duration_s"] += result["duration_s"]
+                logger.info("%r: %.1f s of audio in %.1f s", result["file"], result["duration_s"],
+                            result["processing_s"])
+    finally:
+        pool.close()
+        pool.join()
+    stats["wall_s"] = time.time() - start_time
+    stats["throughput"] = stats["duration_s"] / stats["wall_s"] if stats["wall_s"] > 0 else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyzes many wav files in parallel, writing json lines")
+    parser.add_argument("paths", nargs="+", help="wav files, directories or glob patterns")
+    parser.add_argument("--application", choices=sorted(APPLICATIONS), default=DEFAULT_APPLICATION)
+    parser.add_argument("--output", default="-", help="output jsonl file, - for the standard output")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the cpu count")
+    parser.add_argument("--processing-rate", type=float, default=DEFAULT_PROCESSING_RATE)
+    args = parser.parse_args(argv)
+
+    filenames = find_wav_files(args.paths)
+    logger.info("Analyzing %d files with %r", len(filenames), args.application)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        stats = analyze_files(filenames, output, args.application, args.processing_rate, args.workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    logger.info("Analyzed %d files (%d failed), %.1f s of audio in %.1f s: %.1f s of audio per second",
+                stats["files"], stats["failures"], stats["duration_s"], stats["wall_s"], stats["throughput"])
+    return 1 if stats["failures"] > 0 else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessorNode(object):
+    """A processor in a ProcessingGraph.
+
+    The inputs are the parameters of ``processor.process``: the ones without a default value are required,
+    the others are passed only when available. ``inputs`` maps parameter names to the names of the signals
+    bound to them, replacing ``SingleSourceApplication.remap``. The outputs are the ``OUTPUTS`` declared
+    by the processor class, unless given. With ``method`` None the processor is a function called directly.
+    """
+
+    def __init__(self, processor, inputs=None, outputs=None, method="process", name=None):
+        self.processor = processor
+        self.function = processor if method is None else getattr(processor, method)
+        self.name = name or getattr(self.function, "__qualname__", repr(self.function))
+        bindings = inputs or {}
+        self.required_inputs = []
+        self.optional_inputs = []
+        for parameter in inspect.signature(self.function).parameters.values():
+            if parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                continue
+            binding = (parameter.name, bindings.get(parameter.name, parameter.name))
+            if parameter.default is inspect.Parameter.empty:
+                self.required_inputs.append(binding)
+            else:
+                self.optional_inputs.append(binding)
+        self.outputs = tuple(outputs if outputs is not None else getattr(processor, "OUTPUTS"))
+
+    def input_signals(self):
+        return [signal for _, signal in self.required_inputs + self.optional_inputs]
+
+    def evaluate(self, signals):
+        kwargs = {}
+        for parameter, signal in self.required_inputs:
+            if signal not in signals:
+                raise ValueError("{} requires signal {!r}, not available".format(self.name, signal))
+            kwargs[parameter] = signals[signal]
+        for parameter, signal in self.optional_inputs:
+            if signal in signals:
+                kwargs[parameter] = signals[signal]
+        signals.update(self.function(**kwargs))
+
+    def __repr__(self):
+        return "ProcessorNode({})".format(self.name)
+
+
+class ProcessingGraph(object):
+    """Evaluates the processors needed by the output signals, each one after the processors it depends on.
+
+    Evaluation is demand driven: a signal already in the frame signals, e.g. the source or the output
+    of a batch, is not computed again, and the processors whose outputs are not needed are not called at all.
+    Stateful processors, e.g. trackers, must then be needed by every frame to see all of them.
+    ``output_signals`` None means that every output is needed.
+    The processors given as ``skipped`` to ``evaluate`` are not called, e.g. the ones already run on a whole batch.
+    With ``metrics`` the latency of each processor is recorded, with the node name as stage.
+    """
+
+    def __init__(self, nodes, output_signals=None, metrics=None):
+        self.nodes = list(nodes)
+        self.metrics = metrics
+        self.producers = {}
+        for node in self.nodes:
+            for signal in node.outputs:
+                if signal in self.producers:
+                    raise ValueError("signal {!r} produced by both {} and {}".format(
+                        signal, self.producers[signal].name, node.name))
+                self.producers[signal] = node
+        if output_signals is None:
+            output_signals = [signal for node in self.nodes for signal in node.outputs]
+        self.output_signals = list(output_signals)
+
+    def evaluate(self, signals, skipped=()):
+        """Computes the missing output signals in place in signals, without calling the skipped processors
+        """
+        evaluated = set(id(node) for node in self.nodes if any(node.processor is p for p in skipped))
+        for signal in self.output_signals:
+            self._demand(signal, signals, evaluated, ())
+        return signals
+
+    def _demand(self, signal, signals, evaluated, path):
+        if signal in signals:
+            return
+        node = self.producers.get(signal)
+        if node is None or id(node) in evaluated:
+            return
+        if node in path:
+            raise ValueError("cycle in processing graph: {}".format(path + (node,)))
+        for input_signal in node.input_signals():
+            self._demand(input_signal, signals, evaluated, path + (node,))
+        if self.metrics is None:
+            node.evaluate(signals)
+        else:
+            start = time.perf_counter()
+            node.evaluate(signals)
+            self.metrics.record(node.name, start)
+        evaluated.add(id(node))
+
+
+def consumed_signals(update_output):
+    """Returns the signals named by the parameters of update_output, None if it consumes all of them
+    """
+    parameters = [p for p in inspect.signature(update_output).parameters.values()
+                  if p.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)]
+    if len(parameters) == 0:
+        return None
+    return [p.name for p in parameters]
@@ -15,13 +15,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import numpy as np
 
-from audioprocessing.model.pitch import Pitch
-from audioprocessing.application.application import SingleSourceApplication
+from audioprocessing.model.pitch import Pitch, PitchArray
+from audioprocessing.application.application import SingleSourceApplication, DEFAULT_BATCH_SIZE
+from audioprocessing.application.graph import ProcessorNode
 from audioprocessing.processor.band_peak_finder import BandPeakFinder
 from audioprocessing.processor.buffer import Buffer
+from audioprocessing.processor.envelope import EnvelopeProcessor
 from audioprocessing.processor.rms_processor import RmsProcessor
 from audioprocessing.processor.sound_splitter import SoundSplitter
+from audioprocessing.processor.yin import YinPitchDetector
 
 
 logger = logging.getLogger(__name__)
@@ -37,6 +41,16 @@ SIX_STRINGS_GUITAR_STANDARD_TUNING = [
 
 BAND_SIZE = 1.5
 
+SIX_STRINGS_GUITAR_STANDARD_TUNING_OFFSETS = PitchArray([p.frequency for p in SIX_STRINGS_GUITAR_STANDARD_TUNING]).offset_from_c0
+
+HEXAPHONIC_BUFFER_DURATION = 1.0
+HEXAPHONIC_MIN_RMS = 0.005
+
+# the yin detector needs two periods of the lowest string, a bit more than 25 ms for E2
+LOW_LATENCY_PROCESSING_RATE = 50.0
+LOW_LATENCY_MIN_FREQ = SIX_STRINGS_GUITAR_STANDARD_TUNING[0].add_semitones(-2 * BAND_SIZE).frequency
+LOW_LATENCY_MAX_FREQ = SIX_STRINGS_GUITAR_STANDARD_TUNING[-1].add_semitones(2 * BAND_SIZE).frequency
+
 SIX_STRINGS_GUITAR_BANDS = [(p.add_semitones(-BAND_SIZE).frequency, p.add_semitones(BAND_SIZE).frequency)
                             for p in SIX_STRINGS_GUITAR_STANDARD_TUNING]
 
@@ -45,34 +59,127 @@ def update_console_output(split_sound, bands_peak, **other_signals):
     if len(split_sound) > 0:
         if len(bands_peak) > 0 and len([p for p in bands_peak if p is None]) == 0:
             logger.info("found sound of length %r having band picks %r", len(split_sound), bands_peak)
+            actual_pitches = PitchArray(bands_peak)
+            errors_in_semitones = actual_pitches.offset_from_c0 - SIX_STRINGS_GUITAR_STANDARD_TUNING_OFFSETS
             for i in range(len(bands_peak)):
-                expected_pitch = SIX_STRINGS_GUITAR_STANDARD_TUNING[i]
-                actual_pitch = Pitch(bands_peak[i])
-                error_in_semitones = actual_pitch.offset_from_c0 - expected_pitch.offset_from_c0
-                logging.info("String %r - error = %r semitones, found %r", i, error_in_semitones, actual_pitch)
+                logging.info("String %r - error = %r semitones, found %r", i, errors_in_semitones[i], actual_pitches[i])
         else:
             logging.warning("Could not detect all the strings")
 
 
+def update_hexaphonic_console_output(strings_peak, **other_signals):
+    for i, peak in enumerate(strings_peak):
+        if peak is not None:
+            error_in_semitones = Pitch(peak).offset_from_c0 - SIX_STRINGS_GUITAR_STANDARD_TUNING_OFFSETS[i]
+            logging.info("String %r - error = %r semitones, found %r", i, error_in_semitones, peak)
+
+
+def update_low_latency_console_output(yin_frequency, **other_signals):
+    if not np.isnan(yin_frequency):
+        string_idx, error_in_semitones = nearest_string(yin_frequency)
+        logging.info("String %r - error = %r semitones, found %r", string_idx, error_in_semitones, yin_frequency)
+
+
+def nearest_string(frequency):
+    """Returns the index of the string whose standard tuning is the nearest to frequency, and the error in semitones
+    """
+    errors_in_semitones = Pitch(frequency).offset_from_c0 - SIX_STRINGS_GUITAR_STANDARD_TUNING_OFFSETS
+    string_idx = int(np.argmin(np.abs(errors_in_semitones)))
+    return string_idx, errors_in_semitones[string_idx]
+
+
 class NotesTranscriber(SingleSourceApplication):
     def __init__(self, audio_source, update_output=update_console_output, **kvargs):
         super().__init__(audio_source, update_output, **kvargs)
 
     def _init(self):
         self.rms_processor = RmsProcessor()
+        self.envelope_processor = EnvelopeProcessor(self.audio_source.get_sample_rate())
         self.sound_splitter = SoundSplitter()
         self.band_peak_finder = BandPeakFinder(self.audio_source.get_sample_rate(), bands=SIX_STRINGS_GUITAR_BANDS)
         self.buffer = Buffer(self.audio_source.get_sample_rate(), buffer_duration=20.0)
+        self.graph = self._create_graph([
+            ProcessorNode(self.buffer),
+            ProcessorNode(self.rms_processor),
+            ProcessorNode(self.envelope_processor),
+            ProcessorNode(self.sound_splitter),
+            ProcessorNode(self.band_peak_finder, inputs={"source_signal": "split_sound"}),
+        ])
+        self.batch_processors = (self.buffer, self.envelope_processor, self.rms_processor, self.sound_splitter)
+
+    def run_batch_once(self, batch_size=DEFAULT_BATCH_SIZE):
+        # the split sounds are sliced from the buffered batch, so the whole batch must fit in the buffer
+        max_batch_size = max(1, self.buffer.buffer_len // self.audio_source.chunk_size)
+        if batch_size > max_batch_size:
+            logger.debug("batch size %r reduced to %r to fit in the buffer", batch_size, max_batch_size)
+        super().run_batch_once(min(batch_size, max_batch_size))
+
+    def _run_batch(self, signals):
+        # the whole batch is buffered at once, the split sounds are sliced from the buffer
+        buffered = self.buffer.process(source_signal=np.reshape(signals["source_signal"], -1))
+        # the envelope covers the whole batch, it is passed to the splitter only
+        envelope = self.envelope_processor.process_batch(**signals)
+        signals.update(self.rms_processor.process_batch(**signals))
+        signals.update(self.sound_splitter.process_batch(**dict(signals, **buffered, **envelope)))
+
+
+class HexaphonicTuner(SingleSourceApplication):
+    """Tunes the six strings at once from a hexaphonic pickup, channel i being string i.
+
+    All the channels go through the same buffer, rms and band peak finder, with batched transforms.
+    ``strings_peak`` has the peak of the band of each string, None if the string is not playing.
+    """
 
-    def _run_once(self, signals):
-        signals.update(self.buffer.process(**signals))
-        signals.update(self.rms_processor.process(**signals))
-        signals.update(self.sound_splitter.process(**signals))
-        signals.update(self.band_peak_finder.process(**self.remap(signals, {"source_signal": "split_sound"})))
+    def __init__(self, audio_source, update_output=update_hexaphonic_console_output,
+                 buffer_duration=HEXAPHONIC_BUFFER_DURATION, min_rms=HEXAPHONIC_MIN_RMS, **kvargs):
+        self.buffer_duration = buffer_duration
+        self.min_rms = min_rms
+        super().__init__(audio_source, update_output, **kvargs)
+
+    def _init(self):
+        self.rms_processor = RmsProcessor()
+        self.band_peak_finder = BandPeakFinder(self.audio_source.get_sample_rate(), bands=SIX_STRINGS_GUITAR_BANDS)
+        self.buffer = Buffer(self.audio_source.get_sample_rate(), buffer_duration=self.buffer_duration)
+        self.graph = self._create_graph([
+            ProcessorNode(self.buffer, inputs={"source_signal": "source_signal_all_channels"}),
+            ProcessorNode(self.rms_processor, inputs={"source_signal": "source_signal_all_channels"}),
+            ProcessorNode(self.band_peak_finder, inputs={"source_signal": "buffered_signal"}),
+            ProcessorNode(self.strings_peak, method=None, outputs=("strings_peak",)),
+        ])
+
+    def strings_peak(self, bands_peak, rms):
+        return {
+            "strings_peak": [peaks[i] if i < len(peaks) and channel_rms >= self.min_rms else None
+                             for i, (peaks, channel_rms) in enumerate(zip(bands_peak, rms))]
+        }
+
+
+class LowLatencyTuner(SingleSourceApplication):
+    """Tunes one string at a time, from the last few periods of the signal instead of the whole split sound.
+
+    The fundamental is found in the time domain by a YinPitchDetector, so the first update comes a frame or two
+    after the string is plucked and then one per frame while it rings.
+    """
+
+    def __init__(self, audio_source, update_output=update_low_latency_console_output, **kvargs):
+        super().__init__(audio_source, update_output, **kvargs)
+
+    def _init(self):
+        self.pitch_detector = YinPitchDetector(self.audio_source.get_sample_rate(),
+                                               min_freq=LOW_LATENCY_MIN_FREQ, max_freq=LOW_LATENCY_MAX_FREQ)
+        self.graph = self._create_graph([
+            ProcessorNode(self.pitch_detector),
+        ])
 
 
 if __name__ == '__main__':
+    import sys
     from audioprocessing.io.sound_card import SoundCard
     logging.basicConfig(level=logging.INFO)
-    audio_source = SoundCard(processing_rate=10.0)
-    NotesTranscriber(audio_source).run()
+    if "--hexaphonic" in sys.argv:
+        HexaphonicTuner(SoundCard(processing_rate=10.0, channels=len(SIX_STRINGS_GUITAR_STANDARD_TUNING))).run()
+    elif "--low-latency" in sys.argv:
+        LowLatencyTuner(SoundCard(processing_rate=LOW_LATENCY_PROCESSING_RATE)).run()
+    else:
+        audio_source = SoundCard(processing_rate=10.0)
+        NotesTranscriber(audio_source).run()
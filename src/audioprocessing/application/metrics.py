@@ -0,0 +1,132 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import json
+import logging
+import os
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_LATENCY_S = 1e-6
+DEFAULT_MAX_LATENCY_S = 10.0
+DEFAULT_BINS_PER_OCTAVE = 4
+DEFAULT_DUMP_INTERVAL_S = 10.0
+
+
+class LatencyHistogram(object):
+    """Histogram of latencies on logarithmic bins, recording costs a bisection and an increment.
+
+    The percentiles are the upper edges of the bins, e.g. within 19% with 4 bins per octave.
+    """
+
+    def __init__(self, min_latency=DEFAULT_MIN_LATENCY_S, max_latency=DEFAULT_MAX_LATENCY_S,
+                 bins_per_octave=DEFAULT_BINS_PER_OCTAVE):
+        n_bins = int(np.ceil(np.log2(max_latency / min_latency) * bins_per_octave))
+        self.edges = (min_latency * 2.0 ** (np.arange(n_bins + 1) / float(bins_per_octave))).tolist()
+        # one more bin below and above the edges
+        self.counts = np.zeros(n_bins + 2, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency):
+        self.counts[bisect.bisect_left(self.edges, latency)] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0.0
+        idx = int(np.searchsorted(np.cumsum(self.counts), q / 100.0 * self.count))
+        if idx >= len(self.edges):
+            return self.max
+        return min(self.edges[idx], self.max)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class ApplicationMetrics(object):
+    """Latencies of the stages of an application and usage of the real time budget.
+
+    The budget of a frame is the duration of its chunk: the frames taking longer are deadline misses,
+    after which a sound card overflows sooner or later. With ``dump_filename`` a snapshot is written
+    as json every ``dump_interval`` seconds and when the application completes.
+    """
+
+    def __init__(self, dump_filename=None, dump_interval=DEFAULT_DUMP_INTERVAL_S):
+        self.dump_filename = dump_filename
+        self.dump_interval = dump_interval
+        self.stages = {}
+        self.budget_fraction = LatencyHistogram(min_latency=1e-4, max_latency=100.0)
+        self.frames = 0
+        self.deadline_misses = 0
+        self.max_budget_fraction = 0.0
+        self.last_dump = time.perf_counter()
+
+    def record(self, stage, start, end=None):
+        """Records the latency of stage from start to end (default now), times from time.perf_counter
+        """
+        if end is None:
+            end = time.perf_counter()
+        if stage not in self.stages:
+            self.stages[stage] = LatencyHistogram()
+        self.stages[stage].record(end - start)
+        return end
+
+    def record_frame(self, start, budget, end=None):
+        """Records a whole frame started at start, having budget seconds of real time
+        """
+        end = self.record("frame", start, end)
+        fraction = (end - start) / budget if budget > 0 else 0.0
+        self.budget_fraction.record(fraction)
+        self.max_budget_fraction = max(self.max_budget_fraction, fraction)
+        self.frames += 1
+        if fraction > 1.0:
+            self.deadline_misses += 1
+        if self.dump_filename is not None and end - self.last_dump >= self.dump_interval:
+            self.dump()
+        return end
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "deadline_misses": self.deadline_misses,
+            "budget_fraction": dict(self.budget_fraction.to_dict(), max=self.max_budget_fraction),
+            "stages": {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+        }
+
+    def dump(self, filename=None):
+        filename = filename or self.dump_filename
+        self.last_dump = time.perf_counter()
+        # replaced at once, a reader never sees a partial file
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_filename, filename)
+        logger.debug("metrics dumped to %r", filename)
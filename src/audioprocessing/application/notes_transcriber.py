@@ -16,10 +16,10 @@
 
 import logging
 from audioprocessing.application.application import SingleSourceApplication
+from audioprocessing.application.graph import ProcessorNode
 from audioprocessing.processor.spectrum_analyzer import SpectrumAnalyzer
 from audioprocessing.processor.pitch_tracker import PitchTracker
 from audioprocessing.processor.note_tracker import NoteTracker
-from audioprocessing.processor.buffer import Buffer
 
 
 logger = logging.getLogger(__name__)
@@ -38,16 +38,22 @@ class NotesTranscriber(SingleSourceApplication):
     def _init(self):
         self.spectrum_analyzer = SpectrumAnalyzer(self.audio_source.get_sample_rate())
         self.pitch_tracker = PitchTracker()
-        self.buffer = Buffer(self.audio_source.get_sample_rate(), buffer_duration=20.0)
         self.note_tracker = NoteTracker()
-
-    def _run_once(self, signals):
-        signals.update(self.buffer.process(**signals))
-        signals.update(self.spectrum_analyzer.process(**signals))
+        pitches = "pitches"
+        nodes = [ProcessorNode(self.spectrum_analyzer)]
         if self.monophonic:
-            signals["pitches"] = signals["pitches"][0:1]
-        signals.update(self.pitch_tracker.process(**signals))
-        signals.update(self.note_tracker.process(**signals))
+            pitches = "monophonic_pitches"
+            nodes.append(ProcessorNode(lambda pitches: {"monophonic_pitches": pitches[0:1]},
+                                       method=None, outputs=("monophonic_pitches",), name="monophonic"))
+        nodes += [
+            ProcessorNode(self.pitch_tracker, inputs={"pitches": pitches}),
+            ProcessorNode(self.note_tracker),
+        ]
+        self.graph = self._create_graph(nodes)
+        self.batch_processors = (self.spectrum_analyzer,)
+
+    def _run_batch(self, signals):
+        signals.update(self.spectrum_analyzer.process_batch(**signals))
 
 
 if __name__ == '__main__':
@@ -18,6 +18,7 @@ import logging
 
 from audioprocessing.model.pitch import Pitch
 from audioprocessing.application.application import SingleSourceApplication
+from audioprocessing.application.graph import ProcessorNode
 from audioprocessing.processor.harmony_analyzer import HarmonyAnalyzer
 from audioprocessing.processor.buffer import Buffer
 
@@ -42,10 +43,14 @@ class SongAnalyzer(SingleSourceApplication):
     def _init(self):
         self.buffer = Buffer(self.audio_source.get_sample_rate(), buffer_duration=20.0)
         self.harmony_analyzer = HarmonyAnalyzer(self.audio_source.get_sample_rate())
-
-    def _run_once(self, signals):
-        signals.update(self.buffer.process(**signals))
-        signals.update(self.harmony_analyzer.process(**signals))
+        self.graph = self._create_graph([
+            ProcessorNode(self.buffer),
+            ProcessorNode(self.harmony_analyzer),
+        ])
+        self.batch_processors = (self.harmony_analyzer,)
+
+    def _run_batch(self, signals):
+        signals.update(self.harmony_analyzer.process_batch(**signals))
 
 
 if __name__ == '__main__':
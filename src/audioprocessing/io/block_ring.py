@@ -0,0 +1,70 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+class BlockRing(object):
+    """Single producer single consumer queue of fixed size blocks, preallocated in a ring.
+
+    It hands blocks over from a real time thread, e.g. the sound card callback, without locks and without
+    allocations: the write count is only changed by the producer and the read count only by the consumer,
+    and a slot is released only after its block has been copied. When the ring is full the new block
+    is dropped and counted, the producer never waits for the consumer.
+    """
+
+    def __init__(self, n_blocks, block_shape, dtype=np.float32):
+        self.n_blocks = n_blocks
+        self._blocks = np.zeros((n_blocks,) + tuple(np.atleast_1d(block_shape)), dtype=dtype)
+        self._write_count = 0
+        self._read_count = 0
+        self.dropped_blocks = 0
+
+    @property
+    def block_shape(self):
+        return self._blocks.shape[1:]
+
+    def depth(self):
+        """Number of blocks waiting to be read
+        """
+        return self._write_count - self._read_count
+
+    def put(self, block):
+        """Copies the block in the ring, returns False if the ring is full and the block has been dropped
+        """
+        if self.depth() >= self.n_blocks:
+            self.dropped_blocks += 1
+            return False
+        self._blocks[self._write_count % self.n_blocks] = block
+        self._write_count += 1
+        return True
+
+    def get_into(self, out):
+        """Copies the oldest block into out, returns False if the ring is empty
+        """
+        if self.depth() <= 0:
+            return False
+        out[...] = self._blocks[self._read_count % self.n_blocks]
+        self._read_count += 1
+        return True
+
+    def get(self):
+        """Returns a copy of the oldest block, None if the ring is empty
+        """
+        block = np.empty(self.block_shape, dtype=self._blocks.dtype)
+        if not self.get_into(block):
+            return None
+        return block
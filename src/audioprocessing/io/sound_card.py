@@ -15,25 +15,60 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import time
 import sounddevice as sd
 import numpy as np
 
+from audioprocessing.io.block_ring import BlockRing
+
 logger = logging.getLogger(__name__)
 
 
 DEFAULT_SAMPLE_RATE = 44100
 DEFAULT_AUDIO_FORMAT = np.float32
 DEFAULT_PROCESSING_RATE = 8.0
+DEFAULT_CHANNELS = 1
+DEFAULT_USE_CALLBACK = False
+DEFAULT_RING_BLOCKS = 32
+DEFAULT_OUTPUT_PREFILL_BLOCKS = 2
 
 
 class SoundCard(object):
+    """Reads and writes the sound card in chunks.
+
+    ``source_signal`` is the first input channel, ``source_signal_all_channels`` has all the input channels
+    as a (channels x samples) array, the layout accepted by the multi channel processors.
+
+    With ``use_callback`` the stream is driven by the sounddevice callback, in its own thread. Each input
+    chunk is copied in a preallocated ring of blocks, so capturing never waits for the analysis: ``read``
+    returns the oldest captured chunk, waiting only when none is ready, ``try_read`` never waits.
+    ``write`` queues the output in another ring, played once ``output_prefill_blocks`` are queued so that
+    the jitter of the processing loop does not underflow the output. ``stats`` returns the counters
+    of overflows, underflows, queue depth and dropped blocks.
+    """
+
     def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, audio_format=DEFAULT_AUDIO_FORMAT,
-                 processing_rate=DEFAULT_PROCESSING_RATE):
+                 processing_rate=DEFAULT_PROCESSING_RATE, channels=DEFAULT_CHANNELS,
+                 use_callback=DEFAULT_USE_CALLBACK, ring_blocks=DEFAULT_RING_BLOCKS,
+                 output_prefill_blocks=DEFAULT_OUTPUT_PREFILL_BLOCKS):
         self.sample_rate = sample_rate
         self.audio_format = audio_format
+        self.channels = channels
         self.chunk_size = int(sample_rate / processing_rate)
         self.processing_rate = float(sample_rate) / float(self.chunk_size)
-        self.stream = sd.Stream(channels=1, dtype=audio_format, samplerate=sample_rate)
+        self.use_callback = use_callback
+        self.output_prefill_blocks = output_prefill_blocks
+        self.input_overflows = 0
+        self.output_underflows = 0
+        if use_callback:
+            self.input_ring = BlockRing(ring_blocks, (channels, self.chunk_size), audio_format)
+            self.output_ring = BlockRing(ring_blocks, self.chunk_size, audio_format)
+            self._output_pending = np.zeros(0, dtype=audio_format)
+            self._output_started = False
+            self.stream = sd.Stream(channels=(channels, 1), dtype=audio_format, samplerate=sample_rate,
+                                    blocksize=self.chunk_size, callback=self._callback)
+        else:
+            self.stream = sd.Stream(channels=(channels, 1), dtype=audio_format, samplerate=sample_rate)
         self.is_open = False
 
     def eos(self):
@@ -43,8 +78,8 @@ class SoundCard(object):
         return self.sample_rate
 
     def __enter__(self):
-        logger.info("Opening sound card for I/O. Chunk size %r, expected processing rate %r",
-                    self.chunk_size, self.processing_rate)
+        logger.info("Opening sound card for I/O. Chunk size %r, expected processing rate %r, callback mode %r",
+                    self.chunk_size, self.processing_rate, self.use_callback)
         self.stream.__enter__()
         self.is_open = True
         return self
@@ -52,20 +87,79 @@ class SoundCard(object):
     def __exit__(self, *args):
         self.is_open = False
         self.stream.__exit__(*args)
-        logger.info("Sound card closed")
+        logger.info("Sound card closed, stats %r", self.stats())
 
     def read(self):
+        if self.use_callback:
+            signals = self.try_read()
+            while signals is None:
+                # only the processing loop waits, the capture thread goes on
+                time.sleep(0.25 / self.processing_rate)
+                signals = self.try_read()
+            return signals
         input_data, overflowed = self.stream.read(self.chunk_size)
-        first_channel = input_data[:, 0]
         if overflowed:
+            self.input_overflows += 1
             logger.warning("Overflowed while reading from sound card (%r)", overflowed)
-        return {
-            "sample_rate": self.sample_rate,
-            "source_signal": first_channel,
-            "source_signal_all_channels": input_data,
-        }
+        return self._signals(input_data.T)
+
+    def try_read(self):
+        """Returns the oldest captured chunk in callback mode, None if no chunk is ready
+        """
+        all_channels = self.input_ring.get()
+        if all_channels is None:
+            return None
+        return self._signals(all_channels)
 
     def write(self, data):
+        if self.use_callback:
+            data = np.concatenate([self._output_pending, data])
+            n_blocks = len(data) // self.chunk_size
+            for i in range(n_blocks):
+                self.output_ring.put(data[i * self.chunk_size:(i + 1) * self.chunk_size])
+            self._output_pending = data[n_blocks * self.chunk_size:]
+            return
         underflowed = self.stream.write(data)
         if underflowed:
+            self.output_underflows += 1
             logger.warning("Underflowed while writing to sound card (%r)", underflowed)
+
+    def output_queue_depth(self):
+        """Number of output blocks waiting to be played in callback mode
+        """
+        return self.output_ring.depth() if self.use_callback else 0
+
+    def stats(self):
+        stats = {
+            "input_overflows": self.input_overflows,
+            "output_underflows": self.output_underflows,
+        }
+        if self.use_callback:
+            stats.update({
+                "queue_depth": self.input_ring.depth(),
+                "dropped_blocks": self.input_ring.dropped_blocks,
+                "output_queue_depth": self.output_ring.depth(),
+                "output_dropped_blocks": self.output_ring.dropped_blocks,
+            })
+        return stats
+
+    def _signals(self, all_channels):
+        return {
+            "sample_rate": self.sample_rate,
+            "source_signal": all_channels[0],
+            "source_signal_all_channels": all_channels,
+        }
+
+    def _callback(self, indata, outdata, frames, time_info, status):
+        # runs in the audio thread: no logging, no locks, no allocations
+        if status.input_overflow:
+            self.input_overflows += 1
+        self.input_ring.put(indata.T)
+        if not self._output_started and self.output_ring.depth() >= self.output_prefill_blocks:
+            self._output_started = True
+        if not (self._output_started and self.output_ring.get_into(outdata[:, 0])):
+            if self._output_started:
+                # counted only once the output has started, then the output is prefilled again
+                self.output_underflows += 1
+                self._output_started = False
+            outdata.fill(0)
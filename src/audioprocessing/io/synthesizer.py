@@ -26,20 +26,42 @@ GUITAR_TIMBRE = [(2.0, 1.1), (1.5, 0.4), (4.0, 0.1)]
 DEFAULT_TIMBRE = GUITAR_TIMBRE
 DEFAULT_FADE_IN = 0.01
 DEFAULT_FADE_OUT = 0.01
+DEFAULT_BLOCK_SIZE = 1024
+DEFAULT_AMP = 0.5
+DEFAULT_VALUE = 1.0 / 4.0
+CHORD_SEPARATOR = "+"
 
 
 class GeneratedSoundReader(object):
+    """Reads a generated sound chunk by chunk.
+
+    audio_signal_generator is called with a SoundSynthesizer when the context is entered and returns either
+    the whole signal, an iterable of blocks of any size (e.g. a generator) or an OscillatorBank.
+    The blocks are generated only when a chunk needs them, so memory and start up time do not depend
+    on the length of the sound. eos is True once the generator is exhausted and all its samples are read.
+    """
+
     def __init__(self, sample_rate, processing_rate, beat, audio_signal_generator, default_timbre=DEFAULT_TIMBRE):
         self.synthesizer = SoundSynthesizer(sample_rate, beat, default_timbre)
         self.sample_rate = sample_rate
         self.processing_rate = processing_rate
         self.audio_signal_generator = audio_signal_generator
+        self._blocks = iter(())
+        self._pending = []
+        self._pending_len = 0
 
     def __enter__(self):
         logger.info("Generating sound")
-        self.audio_signal = self.audio_signal_generator(self.synthesizer)
-        if self.audio_signal is None:
+        audio_signal = self.audio_signal_generator(self.synthesizer)
+        if audio_signal is None:
             raise ValueError("None generated audio signal")
+        if isinstance(audio_signal, np.ndarray):
+            audio_signal = [audio_signal]
+        elif isinstance(audio_signal, OscillatorBank):
+            audio_signal = audio_signal.blocks()
+        self._blocks = iter(audio_signal)
+        self._pending = []
+        self._pending_len = 0
         self.chunk_size = int(self.sample_rate / self.processing_rate)
         self.processing_rate = float(self.sample_rate) / float(self.chunk_size)
         self.cursor = 0
@@ -48,28 +70,63 @@ class GeneratedSoundReader(object):
         return self
 
     def __exit__(self, *args):
+        self._blocks = iter(())
+        self._pending = []
+        self._pending_len = 0
         logger.info("GeneratedSoundReader exit context")
 
     def get_sample_rate(self):
         return self.sample_rate
 
     def eos(self):
-        return not self.cursor < len(self.audio_signal)
+        # looks ahead of one block at most
+        return not self._fill(1)
 
     def read(self):
         data = []
-        if self.cursor < len(self.audio_signal):
-            data = self.audio_signal[self.cursor:self.cursor + self.chunk_size]
-            self.cursor += self.chunk_size
+        if not self.eos():
+            data = self._take(self.chunk_size)
         return {
             "source_signal": data,
             "sample_rate": self.sample_rate,
         }
 
+    def read_frames(self, max_frames):
+        """Reads up to max_frames complete chunks as a 2-D array, one chunk per row.
+
+        When less than a chunk is left, it is returned as a single row.
+        """
+        self._fill(max_frames * self.chunk_size)
+        n_frames = min(max_frames, self._pending_len // self.chunk_size)
+        if n_frames == 0:
+            return self._take(self._pending_len)[np.newaxis, :]
+        return self._take(n_frames * self.chunk_size).reshape(n_frames, self.chunk_size)
+
+    def _fill(self, n_samples):
+        """Generates blocks until n_samples are pending, returns False if none is pending
+        """
+        while self._pending_len < n_samples:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            if len(block) > 0:
+                self._pending.append(np.asarray(block))
+                self._pending_len += len(block)
+        return self._pending_len > 0
+
+    def _take(self, n_samples):
+        self._fill(n_samples)
+        data = np.concatenate(self._pending) if len(self._pending) > 1 else self._pending[0]
+        self._pending = [data[n_samples:]] if len(data) > n_samples else []
+        self._pending_len = len(data) - len(data[:n_samples])
+        data = data[:n_samples]
+        self.cursor += len(data)
+        return data
+
 
 def create_melody_generator(melody_str, timbre=None, fade_in=DEFAULT_FADE_IN, fade_out=DEFAULT_FADE_OUT):
     def melody_generator(synthesizer):
-        return synthesizer.parse_and_generate_melody(melody_str, timbre, fade_in, fade_out)
+        return synthesizer.create_oscillator_bank(synthesizer.parse_melody(melody_str), timbre, fade_in, fade_out)
     return melody_generator
 
 
@@ -120,19 +177,45 @@ class SoundSynthesizer(object):
         return np.concatenate([self.generate_note(amp, freq, value, timbre, fade_in, fade_out)
                                for amp, freq, value in notes])
 
-    def parse_and_generate_melody(self, melody_str, timbre=None, fade_in=DEFAULT_FADE_IN, fade_out=DEFAULT_FADE_OUT):
-        if timbre is None:
-            timbre = self.default_timbre
+    def parse_melody(self, melody_str):
+        """Returns the (start, amp, freq, value) of the notes of the melody, start in seconds.
+
+        Notes joined by + are a chord, e.g. C4+E4+G4, they start together and share the amplitude.
+        """
         tokens = melody_str.split()  # all whitespaces including tabs and newline
-        last_amp = 0.5
-        last_value = 1.0 / 4.0
+        last_amp = DEFAULT_AMP
+        last_value = DEFAULT_VALUE
+        start = 0.0
         notes = []
         for token in tokens:
-            try:
-                notes.append((last_amp, Pitch.parse(token).frequency, last_value))
-            except ValueError:
-                pass
-        return self.generate_melody(notes, timbre, fade_in, fade_out)
+            chord = []
+            for note_str in token.split(CHORD_SEPARATOR):
+                try:
+                    chord.append(Pitch.parse(note_str).frequency)
+                except ValueError:
+                    pass
+            if len(chord) > 0:
+                # the notes of a chord share the amplitude
+                notes.extend((start, last_amp / len(chord), freq, last_value) for freq in chord)
+                start += self.value_to_duration(last_value)
+        return notes
+
+    def parse_and_generate_melody(self, melody_str, timbre=None, fade_in=DEFAULT_FADE_IN, fade_out=DEFAULT_FADE_OUT,
+                                  block_size=DEFAULT_BLOCK_SIZE):
+        oscillator_bank = self.create_oscillator_bank(self.parse_melody(melody_str), timbre, fade_in, fade_out,
+                                                      block_size)
+        return np.concatenate(list(oscillator_bank.blocks()))
+
+    def create_oscillator_bank(self, notes, timbre=None, fade_in=DEFAULT_FADE_IN, fade_out=DEFAULT_FADE_OUT,
+                               block_size=DEFAULT_BLOCK_SIZE):
+        """Returns an OscillatorBank playing the (start, amp, freq, value) notes, start in seconds
+        """
+        if timbre is None:
+            timbre = self.default_timbre
+        oscillator_bank = OscillatorBank(self.sample_rate, block_size)
+        for start, amp, freq, value in notes:
+            oscillator_bank.add_voice(amp, freq, start, self.value_to_duration(value), timbre, fade_in, fade_out)
+        return oscillator_bank
 
     @staticmethod
     def normalize(audio_signal):
@@ -143,3 +226,154 @@ class SoundSynthesizer(object):
         else:
             logger.warning("normalize does not work with a constant audio signal")
             return audio_signal
+
+
+class OscillatorBank(object):
+    """Renders overlapping voices in blocks of block_size samples.
+
+    Each voice is a note with a timbre: a fundamental of amplitude 1 and the (overtone, amp) partials,
+    normalized by the sum of the partial amplitudes so that the voice peaks at most at its amp, and
+    the linear fades of SoundSynthesizer.generate_note. The phase of each partial is accumulated
+    from block to block, and each block is a single vectorized evaluation of all the partials
+    of all the active voices, so memory depends on the block size, not on the length of the piece.
+    """
+
+    def __init__(self, sample_rate, block_size=DEFAULT_BLOCK_SIZE, dtype=np.float32):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.dtype = dtype
+        self.cursor = 0
+        self.end = 0
+        self._pending = []
+        self._pending_sorted = True
+        self._active = []
+        self._block_idx = np.arange(block_size)
+
+    def add_voice(self, amp, freq, start, duration, timbre=DEFAULT_TIMBRE, fade_in=DEFAULT_FADE_IN,
+                  fade_out=DEFAULT_FADE_OUT):
+        """Adds a voice starting start seconds after the beginning of the rendering
+        """
+        start_sample = int(round(start * self.sample_rate))
+        n_samples = int(duration * self.sample_rate)
+        fade_in_samples = int(np.ceil(fade_in * self.sample_rate))
+        fade_out_samples = int(np.ceil(fade_out * self.sample_rate))
+        if n_samples - fade_in_samples - fade_out_samples <= 0:
+            raise ValueError("fade is too long")
+        if start_sample < self.cursor:
+            raise ValueError("voice starting at {} already rendered".format(start))
+        ratios = np.array([1.0] + [overtone for overtone, _ in timbre])
+        amps = np.array([1.0] + [overtone_amp for _, overtone_amp in timbre])
+        self._pending.append(_Voice(start=start_sample,
+                                    n_samples=n_samples,
+                                    increments=freq * ratios / float(self.sample_rate),
+                                    amps=amp * amps / np.sum(amps),
+                                    fade_in=fade_in * self.sample_rate,
+                                    fade_in_samples=fade_in_samples,
+                                    fade_out=fade_out * self.sample_rate,
+                                    fade_out_samples=fade_out_samples))
+        self._pending_sorted = False
+        self.end = max(self.end, start_sample + n_samples)
+
+    def eos(self):
+        return self.cursor >= self.end
+
+    def blocks(self):
+        """Renders the voices block by block, the last block ends with the last voice
+        """
+        while not self.eos():
+            yield self.render(min(self.block_size, self.end - self.cursor))
+
+    def render(self, n_samples=None):
+        """Renders the next n_samples (default block_size) samples, silence where no voice is active
+        """
+        if n_samples is None:
+            n_samples = self.block_size
+        if n_samples > len(self._block_idx):
+            self._block_idx = np.arange(n_samples)
+        block_end = self.cursor + n_samples
+        if not self._pending_sorted:
+            # reversed, so that the next voice is popped from the end
+            self._pending.sort(key=lambda v: v.start, reverse=True)
+            self._pending_sorted = True
+        while self._pending and self._pending[-1].start < block_end:
+            voice = self._pending.pop()
+            # the phase is 0 at the start of the voice, before it the envelope is 0
+            voice.phases = voice.increments * (self.cursor - voice.start)
+            self._active.append(voice)
+        if not self._active:
+            self.cursor = block_end
+            return np.zeros(n_samples, dtype=self.dtype)
+
+        voices = self._active
+        n_partials = [len(v.amps) for v in voices]
+        phases = np.concatenate([v.phases for v in voices])
+        increments = np.concatenate([v.increments for v in voices])
+        amps = np.concatenate([v.amps for v in voices])
+        # each voice sums its partials, then only the voices fading, starting or ending in the block
+        # are multiplied by their envelope
+        partials_start = np.cumsum([0] + n_partials[:-1])
+        voices_signal = np.add.reduceat(self._sinusoids(phases, increments, amps, n_samples), partials_start, axis=0)
+        fading = [i for i, v in enumerate(voices)
+                  if self.cursor < v.start + v.fade_in_samples or block_end > v.start + v.n_samples - v.fade_out_samples]
+        if fading:
+            fading_voices = [voices[i] for i in fading]
+            pos = ((self.cursor - np.array([v.start for v in fading_voices]))[:, np.newaxis] +
+                   self._block_idx[:n_samples])
+            voices_signal[fading] *= self._envelopes(fading_voices, pos)
+        block = np.sum(voices_signal, axis=0)
+
+        phases = np.mod(phases + increments * n_samples, 1.0)
+        offset = 0
+        for voice, n in zip(voices, n_partials):
+            voice.phases = phases[offset:offset + n]
+            offset += n
+        self._active = [v for v in voices if v.start + v.n_samples > block_end]
+        self.cursor = block_end
+        return block.astype(self.dtype)
+
+    @staticmethod
+    def _sinusoids(phases, increments, amps, n_samples):
+        """amp sin(2 pi (phase + increment n)) for n in [0, n_samples), one row per partial.
+
+        n is split as n_coarse * step + n_fine, so that only a few complex exponentials are computed,
+        the others are their products.
+        """
+        step = int(np.ceil(np.sqrt(n_samples)))
+        n_coarse = -(-n_samples // step)
+        fine = amps[:, np.newaxis] * np.exp(2j * np.pi * (phases[:, np.newaxis] +
+                                                           increments[:, np.newaxis] * np.arange(step)))
+        coarse = np.exp(2j * np.pi * increments[:, np.newaxis] * (step * np.arange(n_coarse)))
+        # single precision is enough for the samples, the phases are accumulated in double precision
+        fine = fine.astype(np.complex64)
+        coarse = coarse.astype(np.complex64)
+        products = coarse[:, :, np.newaxis] * fine[:, np.newaxis, :]
+        return products.imag.reshape(len(phases), -1)[:, :n_samples]
+
+    @staticmethod
+    def _envelopes(voices, pos):
+        n_samples = np.array([v.n_samples for v in voices])[:, np.newaxis]
+        fade_in = np.array([v.fade_in for v in voices])[:, np.newaxis]
+        fade_out = np.array([v.fade_out for v in voices])[:, np.newaxis]
+        fade_out_start = np.array([v.n_samples - v.fade_out_samples for v in voices])[:, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fade_in_envelope = np.where(fade_in > 0, pos / fade_in, 1.0)
+            fade_out_envelope = np.where(fade_out > 0, 1.0 - (pos - fade_out_start) / fade_out, 1.0)
+        envelopes = np.clip(np.minimum(fade_in_envelope, fade_out_envelope), 0.0, 1.0)
+        envelopes[(pos < 0) | (pos >= n_samples)] = 0.0
+        return envelopes
+
+
+class _Voice(object):
+    __slots__ = ("start", "n_samples", "increments", "amps", "fade_in", "fade_in_samples", "fade_out",
+                 "fade_out_samples", "phases")
+
+    def __init__(self, start, n_samples, increments, amps, fade_in, fade_in_samples, fade_out, fade_out_samples):
+        self.start = start
+        self.n_samples = n_samples
+        self.increments = increments
+        self.amps = amps
+        self.fade_in = fade_in
+        self.fade_in_samples = fade_in_samples
+        self.fade_out = fade_out
+        self.fade_out_samples = fade_out_samples
+        self.phases = None
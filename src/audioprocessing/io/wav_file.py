@@ -15,37 +15,71 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import struct
 import numpy as np
 from scipy.io import wavfile
 
+from audioprocessing.processor.framing import frame_signal
+
 logger = logging.getLogger(__name__)
 
 
 DEFAULT_PROCESSING_RATE = 8.0
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_WORKING_DTYPE = np.float32
+DEFAULT_NORMALIZE = True
+DEFAULT_ALL_CHANNELS = False
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
 
 
 class WavFileReader(object):
-    def __init__(self, filename, processing_rate=DEFAULT_PROCESSING_RATE):
+    """Reads a wav file chunk by chunk.
+
+    The file is memory mapped, so opening it does not depend on its size and only the chunks being processed
+    are loaded. Each chunk is converted once to the working dtype, and with ``normalize`` the integer formats
+    are scaled to [-1, 1) like the float ones.
+
+    ``source_signal`` is the first channel. With ``all_channels`` the chunks of every channel are also read
+    as ``source_signal_all_channels``, a (channels x samples) array.
+    """
+
+    def __init__(self, filename, processing_rate=DEFAULT_PROCESSING_RATE, dtype=DEFAULT_WORKING_DTYPE,
+                 normalize=DEFAULT_NORMALIZE, all_channels=DEFAULT_ALL_CHANNELS):
         self.filename = filename
         self.processing_rate = processing_rate
+        self.dtype = dtype
+        self.normalize = normalize
+        self.all_channels = all_channels
         self.sample_rate = None
         self.audio_signal = None
+        self.all_channels_signal = None
         self.chunk_size = None
         self.cursor = 0
 
     def __enter__(self):
-        logger.info("Loading wav file %r", self.filename)
-        self.sample_rate, self.audio_signal = wavfile.read(self.filename)
-        if len(self.audio_signal.shape) > 1 and  self.audio_signal.shape[1]> 1:
-            self.audio_signal = self.audio_signal[:, 0]
+        logger.info("Opening wav file %r", self.filename)
+        try:
+            self.sample_rate, self.audio_signal = wavfile.read(self.filename, mmap=True)
+        except ValueError:
+            # some formats, e.g. 24 bits, can't be memory mapped
+            logger.warning("Can't memory map %r, loading it", self.filename)
+            self.sample_rate, self.audio_signal = wavfile.read(self.filename)
+        # samples x channels, also for mono files
+        self.all_channels_signal = np.reshape(self.audio_signal, (len(self.audio_signal), -1))
+        self.audio_signal = self.all_channels_signal[:, 0]
         self.chunk_size = int(self.sample_rate / self.processing_rate)
         self.processing_rate = float(self.sample_rate) / float(self.chunk_size)
         self.cursor = 0
-        logger.info("Chunk size %r, expected processing rate %r",
-                    self.chunk_size, self.processing_rate)
+        logger.info("Chunk size %r, expected processing rate %r, file format %r",
+                    self.chunk_size, self.processing_rate, self.audio_signal.dtype)
         return self
 
     def __exit__(self, *args):
+        # releases the memory map, the chunks already read are copies
+        self.audio_signal = np.zeros(0, dtype=self.audio_signal.dtype)
+        self.all_channels_signal = np.zeros((0, self.all_channels_signal.shape[1]), dtype=self.audio_signal.dtype)
         logger.info("WavFileReader exit context")
 
     def get_sample_rate(self):
@@ -58,33 +92,145 @@ class WavFileReader(object):
 
     def read(self):
         data = []
+        signals = {}
         if self.cursor < len(self.audio_signal):
-            data = np.ascontiguousarray(self.audio_signal[self.cursor:self.cursor + self.chunk_size])
+            data = self.convert(self.audio_signal[self.cursor:self.cursor + self.chunk_size])
+            if self.all_channels:
+                signals["source_signal_all_channels"] = self.convert(
+                    self.all_channels_signal[self.cursor:self.cursor + self.chunk_size].T)
             self.cursor += self.chunk_size
-        return {
+        signals.update({
             "source_signal": data,
             "sample_rate": self.sample_rate,
-        }
+        })
+        return signals
+
+    def read_frames(self, max_frames):
+        """Reads up to max_frames complete chunks as a 2-D array, one chunk per row.
+
+        When less than a chunk is left, it is returned as a single row.
+        """
+        frames = frame_signal(self.audio_signal[self.cursor:], self.chunk_size)[:max_frames]
+        if len(frames) == 0:
+            frames = self.audio_signal[np.newaxis, self.cursor:]
+        self.cursor += frames.size
+        return self.convert(frames)
+
+    def convert(self, data):
+        """Returns a copy of the data in the working dtype, normalized if the file has an integer format
+        """
+        converted = data.astype(self.dtype)
+        if self.normalize and np.issubdtype(data.dtype, np.integer):
+            if np.issubdtype(data.dtype, np.unsignedinteger):
+                # unsigned formats (8 bits) are centered on half of their range
+                converted -= 2 ** (8 * data.dtype.itemsize - 1)
+            converted /= 2 ** (8 * data.dtype.itemsize - 1)
+        return converted
 
 
 class WavFileWriter(object):
-    def __init__(self, filename, sample_rate=DEFAULT_PROCESSING_RATE):
+    """Writes a wav file block by block.
+
+    Inside the context the header is written with the first block, using its dtype and channels (samples or
+    samples x channels, like scipy wavfile), each block is appended to the file as it is written and
+    the sizes in the header are patched when the context exits: memory does not grow with the length.
+    Outside the context the blocks are kept in ``audio_signal``, a buffer growing geometrically.
+    """
+
+    def __init__(self, filename, sample_rate=DEFAULT_SAMPLE_RATE):
         self.filename = filename
         self.sample_rate = sample_rate
-        self.audio_signal = None
+        self.n_samples = 0
+        self._file = None
+        self._dtype = None
+        self._channels = None
+        self._buffer = None
+        self._fact_pos = None
+        self._data_pos = None
 
     def __enter__(self):
-        logger.info("WavFileWriter initializing output signal")
-        self.audio_signal = None
+        logger.info("WavFileWriter opening %r, sample_rate=%r", self.filename, self.sample_rate)
+        self._file = open(self.filename, "wb")
+        self.n_samples = 0
+        self._dtype = None
+        self._channels = None
         return self
 
     def __exit__(self, *args):
-        logger.info("WavFileWriter writing %r samples to %r, sample_rate=%r",
-                    len(self.audio_signal), self.filename, self.sample_rate)
-        wavfile.write(self.filename, self.sample_rate, self.audio_signal)
+        if self._dtype is None:
+            self._write_header(np.dtype(DEFAULT_WORKING_DTYPE), 1)
+        data_size = self.n_samples * self._channels * self._dtype.itemsize
+        if data_size % 2 == 1:
+            self._file.write(b"\x00")
+        riff_size = self._file.tell() - 8
+        self._file.seek(4)
+        self._file.write(struct.pack("<I", riff_size))
+        if self._fact_pos is not None:
+            self._file.seek(self._fact_pos)
+            self._file.write(struct.pack("<I", self.n_samples))
+        self._file.seek(self._data_pos)
+        self._file.write(struct.pack("<I", data_size))
+        self._file.close()
+        self._file = None
+        logger.info("WavFileWriter wrote %r samples to %r, sample_rate=%r",
+                    self.n_samples, self.filename, self.sample_rate)
+
+    @property
+    def audio_signal(self):
+        """The blocks written outside the context
+        """
+        if self._buffer is None:
+            return None
+        return self._buffer[:self.n_samples]
 
     def write(self, data):
-        if self.audio_signal:
-            self.audio_signal = np.concatenate([self.audio_signal, data])
+        data = np.asarray(data)
+        if len(data) == 0:
+            return
+        if self._file is None:
+            self._append_to_buffer(data)
+            return
+        if self._dtype is None:
+            self._write_header(data.dtype, 1 if data.ndim == 1 else data.shape[1])
+        if (1 if data.ndim == 1 else data.shape[1]) != self._channels:
+            raise ValueError("{} channels expected, got data of shape {}".format(self._channels, data.shape))
+        self._file.write(np.ascontiguousarray(data, dtype=self._dtype.newbyteorder("<")).tobytes())
+        self.n_samples += len(data)
+
+    def _append_to_buffer(self, data):
+        if self._buffer is None:
+            self._buffer = np.empty((len(data),) + data.shape[1:], dtype=data.dtype)
+        if self.n_samples + len(data) > len(self._buffer):
+            # doubles the capacity, the copies are amortized
+            buffer = np.empty((max(2 * len(self._buffer), self.n_samples + len(data)),) + self._buffer.shape[1:],
+                              dtype=self._buffer.dtype)
+            buffer[:self.n_samples] = self._buffer[:self.n_samples]
+            self._buffer = buffer
+        self._buffer[self.n_samples:self.n_samples + len(data)] = data
+        self.n_samples += len(data)
+
+    def _write_header(self, dtype, channels):
+        if dtype.kind == "f":
+            format_tag = WAVE_FORMAT_IEEE_FLOAT
+        elif dtype.kind in "iu" and (dtype.kind == "u") == (dtype.itemsize == 1):
+            format_tag = WAVE_FORMAT_PCM
+        else:
+            raise ValueError("unsupported dtype {} for wav files".format(dtype))
+        self._dtype = dtype
+        self._channels = channels
+        block_align = channels * dtype.itemsize
+        self._file.write(b"RIFF" + struct.pack("<I", 0) + b"WAVE")
+        if format_tag == WAVE_FORMAT_PCM:
+            self._file.write(b"fmt " + struct.pack("<IHHIIHH", 16, format_tag, channels, self.sample_rate,
+                                                   self.sample_rate * block_align, block_align, 8 * dtype.itemsize))
+            self._fact_pos = None
         else:
-            self.audio_signal = data
+            # non PCM formats have the extension size and a fact chunk with the number of samples
+            self._file.write(b"fmt " + struct.pack("<IHHIIHHH", 18, format_tag, channels, self.sample_rate,
+                                                   self.sample_rate * block_align, block_align, 8 * dtype.itemsize, 0))
+            self._file.write(b"fact" + struct.pack("<I", 4))
+            self._fact_pos = self._file.tell()
+            self._file.write(struct.pack("<I", 0))
+        self._file.write(b"data")
+        self._data_pos = self._file.tell()
+        self._file.write(struct.pack("<I", 0))
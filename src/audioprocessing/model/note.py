@@ -25,6 +25,8 @@ class Note(object):
     """Represents a note, with a pitch and a start and end point in time
     """
 
+    __slots__ = ("pitch", "start_s", "end_s", "start_beat", "end_beat", "value")
+
     def __init__(self, pitch, start_s, end_s, bpm=None):
         self.pitch = pitch
         self.start_s = start_s
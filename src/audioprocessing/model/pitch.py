@@ -22,8 +22,11 @@ https://en.wikipedia.org/wiki/Pitch_(music)
 
 import math
 import re
+from functools import lru_cache
+import numpy as np
 
 NOTE_REGEX = '([ABCDEFG])([#b]?)([0-9]?)'
+NOTE_PATTERN = re.compile(NOTE_REGEX)
 
 SEMITONE_TO_NOTE = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
@@ -52,8 +55,14 @@ STD_OCTAVE = 4
 
 class Pitch(object):
     """Represents a pitch, e.g. a musical tone whose only relevant attribute is the frequency.
+
+    Pitches are immutable and compared by their nominal pitch: the nominal pitches returned by
+    ``from_octave_semitone``, ``parse`` and ``parse_all`` are shared instances.
     """
 
+    __slots__ = ("frequency", "offset_from_c0", "idx", "octave", "semitone", "note", "nominal_frequency",
+                 "error", "error_in_semitones")
+
     def __init__(self, frequency):
         """
         :param frequency: frequency measured in hertz
@@ -68,13 +77,18 @@ class Pitch(object):
         self.octave = int(self.idx / 12.0)
         self.semitone = int(self.idx - self.octave * 12.0)
         self.note = SEMITONE_TO_NOTE[self.semitone]
-        self.nominal_frequency = Pitch.frequency_from_octave_semitone(self.octave, self.semitone)
+        self.nominal_frequency = _nominal_frequency(self.octave, self.semitone)
         self.error = frequency - self.nominal_frequency
         self.error_in_semitones = self.offset_from_c0 - float(self.idx)
 
     @staticmethod
     def from_octave_semitone(octave, semitone):
-        return Pitch(Pitch.frequency_from_octave_semitone(octave, semitone))
+        key = (octave, semitone)
+        pitch = _NOMINAL_PITCHES.get(key)
+        if pitch is None:
+            pitch = Pitch(Pitch.frequency_from_octave_semitone(octave, semitone))
+            _NOMINAL_PITCHES[key] = pitch
+        return pitch
 
     @staticmethod
     def frequency_from_octave_semitone(octave, semitone):
@@ -92,12 +106,13 @@ class Pitch(object):
         return s
 
     def __eq__(self, other):
+        # same idx means same octave and semitone, hence same nominal frequency
         if isinstance(other, Pitch):
-            return self.nominal_frequency == other.nominal_frequency
+            return self.idx == other.idx
         return False
 
     def __hash__(self):
-        return hash(self.nominal_frequency)
+        return hash(self.idx)
 
     @staticmethod
     def _re_groups_to_pitch(groups):
@@ -114,14 +129,75 @@ class Pitch(object):
         return Pitch.from_octave_semitone(octave, semitone)
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def parse(my_str):
-        note_match = re.match(NOTE_REGEX, my_str)
+        note_match = NOTE_PATTERN.match(my_str)
         if note_match:
             return Pitch._re_groups_to_pitch(note_match.groups())
-        raise ValueError("%s is not a valid note".format(my_str))
+        raise ValueError("{} is not a valid note".format(my_str))
 
     @staticmethod
     def parse_all(my_str):
-        note_matches = re.findall(NOTE_REGEX, my_str)
-        return [Pitch._re_groups_to_pitch(m) for m in note_matches]
+        return list(_parse_all(my_str))
+
+
+#: Shared instances of the nominal pitches, by (octave, semitone)
+_NOMINAL_PITCHES = {}
+
+
+@lru_cache(maxsize=None)
+def _nominal_frequency(octave, semitone):
+    return Pitch.frequency_from_octave_semitone(octave, semitone)
+
+
+@lru_cache(maxsize=1024)
+def _parse_all(my_str):
+    return tuple(Pitch._re_groups_to_pitch(m) for m in NOTE_PATTERN.findall(my_str))
+
 
+class PitchArray(object):
+    """Represents a sequence of pitches as parallel numpy arrays, computed with one vectorized call.
+
+    The attributes have the same meaning of the ones of Pitch, the Pitch objects are created only when the items
+    are accessed, e.g. while iterating.
+    """
+
+    def __init__(self, frequency):
+        """
+        :param frequency: frequencies measured in hertz
+        :type frequency: array like of float
+        :rtype PitchArray
+        """
+        self.frequency = np.asarray(frequency, dtype=float).reshape(-1)
+        invalid = (self.frequency <= MIN_FREQUENCY) | (self.frequency > MAX_FREQUENCY)
+        if np.any(invalid):
+            raise ValueError("invalid frequency {} valid range[{}, {}]".format(
+                self.frequency[np.argmax(invalid)], MIN_FREQUENCY, MAX_FREQUENCY))
+        self.offset_from_c0 = np.log2(self.frequency / FREQ_C0) * 12.0
+        self.idx = np.round(self.offset_from_c0).astype(int)
+        self.octave = np.trunc(self.idx / 12.0).astype(int)
+        self.semitone = self.idx - self.octave * 12
+        self.nominal_frequency = FREQ_C0 * 2.0 ** (self.octave + self.semitone / 12.0)
+        self.error = self.frequency - self.nominal_frequency
+        self.error_in_semitones = self.offset_from_c0 - self.idx
+
+    @property
+    def note(self):
+        return np.array(SEMITONE_TO_NOTE)[self.semitone]
+
+    def to_pitches(self):
+        return [Pitch(f) for f in self.frequency]
+
+    def __len__(self):
+        return len(self.frequency)
+
+    def __iter__(self):
+        return iter(self.to_pitches())
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return Pitch(self.frequency[item])
+        return PitchArray(self.frequency[item])
+
+    def __repr__(self):
+        return repr(self.to_pitches())
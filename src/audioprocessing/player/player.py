@@ -18,11 +18,13 @@ import logging
 import numpy as np
 from audioprocessing.application.application import SingleSourceApplication
 from audioprocessing.processor.buffer import Buffer
+from audioprocessing.processor.sliding_dft import SlidingDft
 import sys
+import threading
 import time
 from audioprocessing.io.wav_file import WavFileReader
-from audioprocessing.io.sound_card import SoundCard
 from audioprocessing.model.pitch import FREQ_C0
+from audioprocessing.player.spectrum_decimator import SpectrumDecimator
 
 if sys.version_info[0] < 3:
     import Tkinter as tk
@@ -32,26 +34,47 @@ else:
 
 logger = logging.getLogger(__name__)
 
-
-def interleave(a, b):
-    c = np.empty((a.size + b.size,), dtype=a.dtype)
-    c[0::2] = a
-    c[1::2] = b
-    return c
+DEFAULT_REFRESH_MS = 30
+DEFAULT_OUTPUT_PROCESSING_RATE = 10.0
+DEFAULT_MAX_QUEUED_OUTPUT_BLOCKS = 8
+DISPLAYED_OCTAVES = range(3, 6)
+DEFAULT_USE_SLIDING_DFT = False
 
 
 class DefaultPlayerApplication(SingleSourceApplication):
-    def __init__(self, audio_source, update_output, **kvargs):
+    """Spectrum of the last second of signal.
+
+    With ``use_sliding_dft`` only the bins of the displayed octaves are computed, updated incrementally
+    by a SlidingDft, which makes high processing rates affordable.
+    """
+
+    def __init__(self, audio_source, update_output, use_sliding_dft=DEFAULT_USE_SLIDING_DFT, **kvargs):
         super().__init__(audio_source, update_output, **kvargs)
+        self.use_sliding_dft = use_sliding_dft
 
     def _init(self):
-        self.buffer = Buffer(self.audio_source.get_sample_rate(), buffer_duration=1.0)
-        self.spectrum_freq = self.audio_source.get_sample_rate() * np.fft.rfftfreq(self.buffer.buffer_len)
-        self.spectrum_semitones_from_c0 = np.log2(self.spectrum_freq / FREQ_C0) * 12.0
+        if self.use_sliding_dft:
+            self.sliding_dft = SlidingDft(self.audio_source.get_sample_rate(), window_duration=1.0,
+                                          min_freq=FREQ_C0 * 2.0 ** ((DISPLAYED_OCTAVES[0] * 12.0 - 0.5) / 12.0),
+                                          max_freq=FREQ_C0 * 2.0 ** ((DISPLAYED_OCTAVES[-1] * 12.0 + 11.5) / 12.0))
+            self.spectrum_freq = self.sliding_dft.freqs
+        else:
+            self.buffer = Buffer(self.audio_source.get_sample_rate(), buffer_duration=1.0)
+            self.spectrum_freq = self.audio_source.get_sample_rate() * np.fft.rfftfreq(self.buffer.buffer_len)
+        with np.errstate(divide="ignore"):
+            self.spectrum_semitones_from_c0 = np.log2(self.spectrum_freq / FREQ_C0) * 12.0
 
     def _run_once(self, signals):
+        if self.use_sliding_dft:
+            signals.update(self.sliding_dft.process(**signals))
+            signals.update({
+                "spectrum": signals["sliding_spectrum_amp"],
+                "spectrum_freq": self.spectrum_freq,
+                "spectrum_semitones_from_c0": self.spectrum_semitones_from_c0
+            })
+            return
         signals.update(self.buffer.process(**signals))
-        spectrum = np.abs(np.fft.rfft(signals["buffered_signal"]))
+        spectrum = self.spectrum_cache.spectrum_amp(signals["buffered_signal"], self.buffer.buffer_len, real=True)
 
         signals.update({
             "spectrum": spectrum,
@@ -60,24 +83,98 @@ class DefaultPlayerApplication(SingleSourceApplication):
         })
 
 
+class PlayerWorker(object):
+    """Runs the application and the playback in their own thread, the UI polls the latest frame.
+
+    The source signal is played through a sound card in callback mode, whose output ring is the jitter buffer
+    of the processing loop: the worker waits only when ``max_queued_blocks`` are queued, which paces
+    the processing of files to the playback. Without playback the processing is paced to real time.
+    Each frame is decimated to the pixels of the display here, the UI thread only draws it.
+    """
+
+    def __init__(self, audio_source, application_cls, semitones_to_x, play=True,
+                 max_queued_blocks=DEFAULT_MAX_QUEUED_OUTPUT_BLOCKS):
+        self.audio_source = audio_source
+        self.application = application_cls(audio_source, update_output=self.update_output)
+        self.semitones_to_x = semitones_to_x
+        self.play = play
+        self.max_queued_blocks = max_queued_blocks
+        self.sound_card = None
+        self.decimator = None
+        self.latest_frame = None
+        self.processed_frames = 0
+        self.start_time = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="player-worker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        with self.audio_source:
+            self.application._init()
+            if self.play:
+                from audioprocessing.io.sound_card import SoundCard
+                self.sound_card = SoundCard(sample_rate=self.audio_source.get_sample_rate(),
+                                            processing_rate=DEFAULT_OUTPUT_PROCESSING_RATE, use_callback=True)
+                self.sound_card.__enter__()
+            try:
+                self.start_time = time.perf_counter()
+                played_duration = 0.0
+                while not self._stop.is_set() and not self.audio_source.eos():
+                    signals = self.application.run_once()
+                    played_duration += len(signals["source_signal"]) / float(self.audio_source.get_sample_rate())
+                    self._wait_playback(played_duration)
+            finally:
+                if self.sound_card is not None:
+                    self.sound_card.__exit__(None, None, None)
+        logger.info("Player worker completed after %d frames", self.processed_frames)
+
+    def _wait_playback(self, played_duration):
+        while not self._stop.is_set():
+            if self.sound_card is not None:
+                wait = self.sound_card.output_queue_depth() >= self.max_queued_blocks
+            else:
+                wait = time.perf_counter() - self.start_time < played_duration
+            if not wait:
+                return
+            time.sleep(0.005)
+
+    def update_output(self, source_signal, spectrum_semitones_from_c0, spectrum, **other_signals):
+        if self.sound_card is not None:
+            self.sound_card.write(source_signal)
+        if self.decimator is None:
+            self.decimator = SpectrumDecimator(spectrum_semitones_from_c0, DISPLAYED_OCTAVES, self.semitones_to_x)
+        self.processed_frames += 1
+        # replaced as a whole, the UI thread reads either the previous frame or this one
+        self.latest_frame = {
+            "frame": self.processed_frames,
+            "octaves": self.decimator.decimate(spectrum),
+        }
+
+
 OCTAVE_COLORS = ["#000", "#f00", "#ff0", "#0f0", "#0ff", "#00f", "#f0f", "#0ff", "#fff"]
 NOTE_COLORS = ["#f00", "#fff", "#ff0", "#fff", "#0f0", "#0ff", "#fff", "#00f", "#fff", "#f0f", "#fff", "#000"]
 
 
 class Player(tk.Frame):
-    def __init__(self, audio_source, application_cls=DefaultPlayerApplication, master=None):
-        self.audio_source = audio_source
-        self.application = application_cls(audio_source, update_output=self.update_ui)
-        self.sound_card = None
+    def __init__(self, audio_source, application_cls=DefaultPlayerApplication, master=None, play=True,
+                 refresh_ms=DEFAULT_REFRESH_MS):
         tk.Frame.__init__(self, master)
+        self.refresh_ms = refresh_ms
         self.start_time = time.time()
         self.nit = 0
+        self.drawn_frame = None
         self.grid()
         self.createWidgets()
 
-        self.audio_source.__enter__()
-        self.application._init()
-        self.run_multiple()
+        self.worker = PlayerWorker(audio_source, application_cls, self.semitonesToCx, play=play)
+        self.worker.start()
+        self.poll()
 
     def getCW(self):
         return 1200
@@ -98,48 +195,39 @@ class Player(tk.Frame):
         self.quitButton = tk.Button(self, text='Quit', command=self.quit)
         self.quitButton.pack(side="bottom")
 
-    def run_multiple(self):
-        self.run_once()
-        self.after(10, self.run_multiple)
-
-    def run_once(self):
-        if not self.audio_source.eos():
-            self.application.run_once()
-
-    def update_ui(self, source_signal, spectrum_semitones_from_c0, spectrum, **other_signals):
-        if not self.sound_card:
-            self.sound_card = SoundCard(sample_rate=audio_source.get_sample_rate(), processing_rate=10.0)
-            self.sound_card.__enter__()
-        self.sound_card.write(source_signal)
-
-        cur_time = time.time()
-        exec_time = cur_time - self.start_time
-        eps = float(self.nit) / exec_time
-        self.eps_val.set("fps={}".format(round(eps, 1)))
-        self.nit += 1
-
-        self.canvas.delete("all")
-
-        x = spectrum_semitones_from_c0
-        y = spectrum
-        # mask = np.mod(np.arange(x.size), 20) == 0
-        # x = x[mask]
-        # y = y[mask]
-
+        # the items are created once, each frame only moves their points
         for i in range(12):
             lx = self.semitonesToCx(i)
             self.canvas.create_line(lx, 0, lx, self.getCH(), fill=NOTE_COLORS[i], width=2)
-
-        for i in range(3, 6):
-            mask = (x >= i*12.0 - 0.5) & (x < i*12.0 + 12.0 - 0.5)
-            x1 = x[mask]
-            y1 = y[mask]
-            cx = self.semitonesToCx(x1)
-            cy = self.getCH() - 20 - y1 * 400.0 / 100.0
-            pts = interleave(cx, cy).astype(int)
-            self.canvas.create_line([p for p in pts], fill=OCTAVE_COLORS[i], width=3)
-
-
+        self.octave_lines = [self.canvas.create_line(0, 0, 0, 0, fill=OCTAVE_COLORS[i], width=3)
+                             for i in DISPLAYED_OCTAVES]
+
+    def quit(self):
+        self.worker.stop()
+        tk.Frame.quit(self)
+
+    def poll(self):
+        frame = self.worker.latest_frame
+        if frame is not None and frame is not self.drawn_frame:
+            self.update_ui(frame)
+            self.drawn_frame = frame
+        self.after(self.refresh_ms, self.poll)
+
+    def update_ui(self, frame):
+        exec_time = time.time() - self.start_time
+        self.nit += 1
+        self.eps_val.set("fps={} processed={}".format(round(float(self.nit) / exec_time, 1), frame["frame"]))
+
+        for line, (x, y_min, y_max) in zip(self.octave_lines, frame["octaves"]):
+            if len(x) == 0:
+                continue
+            # a vertical segment from the max to the min of each pixel
+            points = np.empty((len(x), 4))
+            points[:, 0] = x
+            points[:, 1] = self.getCH() - 20 - y_max * 400.0 / 100.0
+            points[:, 2] = x
+            points[:, 3] = self.getCH() - 20 - y_min * 400.0 / 100.0
+            self.canvas.coords(line, points.ravel().tolist())
 
 
 if __name__ == '__main__':
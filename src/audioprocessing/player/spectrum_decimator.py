@@ -0,0 +1,53 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+class SpectrumDecimator(object):
+    """Reduces the spectrum of each octave to the min and the max of the bins falling in each pixel.
+
+    The bins of each octave and their pixels are computed once, from the semitones of the bins (increasing)
+    and the function mapping semitones to pixels, so that each spectrum is decimated with two reduceat
+    per octave, whatever its size.
+    """
+
+    def __init__(self, spectrum_semitones_from_c0, octaves, semitones_to_x):
+        self.octaves = list(octaves)
+        self.slices = []
+        self.pixel_starts = []
+        self.pixel_x = []
+        for octave in self.octaves:
+            start, stop = np.searchsorted(spectrum_semitones_from_c0, [octave * 12.0 - 0.5, octave * 12.0 + 11.5])
+            x = np.floor(semitones_to_x(spectrum_semitones_from_c0[start:stop])).astype(int)
+            pixel_starts = np.flatnonzero(np.concatenate([[True], x[1:] != x[:-1]])) if len(x) > 0 else x
+            self.slices.append(slice(start, stop))
+            self.pixel_starts.append(pixel_starts)
+            self.pixel_x.append(x[pixel_starts])
+
+    def decimate(self, spectrum):
+        """Returns a (x, min, max) of arrays for each octave, one item per pixel
+        """
+        decimated = []
+        for octave_slice, pixel_starts, pixel_x in zip(self.slices, self.pixel_starts, self.pixel_x):
+            octave_spectrum = spectrum[octave_slice]
+            if len(pixel_starts) == 0:
+                decimated.append((pixel_x, octave_spectrum, octave_spectrum))
+                continue
+            decimated.append((pixel_x,
+                              np.minimum.reduceat(octave_spectrum, pixel_starts),
+                              np.maximum.reduceat(octave_spectrum, pixel_starts)))
+        return decimated
@@ -19,11 +19,16 @@ import numpy as np
 from scipy.signal import find_peaks
 
 from ..model.pitch import Pitch
+from .peak_interpolation import PeakInterpolator
+from .spectrum_cache import SpectrumCache
+from .zoom_fft import ZoomFFT, fft_cost
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_FFT_RESOLUTION_HZ = 0.1
 DEFAULT_FFT_MIN_ABSOLUTE_PEAK_HEIGHT = 0.0005
+DEFAULT_USE_ZOOM_FFT = None
+DEFAULT_PRECISION_CENTS = None
 
 DEFAULT_BANDS = [
     (Pitch.parse("C3").frequency, Pitch.parse("B3").frequency),
@@ -33,11 +38,33 @@ DEFAULT_MAX_FREQ_HZ = Pitch.parse("F6").frequency
 
 
 class BandPeakFinder(object):
+    """Finds the frequency of the highest peak of the spectrum in each band.
+
+    With ``use_zoom_fft`` only the bins inside the bands are computed, by a zoom fft per band, instead of the
+    whole ``fft_size`` spectrum. The bins are the same of the full fft, and their magnitudes differ only by the
+    aliasing of the strongest components outside the band, about 90 dB below them, so ``bands_peak`` is the same
+    unless two bins of a band are almost tied. Each band costs a small fft, depending on the band width, and a
+    few multiply-adds per sample: with ``use_zoom_fft`` None (the default) the zoom fft is used when its estimated
+    cost is below the full fft one, e.g. for signals of any length for the six guitar bands at 0.1 Hz resolution.
+
+    A multi channel source_signal (channels x samples) is transformed with batched transforms, and ``bands_peak``
+    contains the peaks of the bands for each channel.
+
+    With ``precision_cents`` the fft size is chosen by a PeakInterpolator for the length of the signal, and the
+    highest bin of each band of its hann windowed spectrum is refined below the bin width.
+    ``fft_resolution_hz`` and ``use_zoom_fft`` are ignored in this mode.
+    """
+
+    OUTPUTS = ("bands_peak",)
+
     def __init__(self, sample_rate,
                  min_absolute_peak_height=DEFAULT_FFT_MIN_ABSOLUTE_PEAK_HEIGHT,
                  fft_resolution_hz=DEFAULT_FFT_RESOLUTION_HZ,
-                 bands=DEFAULT_BANDS):
+                 bands=DEFAULT_BANDS,
+                 use_zoom_fft=DEFAULT_USE_ZOOM_FFT,
+                 precision_cents=DEFAULT_PRECISION_CENTS):
         self.sample_rate = sample_rate
+        self.use_zoom_fft = use_zoom_fft
         self.fft_resolution_hz = fft_resolution_hz
         self.bands = bands
         self.min_absolute_peak_height = min_absolute_peak_height
@@ -45,29 +72,93 @@ class BandPeakFinder(object):
         self.idx_to_freq = float(sample_rate) * np.fft.fftfreq(self.fft_size)
 
         self.bands_idx = []
+        self.bands_zoom_fft = []
         for b in self.bands:
             min_idx = np.argmin(np.abs(self.idx_to_freq - b[0]))
             max_idx = np.argmin(np.abs(self.idx_to_freq - b[1]))
             assert b[0] < b[1]
             assert min_idx < max_idx
             self.bands_idx.append((min_idx, max_idx))
+            self.bands_zoom_fft.append(ZoomFFT(self.fft_size, min_idx, max_idx))
             logger.debug("Band %r - %r (idx %r - %r)",
                          self.idx_to_freq[min_idx], self.idx_to_freq[max_idx], min_idx, max_idx)
+        self.peak_interpolator = None
+        self._interpolated_bands_idx = {}
+        if precision_cents is not None:
+            self.peak_interpolator = PeakInterpolator(sample_rate, precision_cents, min(b[0] for b in bands))
 
-    def process(self, source_signal, **other_signals):
+    def process(self, source_signal, spectrum_cache=None, **other_signals):
         bands_peak = []
-        if len(source_signal) > 0:
-            min_peaks_height = len(source_signal) * self.min_absolute_peak_height
-            logging.debug("finding bands peaks for %r samples %r fft size", len(source_signal), self.fft_size)
-            spectrum = np.fft.fft(source_signal, self.fft_size)
-            spectrum_amp = np.abs(spectrum)
-            for band in self.bands_idx:
-                peak_idx = band[0] + np.argmax(spectrum_amp[band[0]:band[1]])
-                peak_amp = spectrum_amp[peak_idx]
-                peak_freq = self.idx_to_freq[peak_idx]
-                if peak_amp < min_peaks_height:
-                    peak_freq = None
-                bands_peak.append(peak_freq)
+        n_samples = np.shape(source_signal)[-1]
+        if n_samples > 0:
+            min_peaks_height = n_samples * self.min_absolute_peak_height
+            if self.peak_interpolator is not None:
+                return {
+                    "bands_peak": self._interpolated_bands_peak(source_signal, min_peaks_height, spectrum_cache),
+                }
+            logging.debug("finding bands peaks for %r samples %r fft size", n_samples, self.fft_size)
+            bands_amp = self._bands_amp(source_signal, spectrum_cache)
+            if np.ndim(source_signal) > 1:
+                bands_peak = [self._bands_peak([band_amp[c] for band_amp in bands_amp], min_peaks_height)
+                              for c in range(source_signal.shape[0])]
+            else:
+                bands_peak = self._bands_peak(bands_amp, min_peaks_height)
         return {
             "bands_peak": bands_peak,
         }
+
+    def _bands_peak(self, bands_amp, min_peaks_height):
+        bands_peak = []
+        for band, band_amp in zip(self.bands_idx, bands_amp):
+            band_peak_idx = np.argmax(band_amp)
+            peak_idx = band[0] + band_peak_idx
+            peak_amp = band_amp[band_peak_idx]
+            peak_freq = self.idx_to_freq[peak_idx]
+            if peak_amp < min_peaks_height:
+                peak_freq = None
+            bands_peak.append(peak_freq)
+        return bands_peak
+
+    def _interpolated_bands_peak(self, source_signal, min_peaks_height, spectrum_cache):
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        spectrum_amp = self.peak_interpolator.spectrum_amp(source_signal, spectrum_cache)
+        bands_idx = self._get_interpolated_bands_idx(spectrum_amp.shape[-1])
+        if spectrum_amp.ndim > 1:
+            return [self._refined_bands_peak(channel_signal, channel_spectrum_amp, bands_idx, min_peaks_height,
+                                             spectrum_cache)
+                    for channel_signal, channel_spectrum_amp in zip(source_signal, spectrum_amp)]
+        return self._refined_bands_peak(source_signal, spectrum_amp, bands_idx, min_peaks_height, spectrum_cache)
+
+    def _refined_bands_peak(self, signal, spectrum_amp, bands_idx, min_peaks_height, spectrum_cache):
+        peaks_idx = np.array([min_idx + np.argmax(spectrum_amp[min_idx:max_idx]) for min_idx, max_idx in bands_idx])
+        peaks_freq = self.peak_interpolator.peaks_freq(signal, spectrum_amp, peaks_idx, spectrum_cache)
+        return [peak_freq if spectrum_amp[peak_idx] >= min_peaks_height else None
+                for peak_idx, peak_freq in zip(peaks_idx, peaks_freq)]
+
+    def _get_interpolated_bands_idx(self, n_bins):
+        bands_idx = self._interpolated_bands_idx.get(n_bins)
+        if bands_idx is None:
+            idx_to_freq = self.peak_interpolator.idx_to_freq(2 * (n_bins - 1))
+            bands_idx = []
+            for b in self.bands:
+                # the bins can be wider than the band for short signals
+                min_idx = np.argmin(np.abs(idx_to_freq - b[0]))
+                bands_idx.append((min_idx, max(min_idx + 1, np.argmin(np.abs(idx_to_freq - b[1])))))
+            self._interpolated_bands_idx[n_bins] = bands_idx
+        return bands_idx
+
+    def _zoom_fft_cheaper(self, n_samples):
+        zoom_cost = sum(zoom_fft.cost(n_samples) for zoom_fft in self.bands_zoom_fft)
+        return zoom_cost < fft_cost(self.fft_size)
+
+    def _bands_amp(self, source_signal, spectrum_cache):
+        use_zoom_fft = self.use_zoom_fft
+        if use_zoom_fft is None:
+            use_zoom_fft = self._zoom_fft_cheaper(np.shape(source_signal)[-1])
+        if use_zoom_fft:
+            return [np.abs(zoom_fft.transform(source_signal)) for zoom_fft in self.bands_zoom_fft]
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        spectrum_amp = spectrum_cache.spectrum_amp(source_signal, self.fft_size)
+        return [spectrum_amp[..., band[0]:band[1]] for band in self.bands_idx]
@@ -22,28 +22,69 @@ logger = logging.getLogger(__name__)
 
 
 class Buffer(object):
+    """Keeps the last ``buffer_duration`` seconds of the source signal.
+
+    The samples are stored in a preallocated mirrored ring: every sample is written twice, at ``i`` and at
+    ``i + buffer_len``, so the current window is always the contiguous slice starting at the write position.
+    Each call costs two copies of the new chunk, independently of the buffer length.
+
+    ``buffered_signal`` is a view on the internal storage, it is valid until the next call of ``process``.
+    Use ``get_window`` with ``copy=True`` to keep a portion of the signal for longer.
+
+    Multi channel signals (channels x samples) are buffered on the last axis.
+    """
+
+    OUTPUTS = ("buffered_signal", "buffered_signal_start")
+
     def __init__(self, sample_rate, buffer_duration):
         self.sample_rate = sample_rate
         self.buffer_len = int(buffer_duration * sample_rate)
         self.buffer_duration = float(self.buffer_len) / float(sample_rate)
         self.buffered_signal = None
         self.buffered_signal_start = -self.buffer_len
+        self._storage = None
+        self._write_pos = 0
 
     def process(self, source_signal, **other_signals):
-        if source_signal is None or len(source_signal) == 0:
+        if source_signal is None or np.shape(source_signal)[-1] == 0:
             logger.warning("empty source signal")
             return {}
-        if self.buffered_signal is None:
-            self.buffered_signal = np.zeros(self.buffer_len, dtype=source_signal.dtype)
+        if self._storage is None:
+            self._storage = np.zeros(source_signal.shape[:-1] + (2 * self.buffer_len,), dtype=source_signal.dtype)
 
-        self.buffered_signal = np.concatenate([self.buffered_signal, source_signal])
-
-        overflow = len(self.buffered_signal) - self.buffer_len
-        if overflow >= 0:
-            self.buffered_signal = self.buffered_signal[overflow:]
-            self.buffered_signal_start += overflow
+        n_samples = source_signal.shape[-1]
+        if n_samples > self.buffer_len:
+            source_signal = source_signal[..., n_samples - self.buffer_len:]
+        self._write(source_signal)
+        self.buffered_signal_start += n_samples
+        self.buffered_signal = self._storage[..., self._write_pos:self._write_pos + self.buffer_len]
 
         return {
             "buffered_signal": self.buffered_signal,
             "buffered_signal_start": self.buffered_signal_start
         }
+
+    def get_window(self, start, end=None, copy=False):
+        """Returns the buffered samples between the absolute sample indexes ``start`` and ``end``.
+
+        :param start: absolute index of the first sample, it is clipped to the oldest buffered sample
+        :param end: absolute index after the last sample, None means up to the last buffered sample
+        :param copy: if True the returned array does not share memory with the buffer
+        """
+        buffer_end = self.buffered_signal_start + self.buffer_len
+        if end is None or end > buffer_end:
+            end = buffer_end
+        start = max(start, self.buffered_signal_start)
+        window = self.buffered_signal[..., start - self.buffered_signal_start:max(start, end) - self.buffered_signal_start]
+        if copy:
+            window = window.copy()
+        return window
+
+    def _write(self, chunk):
+        n_samples = chunk.shape[-1]
+        first = min(n_samples, self.buffer_len - self._write_pos)
+        for offset in (0, self.buffer_len):
+            pos = self._write_pos + offset
+            self._storage[..., pos:pos + first] = chunk[..., :first]
+            self._storage[..., offset:offset + n_samples - first] = chunk[..., first:]
+        self._write_pos = (self._write_pos + n_samples) % self.buffer_len
@@ -0,0 +1,127 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+from scipy import sparse
+from scipy.signal import find_peaks, get_window
+
+from ..model.pitch import Pitch, PitchArray, FREQ_C0
+from .spectrum_cache import SpectrumCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_FREQ_HZ = Pitch.parse("D2").frequency
+DEFAULT_MAX_FREQ_HZ = Pitch.parse("F6").frequency
+DEFAULT_BINS_PER_SEMITONE = 1
+DEFAULT_KERNEL_THRESHOLD = 0.0054
+DEFAULT_WINDOW = "hann"
+DEFAULT_MIN_RELATIVE_PEAK_HEIGHT = 1.0 / 3.0
+DEFAULT_MIN_ABSOLUTE_PEAK_HEIGHT = 0.001
+
+
+class ConstantQTransform(object):
+    """Constant-Q transform with log spaced bins, ``bins_per_semitone`` bins per semitone from min_freq to max_freq.
+
+    Each bin is the inner product of the signal with a windowed complex sinusoid lasting Q periods of its
+    frequency, computed as the product of the rfft of the signal with the sparse spectral kernels of the bins,
+    precomputed once (Brown and Puckette). The fft size is the window of the lowest bin, much smaller than
+    the zero padded ffts needed for the same resolution in the low octaves. The windows of all the bins end with
+    the last sample of the signal, and a sinusoid of amplitude A in a bin has magnitude A / 2.
+    """
+
+    def __init__(self, sample_rate, min_freq=DEFAULT_MIN_FREQ_HZ, max_freq=DEFAULT_MAX_FREQ_HZ,
+                 bins_per_semitone=DEFAULT_BINS_PER_SEMITONE, threshold=DEFAULT_KERNEL_THRESHOLD,
+                 window=DEFAULT_WINDOW):
+        self.sample_rate = sample_rate
+        self.bins_per_semitone = bins_per_semitone
+        # bins on the semitones of the equal temperament, and in between
+        min_offset = np.ceil(np.log2(min_freq / FREQ_C0) * 12.0 * bins_per_semitone)
+        max_offset = np.floor(np.log2(max_freq / FREQ_C0) * 12.0 * bins_per_semitone)
+        self.offsets_from_c0 = np.arange(min_offset, max_offset + 1) / float(bins_per_semitone)
+        self.freqs = FREQ_C0 * 2.0 ** (self.offsets_from_c0 / 12.0)
+        self.n_bins = len(self.freqs)
+        self.q = 1.0 / (2.0 ** (1.0 / (12.0 * bins_per_semitone)) - 1.0)
+        self.window_lengths = np.ceil(self.q * sample_rate / self.freqs).astype(int)
+        self.fft_size = int(2 ** np.ceil(np.log2(self.window_lengths[0])))
+        self.kernel = self._spectral_kernel(threshold, window)
+        logger.debug("constant q transform of %r bins, fft size %r, %r kernel coefficients",
+                     self.n_bins, self.fft_size, self.kernel.nnz)
+
+    def _spectral_kernel(self, threshold, window):
+        rows = []
+        for freq, length in zip(self.freqs, self.window_lengths):
+            temporal_kernel = np.zeros(self.fft_size, dtype=np.complex128)
+            w = get_window(window, length)
+            temporal_kernel[self.fft_size - length:] = w / np.sum(w) * \
+                np.exp(2j * np.pi * freq * np.arange(length) / float(self.sample_rate))
+            # by Parseval the product is the same in the frequency domain, where the kernel is almost zero
+            # but around its frequency: the non negative frequencies, hence the rfft, are enough
+            spectral_kernel = np.fft.fft(temporal_kernel)[:self.fft_size // 2 + 1]
+            spectral_kernel[np.abs(spectral_kernel) < threshold] = 0.0
+            rows.append(sparse.csr_matrix(np.conj(spectral_kernel) / self.fft_size))
+        return sparse.vstack(rows).tocsr()
+
+    def transform(self, signal, spectrum_cache=None):
+        """Returns the constant-Q bins of the last fft_size samples of the signal, on the last axis
+        """
+        signal = np.asarray(signal)
+        n_samples = signal.shape[-1]
+        if n_samples > self.fft_size:
+            signal = signal[..., n_samples - self.fft_size:]
+        elif n_samples < self.fft_size:
+            # zeros before the signal, the windows end with its last sample
+            signal = np.concatenate([np.zeros(signal.shape[:-1] + (self.fft_size - n_samples,)), signal], axis=-1)
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        spectrum = spectrum_cache.spectrum(signal, self.fft_size, real=True)
+        return np.asarray((self.kernel @ spectrum.T).T)
+
+
+class ConstantQAnalyzer(object):
+    """Finds the peaks of the constant-Q transform and the power of the 12 semitones, directly in pitch space.
+    """
+
+    OUTPUTS = ("constant_q", "constant_q_amp", "constant_q_freqs", "constant_q_peaks_freq", "pitches",
+               "constant_q_semitone_power")
+
+    def __init__(self, sample_rate, min_freq=DEFAULT_MIN_FREQ_HZ, max_freq=DEFAULT_MAX_FREQ_HZ,
+                 bins_per_semitone=DEFAULT_BINS_PER_SEMITONE,
+                 min_relative_peak_height=DEFAULT_MIN_RELATIVE_PEAK_HEIGHT,
+                 min_absolute_peak_height=DEFAULT_MIN_ABSOLUTE_PEAK_HEIGHT):
+        self.constant_q_transform = ConstantQTransform(sample_rate, min_freq, max_freq, bins_per_semitone)
+        self.min_relative_peak_height = min_relative_peak_height
+        self.min_absolute_peak_height = min_absolute_peak_height
+        offsets = self.constant_q_transform.offsets_from_c0
+        self.bins_semitone = np.round(offsets).astype(int) % 12
+
+    def process(self, source_signal, spectrum_cache=None, **other_signals):
+        constant_q = self.constant_q_transform.transform(source_signal, spectrum_cache)
+        constant_q_amp = np.abs(constant_q)
+        peaks_freq = self._find_peaks(constant_q_amp)
+        return {
+            "constant_q": constant_q,
+            "constant_q_amp": constant_q_amp,
+            "constant_q_freqs": self.constant_q_transform.freqs,
+            "constant_q_peaks_freq": peaks_freq,
+            "pitches": PitchArray(peaks_freq),
+            "constant_q_semitone_power": np.bincount(self.bins_semitone, weights=constant_q_amp, minlength=12),
+        }
+
+    def _find_peaks(self, constant_q_amp):
+        min_peaks_height = max(np.max(constant_q_amp) * self.min_relative_peak_height, self.min_absolute_peak_height)
+        peaks_idx, _ = find_peaks(constant_q_amp, min_peaks_height)
+        return self.constant_q_transform.freqs[peaks_idx]
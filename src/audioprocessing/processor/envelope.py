@@ -0,0 +1,152 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+from scipy.signal import get_window
+
+from .framing import frame_signal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOP_DURATION = 0.005
+DEFAULT_FRAME_HOPS = 8
+DEFAULT_ONSET_WINDOW = 20
+DEFAULT_ONSET_REFRACTORY_HOPS = 10
+DEFAULT_ONSET_MIN_ENERGY_RATIO = 0.5
+DEFAULT_ONSET_RATIO = 3.0
+DEFAULT_MIN_FLUX = 0.002
+
+
+class EnvelopeProcessor(object):
+    """Computes the energy envelope and the spectral flux of the signal, on hops much shorter than the chunks.
+
+    The chunk, preceded by the samples kept from the previous one, is viewed as overlapping frames of
+    ``frame_hops`` hops, one hop apart, without copies. ``envelope_rms`` has the rms of the last hop of each frame,
+    hence of every sample once, and ``spectral_flux`` the sum of the increases of the hann windowed magnitude
+    spectrum of each frame from the previous one, normalized by the window. Both are computed for all the frames
+    of the chunk at once.
+
+    ``envelope_start`` is the absolute index of the first sample of the first hop. ``onsets`` has the absolute
+    index of the hops where the flux rises above ``onset_ratio`` times its mean over the previous
+    ``onset_window`` hops, plus ``min_flux``, at least ``onset_refractory_hops`` after the previous one. The end of
+    a sound spreads on the whole spectrum as well, so an onset is confirmed only when the frame after it keeps at least
+    ``onset_min_energy_ratio`` of the energy of the frame before it: each onset is reported with the chunk containing
+    the sample ``onset + envelope_frame_size - 1``, the last one of that frame.
+    """
+
+    OUTPUTS = ("envelope_rms", "envelope_start", "envelope_hop_size", "envelope_frame_size", "spectral_flux", "onsets")
+
+    def __init__(self, sample_rate, hop_duration=DEFAULT_HOP_DURATION, frame_hops=DEFAULT_FRAME_HOPS,
+                 onset_window=DEFAULT_ONSET_WINDOW, onset_ratio=DEFAULT_ONSET_RATIO, min_flux=DEFAULT_MIN_FLUX,
+                 onset_refractory_hops=DEFAULT_ONSET_REFRACTORY_HOPS,
+                 onset_min_energy_ratio=DEFAULT_ONSET_MIN_ENERGY_RATIO):
+        self.sample_rate = sample_rate
+        self.hop_size = max(1, int(hop_duration * sample_rate))
+        self.frame_size = self.hop_size * frame_hops
+        self.onset_window = onset_window
+        self.onset_ratio = onset_ratio
+        self.min_flux = min_flux
+        self.onset_refractory_hops = onset_refractory_hops
+        self.onset_min_energy_ratio = onset_min_energy_ratio
+        self.window = get_window("hann", self.frame_size)
+        self._window_sum = np.sum(self.window)
+        # the signal starts after frame_size - hop_size samples of silence, so the first hop is the first one
+        self._tail = np.zeros(self.frame_size - self.hop_size)
+        self._previous_magnitude = np.zeros(self.frame_size // 2 + 1)
+        self._flux_history = np.zeros(onset_window)
+        self._above_threshold_history = np.zeros(onset_refractory_hops, dtype=bool)
+        self.frame_hops = frame_hops
+        self._hops_done = 0
+        # energy of the frames ending with the hops from _energy_start, hop -1 is silence
+        self._energy_start = -1
+        self._energy = np.zeros(1)
+        self._pending_onsets = np.empty(0, dtype=int)
+
+    def process(self, source_signal, current_sample, **other_signals):
+        signal = np.concatenate([self._tail, source_signal])
+        signal_start = current_sample - len(self._tail)
+        frames = frame_signal(signal, self.frame_size, self.hop_size)
+        n_frames = frames.shape[0]
+        self._tail = signal[n_frames * self.hop_size:]
+        envelope_start = signal_start + self.frame_size - self.hop_size
+        if n_frames == 0:
+            return {
+                "envelope_rms": np.empty(0),
+                "envelope_start": envelope_start,
+                "envelope_hop_size": self.hop_size,
+                "envelope_frame_size": self.frame_size,
+                "spectral_flux": np.empty(0),
+                "onsets": np.empty(0, dtype=int),
+            }
+
+        envelope_rms = np.sqrt(np.mean(np.square(frames[:, self.frame_size - self.hop_size:]), axis=-1))
+        magnitude = np.abs(np.fft.rfft(frames * self.window, axis=-1))
+        previous_magnitude = np.concatenate([self._previous_magnitude[np.newaxis], magnitude[:-1]])
+        spectral_flux = np.sum(np.maximum(magnitude - previous_magnitude, 0.0), axis=-1) / self._window_sum
+        self._previous_magnitude = magnitude[-1]
+        candidates = self._hops_done + self._detect_onsets(spectral_flux)
+        onsets = self._confirm_onsets(candidates, np.mean(np.square(frames), axis=-1))
+        first_hop_start = envelope_start - (self._hops_done - n_frames) * self.hop_size
+        return {
+            "envelope_rms": envelope_rms,
+            "envelope_start": envelope_start,
+            "envelope_hop_size": self.hop_size,
+            "envelope_frame_size": self.frame_size,
+            "spectral_flux": spectral_flux,
+            "onsets": first_hop_start + onsets * self.hop_size,
+        }
+
+    def process_batch(self, source_signal, current_sample, **other_signals):
+        """Processes many chunks at once, source_signal has one chunk per row and current_sample one item per chunk.
+
+        The chunks are processed as one signal, the envelope covers all of them instead of having one item per chunk.
+        """
+        return self.process(np.reshape(source_signal, -1), current_sample[0])
+
+    def _detect_onsets(self, spectral_flux):
+        flux = np.concatenate([self._flux_history, spectral_flux])
+        cumulative = np.concatenate([[0.0], np.cumsum(flux)])
+        n = len(spectral_flux)
+        idx = np.arange(self.onset_window, self.onset_window + n)
+        mean_flux = (cumulative[idx] - cumulative[idx - self.onset_window]) / self.onset_window
+        above_threshold = np.concatenate([self._above_threshold_history,
+                                          spectral_flux > self.onset_ratio * mean_flux + self.min_flux])
+        # an onset is a hop above threshold after onset_refractory_hops below it
+        cumulative_above = np.concatenate([[0], np.cumsum(above_threshold)])
+        idx = np.arange(self.onset_refractory_hops, self.onset_refractory_hops + n)
+        recently_above = cumulative_above[idx] - cumulative_above[idx - self.onset_refractory_hops] > 0
+        self._flux_history = flux[-self.onset_window:]
+        self._above_threshold_history = above_threshold[len(above_threshold) - self.onset_refractory_hops:]
+        return np.flatnonzero(above_threshold[idx] & ~recently_above)
+
+    def _confirm_onsets(self, candidates, frame_energy):
+        """Returns the hops of the onsets whose following frame is complete and keeps enough of the energy of the
+        frame before them, the other candidates wait for the next chunks.
+        """
+        energy = np.concatenate([self._energy, frame_energy])
+        self._hops_done += len(frame_energy)
+        candidates = np.concatenate([self._pending_onsets, candidates])
+        complete = candidates + self.frame_hops - 1 < self._hops_done
+        decided = candidates[complete]
+        energy_after = energy[decided + self.frame_hops - 1 - self._energy_start]
+        sustained = energy_after > self.onset_min_energy_ratio * energy[decided - 1 - self._energy_start]
+        self._pending_onsets = candidates[~complete]
+        # keep the energy before the pending onsets, or before the next hop
+        new_energy_start = min(self._pending_onsets.min(initial=self._hops_done), self._hops_done) - 1
+        self._energy = energy[new_energy_start - self._energy_start:]
+        self._energy_start = new_energy_start
+        return decided[sustained]
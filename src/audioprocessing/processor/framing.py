@@ -0,0 +1,37 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def frame_signal(signal, frame_size, hop_size=None):
+    """Returns a read only 2-D view of the signal, with one frame per row and no copy of the samples.
+
+    Only the complete frames are returned, the samples after the last complete frame are left out.
+
+    :param signal: the signal, framed on the last axis
+    :param frame_size: number of samples per frame
+    :param hop_size: distance between the starts of two consecutive frames, defaults to frame_size
+    """
+    if hop_size is None:
+        hop_size = frame_size
+    signal = np.asarray(signal)
+    signal_len = signal.shape[-1]
+    n_frames = 0 if signal_len < frame_size else 1 + (signal_len - frame_size) // hop_size
+    shape = signal.shape[:-1] + (n_frames, frame_size)
+    strides = signal.strides[:-1] + (signal.strides[-1] * hop_size, signal.strides[-1])
+    return as_strided(signal, shape=shape, strides=strides, writeable=False)
@@ -18,51 +18,153 @@ import logging
 import numpy as np
 
 from ..model.pitch import Pitch, FREQ_C0
+from .constant_q import ConstantQTransform
+from .spectrum_cache import SpectrumCache
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_FFT_RESOLUTION_HZ = 1.0
 DEFAULT_RELATIVE_MIN_POWER = 0.3
 DEFAULT_ABSOLUTE_MIN_POWER = 50
+DEFAULT_MIN_OCTAVE = 2
+DEFAULT_MAX_OCTAVE = 6
+DEFAULT_COMPUTE_OCTAVE_POWER = False
+DEFAULT_USE_CONSTANT_Q = False
+# with one bin per semitone the main lobes of the kernels spill on the neighbour semitones
+DEFAULT_BINS_PER_SEMITONE = 2
 
 
 class HarmonyAnalyzer(object):
+    """Computes the power of the 12 semitones, summing the spectrum bins close to each semitone of the octaves
+    from ``min_octave`` to ``max_octave``.
+
+    The bins are selected once: they are sorted by (octave, semitone) and summed with a single reduceat per
+    frame. With ``compute_octave_power`` the power of each (octave, semitone) is returned as well.
+
+    With ``use_constant_q`` the bins are the ones of a ConstantQTransform with ``bins_per_semitone``, instead of
+    an fft of resolution ``fft_resolution_hz``. Its magnitudes are multiplied by the length of the signal, so that
+    a steady sinusoid has the magnitude of its fft peak and ``absolute_min_power`` keeps its meaning, but only
+    in the bins whose window, Q periods of their frequency, fits in the signal. In shorter chunks the windows of
+    the low bins are zero padded and their power is lower, e.g. by 30% for E2 in 1/4 s at 2 bins per semitone.
+    Signals longer than the fft size (0.74 s at 44100 Hz) are truncated, only their end is analyzed.
+    """
+
+    OUTPUTS = ("semitone_power", "semitone_relative_power", "powerful_semitones", "octave_semitone_power")
+
     def __init__(self, sample_rate,
                  fft_resolution_hz=DEFAULT_FFT_RESOLUTION_HZ,
                  absolute_min_power=DEFAULT_ABSOLUTE_MIN_POWER,
-                 relative_min_power=DEFAULT_RELATIVE_MIN_POWER):
+                 relative_min_power=DEFAULT_RELATIVE_MIN_POWER,
+                 min_octave=DEFAULT_MIN_OCTAVE,
+                 max_octave=DEFAULT_MAX_OCTAVE,
+                 compute_octave_power=DEFAULT_COMPUTE_OCTAVE_POWER,
+                 use_constant_q=DEFAULT_USE_CONSTANT_Q,
+                 bins_per_semitone=DEFAULT_BINS_PER_SEMITONE):
         self.sample_rate = sample_rate
         self.relative_min_power = relative_min_power
         self.absolute_min_power = absolute_min_power
         self.fft_resolution_hz = fft_resolution_hz
-        self.fft_size = int(sample_rate / fft_resolution_hz)
-        self.idx_to_freq = float(sample_rate) * np.fft.fftfreq(self.fft_size)
-        self.idx_to_semitones_from_c0 = np.log2(self.idx_to_freq/FREQ_C0) * 12.0
-        self.idx_to_semitone_idx = (self.idx_to_semitones_from_c0 + 0.5) % 12 - 0.5
-        self.semitone_masks = [np.where(float(i) - 0.1 <= self.idx_to_semitone_idx, 1, 0) *
-                               np.where(self.idx_to_semitone_idx <= float(i) + 0.1, 1, 0) *
-                               np.where(12 * 2 <= self.idx_to_semitones_from_c0, 1, 0) *
-                               np.where(self.idx_to_semitones_from_c0 <= 12 * 6, 1, 0)
-                               for i in range(12)]
-
-    def process(self, source_signal, **other_signals):
+        self.min_octave = min_octave
+        self.max_octave = max_octave
+        self.compute_octave_power = compute_octave_power
+        self.use_constant_q = use_constant_q
+        if use_constant_q:
+            self.constant_q_transform = ConstantQTransform(sample_rate,
+                                                           min_freq=FREQ_C0 * 2.0 ** min_octave,
+                                                           max_freq=FREQ_C0 * 2.0 ** max_octave,
+                                                           bins_per_semitone=bins_per_semitone)
+            self.fft_size = self.constant_q_transform.fft_size
+            self.idx_to_freq = self.constant_q_transform.freqs
+        else:
+            self.fft_size = int(sample_rate / fft_resolution_hz)
+            # only the non negative frequencies are needed, bin 0 has no pitch and gets a nan semitone
+            self.idx_to_freq = float(sample_rate) * np.fft.rfftfreq(self.fft_size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.idx_to_semitones_from_c0 = np.log2(self.idx_to_freq / FREQ_C0) * 12.0
+            self.idx_to_semitone_idx = (self.idx_to_semitones_from_c0 + 0.5) % 12 - 0.5
+        self._init_segments()
+
+    def _init_segments(self):
+        n_octaves = self.max_octave - self.min_octave + 1
+        in_octaves = (12 * self.min_octave <= self.idx_to_semitones_from_c0) & \
+                     (self.idx_to_semitones_from_c0 <= 12 * self.max_octave)
+        octave = np.floor((self.idx_to_semitones_from_c0[in_octaves] + 0.5) / 12.0).astype(int)
+        cells = np.full(len(self.idx_to_freq), -1)
+        for i in range(12):
+            semitone_mask = in_octaves & (float(i) - 0.1 <= self.idx_to_semitone_idx) & \
+                            (self.idx_to_semitone_idx <= float(i) + 0.1)
+            cells[semitone_mask] = (octave[semitone_mask[in_octaves]] - self.min_octave) * 12 + i
+        # bins sorted by (octave, semitone) cell, each cell is a contiguous segment for reduceat
+        self.segment_bins = np.nonzero(cells >= 0)[0]
+        self.segment_bins = self.segment_bins[np.argsort(cells[self.segment_bins], kind="stable")]
+        segment_cells = cells[self.segment_bins]
+        self.segment_starts = np.nonzero(np.diff(segment_cells, prepend=-1))[0]
+        self.segment_cells = segment_cells[self.segment_starts]
+        self.n_cells = n_octaves * 12
+        logger.debug("harmony analysis on %r bins, %r of %r cells", len(self.segment_bins),
+                     len(self.segment_cells), self.n_cells)
+
+    def octave_semitone_power(self, spectrum_amp):
+        """Returns the power of each semitone of each octave, with shape (..., octaves, 12)
+
+        :param spectrum_amp: magnitude of the rfft, the bins are on the last axis
+        """
+        power = np.zeros(spectrum_amp.shape[:-1] + (self.n_cells,))
+        if len(self.segment_bins) > 0:
+            power[..., self.segment_cells] = np.add.reduceat(spectrum_amp[..., self.segment_bins],
+                                                             self.segment_starts, axis=-1)
+        return power.reshape(spectrum_amp.shape[:-1] + (self.n_cells // 12, 12))
+
+    def process(self, source_signal, spectrum_cache=None, **other_signals):
         if len(source_signal) > 0:
             logging.debug("finding computing fft for %r samples, size %r", len(source_signal), self.fft_size)
-            spectrum = np.fft.fft(source_signal, self.fft_size)
-            spectrum_amp = np.abs(spectrum)
-            semitone_power = [np.sum(spectrum_amp * mask) for mask in self.semitone_masks]
+            spectrum_amp = self._spectrum_amp(source_signal, spectrum_cache)
+            octave_power = self.octave_semitone_power(spectrum_amp)
+            semitone_power = np.sum(octave_power, axis=0)
             max_power = np.max(semitone_power)
             semitone_relative_power = semitone_power / max_power
-            powerful_semitones = [Pitch.from_octave_semitone(0, i)
-                                  for i in range(len(semitone_relative_power))
-                                  if semitone_relative_power[i] >= self.relative_min_power
-                                  and semitone_power[i] >= self.absolute_min_power]
+            powerful_semitones = self._powerful_semitones(semitone_power, semitone_relative_power)
         else:
+            octave_power = np.zeros((self.n_cells // 12, 12))
             semitone_power = [0.0] * 12
             semitone_relative_power = semitone_power
             powerful_semitones = []
-        return {
+        signals = {
             "semitone_power": semitone_power,
             "semitone_relative_power": semitone_relative_power,
             "powerful_semitones": powerful_semitones
         }
+        if self.compute_octave_power:
+            signals["octave_semitone_power"] = octave_power
+        return signals
+
+    def process_batch(self, source_signal, **other_signals):
+        """Processes many chunks at once, source_signal has one chunk per row, with one batched rfft
+        """
+        if self.use_constant_q:
+            spectrum_amp = self._spectrum_amp(source_signal, SpectrumCache())
+        else:
+            spectrum_amp = np.abs(np.fft.rfft(source_signal, self.fft_size, axis=-1))
+        octave_power = self.octave_semitone_power(spectrum_amp)
+        semitone_power = np.sum(octave_power, axis=-2)
+        semitone_relative_power = semitone_power / np.max(semitone_power, axis=-1, keepdims=True)
+        signals = {
+            "semitone_power": semitone_power,
+            "semitone_relative_power": semitone_relative_power,
+            "powerful_semitones": [self._powerful_semitones(p, r)
+                                   for p, r in zip(semitone_power, semitone_relative_power)]
+        }
+        if self.compute_octave_power:
+            signals["octave_semitone_power"] = octave_power
+        return signals
+
+    def _spectrum_amp(self, source_signal, spectrum_cache):
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        if self.use_constant_q:
+            return np.abs(self.constant_q_transform.transform(source_signal, spectrum_cache)) * source_signal.shape[-1]
+        return spectrum_cache.spectrum_amp(source_signal, self.fft_size, real=True)
+
+    def _powerful_semitones(self, semitone_power, semitone_relative_power):
+        powerful = (semitone_relative_power >= self.relative_min_power) & (semitone_power >= self.absolute_min_power)
+        return [Pitch.from_octave_semitone(0, i) for i in np.nonzero(powerful)[0]]
@@ -19,6 +19,9 @@ import numpy as np
 
 from ..model.pitch import Pitch
 from ..model.note import Note
+from .peak_interpolation import PeakInterpolator
+from .spectrum_cache import SpectrumCache
+from .single_bin_dft import DftBasis, SingleBinDftBank
 
 
 logger = logging.getLogger(__name__)
@@ -29,48 +32,105 @@ DEFAULT_RESOLUTION_BEAT = 1.0 / 4.0 # 1 beat = 1/4, 1/4 beat = 1/16 at bpm
 DEFAULT_OPTIMIZATION_FFT_RESOLUTION = 0.05
 DEFAULT_SEARCH_WIN_SIZE_HZ = 2.0
 DEFAULT_USE_LONG_FFT_OPTIMIZATION = True
+DEFAULT_USE_STREAMING_DFT_OPTIMIZATION = True
+DEFAULT_PRECISION_CENTS = None
 
 
 class NoteTracker(object):
+    """Turns the finished pitches into notes, optionally refining their frequency.
+
+    With ``use_streaming_dft_optimization`` every started pitch gets a bank of running single bin DFTs, spaced
+    ``fft_resolution_hz`` within ``search_win_size`` of the pitch, fed with ``source_signal`` while the pitch is
+    ongoing: the refined frequency is ready when the pitch finishes, without buffering the signal.
+    Otherwise, with ``use_long_fft_optimization``, a long fft of ``buffered_signal`` is computed at the end of the note.
+    With ``precision_cents`` that fft is not padded to ``fft_resolution_hz``, its highest peak within
+    ``search_win_size`` is refined by a PeakInterpolator instead.
+    """
+
+    OUTPUTS = ("notes",)
+
     def __init__(self, bpm=DEFAULT_BPM, resolution_beat=DEFAULT_RESOLUTION_BEAT,
                  fft_resolution_hz=DEFAULT_OPTIMIZATION_FFT_RESOLUTION,
                  search_win_size=DEFAULT_SEARCH_WIN_SIZE_HZ,
-                 use_long_fft_optimization=DEFAULT_USE_LONG_FFT_OPTIMIZATION):
+                 use_long_fft_optimization=DEFAULT_USE_LONG_FFT_OPTIMIZATION,
+                 use_streaming_dft_optimization=DEFAULT_USE_STREAMING_DFT_OPTIMIZATION,
+                 precision_cents=DEFAULT_PRECISION_CENTS):
         self.bpm = bpm
         self.resolution_beat = resolution_beat
         self.fft_resolution_hz = fft_resolution_hz
         self.search_win_size = search_win_size
         self.use_long_fft_optimization = use_long_fft_optimization
+        self.use_streaming_dft_optimization = use_streaming_dft_optimization
+        self.precision_cents = precision_cents
+        self.dft_basis = None
+        self.dft_banks = {}
 
-    def process(self, finished_pitches, current_sample, sample_rate, **other_signals):
+    def process(self, finished_pitches, current_sample, sample_rate, started_pitches=None, ongoing_pitches=None,
+                source_signal=None, spectrum_cache=None, buffered_signal=None, buffered_signal_start=None,
+                **other_signals):
         notes = []
         if finished_pitches and len(finished_pitches) > 0:
             for p, start in finished_pitches.items():
+                dft_bank = self.dft_banks.pop(p, None)
                 note = Note(pitch=p,
                             start_s=float(start) / float(sample_rate),
                             end_s=float(current_sample) / float(sample_rate),
                             bpm=self.bpm)
                 if note.value > self.resolution_beat:
-                    if self.use_long_fft_optimization:
-                        if "buffered_signal" in other_signals:
+                    if self.use_streaming_dft_optimization and dft_bank is not None:
+                        note = self.streaming_dft_optimization(note, start, current_sample, sample_rate, dft_bank)
+                    elif self.use_long_fft_optimization:
+                        if buffered_signal is not None:
                             note = self.long_dft_optimization(note, start, current_sample,
                                                               sample_rate,
-                                                              other_signals["buffered_signal"],
-                                                              other_signals["buffered_signal_start"])
+                                                              buffered_signal,
+                                                              buffered_signal_start,
+                                                              spectrum_cache)
                         else:
                             logger.warning("no buffered_signal, can't optimize note")
                     notes.append(note)
+        if self.use_streaming_dft_optimization and source_signal is not None:
+            self._update_dft_banks(started_pitches, ongoing_pitches, source_signal, current_sample, sample_rate)
         return {
             "notes": notes,
         }
 
-    def long_dft_optimization(self, note, start, current_sample, sample_rate, buffered_signal, buffered_signal_start):
+    def _update_dft_banks(self, started_pitches, ongoing_pitches, source_signal, current_sample, sample_rate):
+        if self.dft_basis is None or self.dft_basis.sample_rate != sample_rate:
+            half_bins = int(np.ceil(self.search_win_size / self.fft_resolution_hz)) - 1
+            self.dft_basis = DftBasis(sample_rate, self.fft_resolution_hz, half_bins)
+        for p in (started_pitches or {}):
+            self.dft_banks[p] = SingleBinDftBank(p.frequency, self.dft_basis)
+        for p in list(started_pitches or {}) + list(ongoing_pitches or {}):
+            # a pitch started before the first source_signal gets its bank late, with the chunks seen since
+            dft_bank = self.dft_banks.get(p)
+            if dft_bank is None:
+                dft_bank = self.dft_banks[p] = SingleBinDftBank(p.frequency, self.dft_basis)
+            dft_bank.update(source_signal, current_sample)
+
+    def streaming_dft_optimization(self, note, start, current_sample, sample_rate, dft_bank):
+        # like the long fft optimization, the beginning and the end of the note are ignored
+        duration = current_sample - start
+        max_freq = dft_bank.peak_frequency(start + duration / 6.0, start + duration * 4.0 / 6.0)
+        logging.debug("optimized %r on a streaming dft of %r bins", note, len(dft_bank.freqs))
+        return (Note(pitch=Pitch(max_freq),
+                     start_s=float(start) / float(sample_rate),
+                     end_s=float(current_sample) / float(sample_rate),
+                     bpm=self.bpm))
+
+    def long_dft_optimization(self, note, start, current_sample, sample_rate, buffered_signal, buffered_signal_start,
+                              spectrum_cache=None):
 
             fft_size = int(sample_rate / self.fft_resolution_hz)
             buffer_start = max(0,
                                start - buffered_signal_start)
             buffer_chunk = buffered_signal[buffer_start:]
             buffer_chunk = buffer_chunk[int(len(buffer_chunk)*1/6):int(len(buffer_chunk)*4/6)]
+            if self.precision_cents is not None:
+                return (Note(pitch=Pitch(self._interpolated_frequency(note, buffer_chunk, sample_rate, spectrum_cache)),
+                             start_s=float(start) / float(sample_rate),
+                             end_s=float(current_sample) / float(sample_rate),
+                             bpm=self.bpm))
             fft_size = max(fft_size, len(buffer_chunk))
 
             logging.info("optimizing on %r samples with fft size %r, resolution %r",
@@ -81,11 +141,25 @@ class NoteTracker(object):
                           if abs(idx_to_freq[i] - note.pitch.frequency) < self.search_win_size]
             search_win_min = np.min(search_idx)
             search_win_max = np.max(search_idx)
-            spectrum_portion = np.fft.fft(buffer_chunk, fft_size)[search_win_min:search_win_max]
-            spectrum_portion_amp = np.abs(spectrum_portion)
+            if spectrum_cache is None:
+                spectrum_cache = SpectrumCache()
+            spectrum_portion_amp = spectrum_cache.spectrum_amp(buffer_chunk, fft_size)[search_win_min:search_win_max]
             max_freq = idx_to_freq[search_win_min + np.argmax(spectrum_portion_amp)]
             return (Note(pitch=Pitch(max_freq),
                          start_s=float(start) / float(sample_rate),
                          end_s=float(current_sample) / float(sample_rate),
                          bpm=self.bpm))
 
+    def _interpolated_frequency(self, note, buffer_chunk, sample_rate, spectrum_cache):
+        min_freq = max(note.pitch.frequency - self.search_win_size, self.search_win_size)
+        peak_interpolator = PeakInterpolator(sample_rate, self.precision_cents, min_freq)
+        spectrum_amp = peak_interpolator.spectrum_amp(buffer_chunk, spectrum_cache)
+        idx_to_freq = peak_interpolator.idx_to_freq(2 * (len(spectrum_amp) - 1))
+        search_win_min, search_win_max = np.searchsorted(idx_to_freq, [note.pitch.frequency - self.search_win_size,
+                                                                       note.pitch.frequency + self.search_win_size])
+        # the bins can be wider than the search window for short notes
+        search_win_max = max(search_win_max, search_win_min + 1)
+        peak_idx = search_win_min + np.argmax(spectrum_amp[search_win_min:search_win_max])
+        logging.info("optimizing on %r samples with fft size %r, precision %r cents",
+                     len(buffer_chunk), 2 * (len(spectrum_amp) - 1), self.precision_cents)
+        return peak_interpolator.peaks_freq(buffer_chunk, spectrum_amp, [peak_idx], spectrum_cache)[0]
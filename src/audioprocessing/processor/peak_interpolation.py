@@ -0,0 +1,171 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+from scipy.signal import get_window
+
+from .spectrum_cache import SpectrumCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = "hann"
+DEFAULT_USE_PHASE_REFINEMENT = True
+
+#: Worst bias of the quadratic interpolation of the log magnitude of a hann windowed sinusoid, in bins,
+#: for each zero padding factor (fft size / signal length), measured with some margin
+HANN_QUADRATIC_MAX_BIAS_BINS = {1: 0.02, 2: 0.004, 4: 0.001, 8: 0.0003}
+#: Worst error of the phase refinement of a hann windowed sinusoid, in cents, for each number of its periods
+#: in the signal, measured with some margin. Zero padding doesn't reduce it, except below 4 periods.
+HANN_PHASE_MAX_ERROR_CENTS = {3: 6.5, 4: 2.0, 5: 1.0, 6: 0.6, 8: 0.25, 12: 0.08}
+PHASE_SHORT_SIGNAL_PADDING = 2
+
+
+def next_power_of_2(n):
+    return 1 << int(np.ceil(np.log2(max(n, 1))))
+
+
+def min_signal_len_for_precision(sample_rate, precision_cents, min_freq):
+    """Returns the number of samples needed by the phase refinement to be within ``precision_cents`` of the
+    frequency of a sinusoid, from ``min_freq`` up, None if the precision is finer than HANN_PHASE_MAX_ERROR_CENTS.
+    """
+    for periods, max_error_cents in sorted(HANN_PHASE_MAX_ERROR_CENTS.items()):
+        if max_error_cents <= precision_cents:
+            return int(np.ceil(periods * sample_rate / min_freq))
+    return None
+
+
+def fft_size_for_precision(sample_rate, signal_len, precision_cents, min_freq, use_phase_refinement=False):
+    """Returns the smallest power of 2 fft size whose interpolated peaks are within ``precision_cents`` of the
+    frequency of a sinusoid, from ``min_freq`` up.
+
+    With phase refinement the error depends on the length of the signal rather than on the fft size: the signal
+    is padded to a power of 2, and twice as much when it is shorter than ``min_signal_len_for_precision``,
+    the precision being then out of reach.
+    """
+    precision_hz = min_freq * (2.0 ** (precision_cents / 1200.0) - 1.0)
+    fft_size = next_power_of_2(signal_len)
+    if use_phase_refinement:
+        min_signal_len = min_signal_len_for_precision(sample_rate, precision_cents, min_freq)
+        if min_signal_len is None or signal_len < min_signal_len:
+            fft_size = next_power_of_2(signal_len * PHASE_SHORT_SIGNAL_PADDING)
+            logger.debug("precision of %r cents unreachable with %r samples, needing %r, fft size %r",
+                         precision_cents, signal_len, min_signal_len, fft_size)
+        return fft_size
+    for padding, max_bias_bins in sorted(HANN_QUADRATIC_MAX_BIAS_BINS.items()):
+        fft_size = next_power_of_2(signal_len * padding)
+        if max_bias_bins * sample_rate / fft_size <= precision_hz:
+            return fft_size
+    logger.debug("precision of %r cents unreachable with %r samples, fft size %r", precision_cents, signal_len,
+                 fft_size)
+    return fft_size
+
+
+def quadratic_peaks(spectrum_amp, peaks_idx):
+    """Returns the fractional index of the peaks, the vertex of the parabola through the log magnitude of each
+    peak bin and of its neighbours.
+    """
+    peaks_idx = np.asarray(peaks_idx, dtype=int)
+    inner = (peaks_idx > 0) & (peaks_idx < spectrum_amp.shape[-1] - 1)
+    idx = peaks_idx[inner]
+    # the floor keeps the log finite on silence
+    left, center, right = (np.log(np.maximum(spectrum_amp[idx + offset], np.finfo(float).tiny))
+                           for offset in (-1, 0, 1))
+    curvature = left - 2.0 * center + right
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = np.where(curvature < 0.0, 0.5 * (left - right) / curvature, 0.0)
+    fractional_idx = peaks_idx.astype(float)
+    fractional_idx[inner] += np.nan_to_num(np.clip(delta, -0.5, 0.5))
+    return fractional_idx
+
+
+class PeakInterpolator(object):
+    """Estimates the frequency of the peaks of a windowed spectrum well below the bin width.
+
+    The fft size is chosen by ``fft_size_for_precision`` for the length of each signal, instead of padding the
+    signal to the bin width, e.g. 16384 points instead of 176400 for 1 cent above D2 on 1/8 s at 44100 Hz.
+    The peaks are interpolated quadratically on the log magnitude; with ``use_phase_refinement`` the frequency
+    is then given by the phase advance of the peak bin between the spectra of the signal and of the signal
+    shifted by one sample, unless it falls further than a bin from the interpolated frequency.
+
+    ``spectrum_amp`` is divided by the mean of the window, so that a sinusoid has the same peak magnitude
+    as with a rectangular window and the thresholds of the analyzers keep their meaning.
+    """
+
+    def __init__(self, sample_rate, precision_cents, min_freq, window=DEFAULT_WINDOW,
+                 use_phase_refinement=DEFAULT_USE_PHASE_REFINEMENT):
+        self.sample_rate = sample_rate
+        self.precision_cents = precision_cents
+        self.min_freq = min_freq
+        self.window = window
+        self.use_phase_refinement = use_phase_refinement
+        self._coherent_gains = {}
+
+    def analyzed_signal(self, signal):
+        """Returns the portion of signal that is transformed, the last sample is kept for the phase refinement
+        """
+        if self.use_phase_refinement:
+            return signal[..., :-1]
+        return signal
+
+    def fft_size(self, signal_len):
+        return fft_size_for_precision(self.sample_rate, signal_len, self.precision_cents, self.min_freq,
+                                      self.use_phase_refinement)
+
+    def idx_to_freq(self, fft_size):
+        return float(self.sample_rate) * np.fft.rfftfreq(fft_size)
+
+    def spectrum(self, signal, spectrum_cache=None):
+        """Returns the windowed rfft of signal, on ``fft_size(len(signal))`` points
+        """
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        analyzed_signal = self.analyzed_signal(signal)
+        return spectrum_cache.spectrum(analyzed_signal, self.fft_size(analyzed_signal.shape[-1]), self.window,
+                                       real=True)
+
+    def spectrum_amp(self, signal, spectrum_cache=None):
+        """Returns the magnitude of the windowed rfft of signal, on ``fft_size(len(signal))`` points
+        """
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        analyzed_signal = self.analyzed_signal(signal)
+        signal_len = analyzed_signal.shape[-1]
+        spectrum_amp = spectrum_cache.spectrum_amp(analyzed_signal, self.fft_size(signal_len), self.window, real=True)
+        return spectrum_amp / self._coherent_gain(signal_len)
+
+    def peaks_freq(self, signal, spectrum_amp, peaks_idx, spectrum_cache=None):
+        """Returns the refined frequencies of the peaks of ``spectrum_amp``, the spectrum of the 1-D signal
+        """
+        fft_size = 2 * (spectrum_amp.shape[-1] - 1)
+        bin_hz = float(self.sample_rate) / fft_size
+        peaks_freq = quadratic_peaks(spectrum_amp, peaks_idx) * bin_hz
+        if self.use_phase_refinement and len(peaks_freq) > 0:
+            if spectrum_cache is None:
+                spectrum_cache = SpectrumCache()
+            peaks_idx = np.asarray(peaks_idx, dtype=int)
+            spectrum = spectrum_cache.spectrum(signal[:-1], fft_size, self.window, real=True)[peaks_idx]
+            shifted_spectrum = spectrum_cache.spectrum(signal[1:], fft_size, self.window, real=True)[peaks_idx]
+            phase_freq = np.angle(shifted_spectrum * np.conj(spectrum)) * self.sample_rate / (2.0 * np.pi)
+            peaks_freq = np.where(np.abs(phase_freq - peaks_freq) < bin_hz, phase_freq, peaks_freq)
+        return peaks_freq
+
+    def _coherent_gain(self, signal_len):
+        gain = self._coherent_gains.get(signal_len)
+        if gain is None:
+            gain = np.mean(get_window(self.window, signal_len))
+            self._coherent_gains[signal_len] = gain
+        return gain
@@ -15,6 +15,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import numpy as np
+
+from ..model.pitch import PitchArray
 
 logger = logging.getLogger(__name__)
 
@@ -22,28 +25,66 @@ DEFAULT_MAX_PITCH_DELTA_SEMITONES = 25.0/100.0
 
 
 class PitchTracker(object):
+    """Tracks the pitches from frame to frame, matching each new pitch to the nearest current pitch.
+
+    The current pitches are kept sorted by their offset from C0, so that all the new pitches are matched
+    with a single searchsorted. Pitch objects are created only for the started pitches.
+    """
+
+    OUTPUTS = ("started_pitches", "ongoing_pitches", "finished_pitches")
+
     def __init__(self, max_delta=DEFAULT_MAX_PITCH_DELTA_SEMITONES):
         self.max_delta = max_delta
         self.current_pitches = {}
+        self._sorted_pitches = []
+        self._sorted_offsets = np.empty(0)
 
     def process(self, pitches, current_sample, **other_signals):
+        if isinstance(pitches, PitchArray):
+            offsets = pitches.offset_from_c0
+        else:
+            offsets = np.array([p.offset_from_c0 for p in pitches], dtype=float)
+        match_idx, is_match = self._match(offsets)
+
         ongoing_pitches = {}
+        for i in match_idx[is_match]:
+            cp = self._sorted_pitches[i]
+            ongoing_pitches[cp] = self.current_pitches[cp]
         started_pitches = {}
-        for p in pitches:
-            found = False
-            for cp, cpv in self.current_pitches.items():
-                if abs(cp.offset_from_c0 - p.offset_from_c0) < self.max_delta:
-                    ongoing_pitches[cp] = cpv
-                    found = True
-                    break
-            if not found:
-                started_pitches[p] = current_sample
-        finished_pitches = {p: v for p,v in self.current_pitches.items() if p not in ongoing_pitches.keys()}
+        for i in np.nonzero(~is_match)[0]:
+            started_pitches[pitches[i]] = current_sample
+        is_ongoing = np.zeros(len(self._sorted_pitches), dtype=bool)
+        is_ongoing[match_idx[is_match]] = True
+        finished_pitches = {cp: self.current_pitches[cp]
+                            for cp, ongoing in zip(self._sorted_pitches, is_ongoing) if not ongoing}
+
         self.current_pitches = {}
         self.current_pitches.update(ongoing_pitches)
         self.current_pitches.update(started_pitches)
+        self._sort_current_pitches()
         return {
             "started_pitches": started_pitches,
             "ongoing_pitches": ongoing_pitches,
             "finished_pitches": finished_pitches,
         }
+
+    def _match(self, offsets):
+        """Returns, for each offset, the index of the nearest current pitch and if it is within max_delta
+        """
+        n_current = len(self._sorted_offsets)
+        if n_current == 0 or len(offsets) == 0:
+            return np.zeros(len(offsets), dtype=int), np.zeros(len(offsets), dtype=bool)
+        right = np.searchsorted(self._sorted_offsets, offsets)
+        left = np.clip(right - 1, 0, n_current - 1)
+        right = np.clip(right, 0, n_current - 1)
+        left_delta = np.abs(self._sorted_offsets[left] - offsets)
+        right_delta = np.abs(self._sorted_offsets[right] - offsets)
+        match_idx = np.where(right_delta < left_delta, right, left)
+        return match_idx, np.minimum(left_delta, right_delta) < self.max_delta
+
+    def _sort_current_pitches(self):
+        pitches = list(self.current_pitches)
+        offsets = np.array([p.offset_from_c0 for p in pitches], dtype=float)
+        order = np.argsort(offsets, kind="stable")
+        self._sorted_pitches = [pitches[i] for i in order]
+        self._sorted_offsets = offsets[order]
@@ -21,11 +21,21 @@ logger = logging.getLogger(__name__)
 
 
 class RmsProcessor(object):
+    OUTPUTS = ("rms",)
+
     def __init__(self):
         pass
 
     def process(self, source_signal, **other_signals):
-        rms = np.sqrt(np.mean(np.square(source_signal)))
+        # one value per channel for multi channel signals (channels x samples)
+        rms = np.sqrt(np.mean(np.square(source_signal), axis=-1))
         return {
             "rms": rms,
         }
+
+    def process_batch(self, source_signal, **other_signals):
+        """Processes many chunks at once, source_signal has one chunk per row
+        """
+        return {
+            "rms": np.sqrt(np.mean(np.square(source_signal), axis=-1)),
+        }
@@ -0,0 +1,92 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DftBasis(object):
+    """Complex exponentials exp(-2j*pi*k*resolution_hz*n/sample_rate), for the bin offsets k in [-half_bins, half_bins]
+    and the samples n of a chunk. They are shared by all the banks having the same grid.
+    """
+
+    def __init__(self, sample_rate, resolution_hz, half_bins):
+        self.sample_rate = sample_rate
+        self.resolution_hz = resolution_hz
+        self.offsets_hz = resolution_hz * np.arange(-half_bins, half_bins + 1)
+        self._matrices = {}
+
+    def get_matrix(self, chunk_len):
+        matrix = self._matrices.get(chunk_len)
+        if matrix is None:
+            n = np.arange(chunk_len)
+            matrix = np.exp(-2j * np.pi * np.outer(self.offsets_hz, n) / float(self.sample_rate))
+            self._matrices[chunk_len] = matrix
+        return matrix
+
+
+class SingleBinDftBank(object):
+    """Running single bin DFTs (Goertzel style) on a grid of frequencies centered on a pitch.
+
+    The bank is fed chunk by chunk, and it keeps the partial DFT of each chunk at every frequency of the grid,
+    i.e. ``len(basis.offsets_hz)`` complex values per chunk. Since the partials are phase aligned to the absolute
+    sample index, the DFT of any sequence of chunks is their sum, and the frequency of its peak is available
+    as soon as the pitch ends.
+    """
+
+    def __init__(self, center_freq, basis):
+        self.center_freq = center_freq
+        self.basis = basis
+        self.freqs = center_freq + basis.offsets_hz
+        self.chunks_start = []
+        self.chunks_dft = []
+        self._demodulation = {}
+
+    def update(self, chunk, chunk_start):
+        """Adds the contribution of the chunk, starting at the absolute sample index chunk_start
+        """
+        chunk_len = len(chunk)
+        if chunk_len == 0:
+            return
+        demodulation = self._demodulation.get(chunk_len)
+        if demodulation is None:
+            demodulation = np.exp(-2j * np.pi * self.center_freq * np.arange(chunk_len) / float(self.basis.sample_rate))
+            self._demodulation[chunk_len] = demodulation
+        partial = self.basis.get_matrix(chunk_len).dot(chunk * demodulation)
+        # the cycles at chunk_start are reduced modulo 1 before computing the phase, to keep it accurate
+        start_cycles = np.mod(self.freqs * (float(chunk_start) / float(self.basis.sample_rate)), 1.0)
+        self.chunks_start.append(chunk_start)
+        self.chunks_dft.append(partial * np.exp(-2j * np.pi * start_cycles))
+
+    def peak_frequency(self, start=None, end=None):
+        """Returns the grid frequency with the highest DFT magnitude, over the chunks starting in [start, end).
+
+        If no chunk starts in the interval all the chunks are used, None is returned if the bank is empty.
+        """
+        if len(self.chunks_dft) == 0:
+            return None
+        chunks_start = np.array(self.chunks_start)
+        selected = np.ones(len(chunks_start), dtype=bool)
+        if start is not None:
+            selected &= chunks_start >= start
+        if end is not None:
+            selected &= chunks_start < end
+        if not np.any(selected):
+            selected[:] = True
+        dft = np.sum(np.array(self.chunks_dft)[selected], axis=0)
+        return self.freqs[np.argmax(np.abs(dft))]
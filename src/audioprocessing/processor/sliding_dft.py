@@ -0,0 +1,107 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+
+from audioprocessing.processor.buffer import Buffer
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WINDOW_DURATION = 1.0
+DEFAULT_MIN_FREQ_HZ = 0.0
+DEFAULT_MAX_FREQ_HZ = None
+DEFAULT_REANCHOR_INTERVAL = 64
+MAX_CACHED_HOPS = 8
+# the update of bins x hop costs about as much as an rfft of the window of cost n/2 log2(n) when it is 3 times
+# larger, measured with numpy: above twice the hops are transformed with rfft instead
+MAX_RELATIVE_UPDATE_COST = 2.0
+
+
+class SlidingDft(object):
+    """Spectrum of the last window_duration seconds of signal, on the rfft bins between min_freq and max_freq.
+
+    The window moves forward by the chunk of each frame, so the spectrum is updated with the sliding DFT
+    recurrence, from the samples entering and leaving the window, in O(bins x chunk size) instead of
+    transforming the whole window. The bins are the same of ``np.fft.rfft`` of the window, oldest sample first.
+    Every ``reanchor_interval`` frames they are computed again from the window, bounding the numerical drift.
+
+    The update pays off only for short chunks, or few bins: the hops longer than ``max_sliding_hop`` are transformed
+    with rfft instead, without computing their bins x hop kernel. For a one second window at 44100 Hz and the 889
+    bins of the octaves 3 to 5 shown by the player, the sliding update is used above ~58 frames per second.
+    """
+
+    OUTPUTS = ("sliding_spectrum", "sliding_spectrum_amp", "sliding_spectrum_freq")
+
+    def __init__(self, sample_rate, window_duration=DEFAULT_WINDOW_DURATION,
+                 min_freq=DEFAULT_MIN_FREQ_HZ,
+                 max_freq=DEFAULT_MAX_FREQ_HZ,
+                 reanchor_interval=DEFAULT_REANCHOR_INTERVAL):
+        self.sample_rate = sample_rate
+        self.reanchor_interval = reanchor_interval
+        self.buffer = Buffer(sample_rate, window_duration)
+        self.window_len = self.buffer.buffer_len
+        freqs = float(sample_rate) * np.fft.rfftfreq(self.window_len)
+        if max_freq is None:
+            max_freq = freqs[-1]
+        self.min_idx, self.max_idx = np.searchsorted(freqs, [min_freq, max_freq], side="left")
+        self.max_idx = max(self.max_idx, self.min_idx + 1)
+        self.bins = np.arange(self.min_idx, self.max_idx)
+        self.freqs = freqs[self.min_idx:self.max_idx]
+        self.spectrum = np.zeros(len(self.bins), dtype=np.complex128)
+        self.frames_since_anchor = 0
+        rfft_cost = self.window_len / 2.0 * np.log2(max(self.window_len, 2))
+        self.max_sliding_hop = min(self.window_len - 1, int(MAX_RELATIVE_UPDATE_COST * rfft_cost / len(self.bins)))
+        self._hop_kernels = {}
+
+    def process(self, source_signal, **other_signals):
+        hop = len(source_signal)
+        if hop > 0:
+            if hop > self.max_sliding_hop or self.frames_since_anchor + 1 >= self.reanchor_interval:
+                self.buffer.process(source_signal)
+                self._reanchor()
+            else:
+                leaving = 0.0
+                if self.buffer.buffered_signal is not None:
+                    start = self.buffer.buffered_signal_start
+                    leaving = self.buffer.get_window(start, start + hop, copy=True)
+                self.buffer.process(source_signal)
+                rotation, kernel = self._hop_kernel(hop)
+                # a new array, the spectrum returned for the previous frame stays valid
+                update = kernel @ (np.asarray(source_signal, dtype=np.float64) - leaving)
+                self.spectrum = (self.spectrum + update) * rotation
+                self.frames_since_anchor += 1
+        return {
+            "sliding_spectrum": self.spectrum,
+            "sliding_spectrum_amp": np.abs(self.spectrum),
+            "sliding_spectrum_freq": self.freqs,
+        }
+
+    def _reanchor(self):
+        logger.debug("re-anchoring the sliding dft after %r frames", self.frames_since_anchor)
+        self.spectrum = np.fft.rfft(self.buffer.buffered_signal.astype(np.float64))[self.min_idx:self.max_idx]
+        self.frames_since_anchor = 0
+
+    def _hop_kernel(self, hop):
+        if hop not in self._hop_kernels:
+            if len(self._hop_kernels) >= MAX_CACHED_HOPS:
+                self._hop_kernels.clear()
+            # phases modulo the window length, exact on integers
+            rotation = np.exp(2j * np.pi * ((self.bins * hop) % self.window_len) / self.window_len)
+            kernel = np.exp(-2j * np.pi * (np.outer(self.bins, np.arange(hop)) % self.window_len) / self.window_len)
+            self._hop_kernels[hop] = (rotation, kernel)
+        return self._hop_kernels[hop]
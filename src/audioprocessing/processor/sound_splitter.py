@@ -21,16 +21,49 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_MIN_NOISE_POWER = 0.01
 DEFAULT_MIN_SOUND_DURATION = 0.5
+DEFAULT_MIN_ONSET_INTERVAL = 0.05
+
+# kinds of the events of the envelope
+SOUND_START = 0
+SOUND_END = 1
+ONSET = 2
 
 
 class SoundSplitter(object):
-    def __init__(self, min_noise_power=DEFAULT_MIN_NOISE_POWER, min_sound_duration=DEFAULT_MIN_SOUND_DURATION):
+    """Splits the buffered signal into the sounds louder than ``min_noise_power`` and longer than
+    ``min_sound_duration``.
+
+    Without an envelope the sounds start and end at the chunk boundaries, depending on the mean of ``rms``.
+    With the signals of an EnvelopeProcessor the start and the end of the sounds are where ``envelope_rms`` crosses
+    ``min_noise_power``, interpolated between the hops, and a sound is also split at the onsets found more than
+    ``min_onset_interval`` after its start. ``split_sounds`` then has all the sounds ended in the chunk,
+    ``split_sound`` is the last one, or empty.
+    The sounds are copied out of ``buffered_signal``, which the buffer overwrites at the next chunk.
+    """
+
+    OUTPUTS = ("split_sound", "split_sounds", "sounds_split_points")
+
+    def __init__(self, min_noise_power=DEFAULT_MIN_NOISE_POWER, min_sound_duration=DEFAULT_MIN_SOUND_DURATION,
+                 min_onset_interval=DEFAULT_MIN_ONSET_INTERVAL):
         self.min_noise_power = min_noise_power
         self.quiete = True
         self.sound_start = None
         self.min_sound_duration = min_sound_duration
+        self.min_onset_interval = min_onset_interval
+        self._previous_envelope_rms = 0.0
 
-    def process(self, rms, buffered_signal, buffered_signal_start, current_sample, sample_rate, **other_signals):
+    def process(self, rms, buffered_signal, buffered_signal_start, current_sample, sample_rate, envelope_rms=None,
+                envelope_start=None, envelope_hop_size=None, envelope_frame_size=None, onsets=None, **other_signals):
+        if envelope_rms is not None:
+            events = self._envelope_events(envelope_rms, envelope_start, envelope_hop_size, envelope_frame_size, onsets)
+            sounds_split_points = self._split_at_events(events, sample_rate)
+            split_sounds = [buffered_signal[max(0, start - buffered_signal_start):end - buffered_signal_start].copy()
+                            for start, end in sounds_split_points]
+            return {
+                "split_sound": split_sounds[-1] if split_sounds else [],
+                "split_sounds": split_sounds,
+                "sounds_split_points": sounds_split_points,
+            }
         split_sound = []
         sounds_split_points = []
         power = np.mean(rms)
@@ -44,9 +77,101 @@ class SoundSplitter(object):
                 duration = float(n_samples) / float(sample_rate)
                 if duration > self.min_sound_duration:
                     sounds_split_points.append((self.sound_start, current_sample))
-                    split_sound = buffered_signal[self.sound_start-buffered_signal_start:]
+                    split_sound = buffered_signal[self.sound_start-buffered_signal_start:].copy()
                 self.sound_start = None
         return {
             "split_sound": split_sound,
+            "split_sounds": [split_sound] if len(split_sound) > 0 else [],
             "sounds_split_points": sounds_split_points,
         }
+
+    def process_batch(self, rms, source_signal, buffered_signal, buffered_signal_start, current_sample, sample_rate,
+                      envelope_rms=None, envelope_start=None, envelope_hop_size=None, envelope_frame_size=None,
+                      onsets=None, **other_signals):
+        """Processes many chunks at once: rms and current_sample have one item per chunk, source_signal has one chunk
+        per row, and buffered_signal must include the last chunk. The envelope signals, if any, cover all the chunks.
+
+        The loud chunks are found with one vectorized comparison, only the transitions are visited one by one.
+        """
+        n_frames, frame_size = source_signal.shape[0], source_signal.shape[-1]
+        split_sound = [[] for _ in range(n_frames)]
+        split_sounds = [[] for _ in range(n_frames)]
+        sounds_split_points = [[] for _ in range(n_frames)]
+        if envelope_rms is not None:
+            events = self._envelope_events(envelope_rms, envelope_start, envelope_hop_size, envelope_frame_size, onsets)
+            detection_samples = np.array([event[0] for event in events], dtype=int)
+            # each sound is reported in the chunk where its end is detected, like in process
+            events_frame = np.searchsorted(np.asarray(current_sample) + frame_size, detection_samples, side="right")
+            for i in range(n_frames):
+                frame_events = [event for event, frame in zip(events, events_frame) if frame == i]
+                for start, end in self._split_at_events(frame_events, sample_rate):
+                    sounds_split_points[i].append((start, end))
+                    split_sounds[i].append(buffered_signal[max(0, start - buffered_signal_start):
+                                                           end - buffered_signal_start].copy())
+                if split_sounds[i]:
+                    split_sound[i] = split_sounds[i][-1]
+            return {
+                "split_sound": split_sound,
+                "split_sounds": split_sounds,
+                "sounds_split_points": sounds_split_points,
+            }
+        power = np.reshape(rms, (n_frames, -1)).mean(axis=-1)
+        loud = power > self.min_noise_power
+        previous_loud = np.concatenate([[self.sound_start is not None], loud[:-1]])
+        for i in np.nonzero(loud != previous_loud)[0]:
+            if loud[i]:
+                self.sound_start = int(current_sample[i])
+                continue
+            duration = float(current_sample[i] - self.sound_start) / float(sample_rate)
+            if duration > self.min_sound_duration:
+                sounds_split_points[i].append((self.sound_start, int(current_sample[i])))
+                split_sound[i] = buffered_signal[max(0, self.sound_start - buffered_signal_start):
+                                                 current_sample[i] + frame_size - buffered_signal_start].copy()
+                split_sounds[i].append(split_sound[i])
+            self.sound_start = None
+        return {
+            "split_sound": split_sound,
+            "split_sounds": split_sounds,
+            "sounds_split_points": sounds_split_points,
+        }
+
+    def _envelope_events(self, envelope_rms, envelope_start, hop_size, frame_size, onsets):
+        """Returns the (detection sample, sample, kind) of the crossings of min_noise_power and of the onsets.
+
+        The crossings are found with one vectorized comparison, and interpolated linearly between the centers
+        of the hops. They are detected with the last sample of the hop after them, the onsets with the last sample
+        of the frame after them.
+        """
+        events = []
+        if len(envelope_rms) > 0:
+            rms = np.concatenate([[self._previous_envelope_rms], envelope_rms])
+            loud = rms > self.min_noise_power
+            for i in np.flatnonzero(loud[1:] != loud[:-1]):
+                before, after = rms[i], rms[i + 1]
+                fraction = (self.min_noise_power - before) / (after - before)
+                # center of the hop i - 1 plus the fraction of a hop to the crossing
+                sample = max(0, int(round(envelope_start + (i - 0.5 + fraction) * hop_size)))
+                events.append((envelope_start + (i + 1) * hop_size - 1, sample,
+                               SOUND_START if loud[i + 1] else SOUND_END))
+            self._previous_envelope_rms = envelope_rms[-1]
+        if onsets is not None:
+            events.extend((int(onset) + frame_size - 1, int(onset), ONSET) for onset in onsets)
+        return events
+
+    def _split_at_events(self, events, sample_rate):
+        """Updates the current sound with the events, returning the (start, end) of the sounds long enough
+        """
+        sounds_split_points = []
+        min_onset_interval = int(self.min_onset_interval * sample_rate)
+        for _, sample, kind in sorted(events, key=lambda event: (event[1], event[2])):
+            if kind == SOUND_START:
+                self.sound_start = sample
+                continue
+            if self.sound_start is None:
+                continue
+            if kind == ONSET and sample - self.sound_start < min_onset_interval:
+                continue
+            if float(sample - self.sound_start) / float(sample_rate) > self.min_sound_duration:
+                sounds_split_points.append((self.sound_start, sample))
+            self.sound_start = sample if kind == ONSET else None
+        return sounds_split_points
@@ -18,7 +18,9 @@ import logging
 import numpy as np
 from scipy.signal import find_peaks
 
-from ..model.pitch import Pitch
+from ..model.pitch import Pitch, PitchArray
+from .peak_interpolation import PeakInterpolator
+from .spectrum_cache import SpectrumCache
 
 logger = logging.getLogger(__name__)
 
@@ -27,14 +29,29 @@ DEFAULT_FFT_MIN_RELATIVE_PEAK_HEIGHT = 1.0 / 3.0
 DEFAULT_FFT_MIN_ABSOLUTE_PEAK_HEIGHT = 0.001
 DEFAULT_MIN_FREQ_HZ = Pitch.parse("D2").frequency
 DEFAULT_MAX_FREQ_HZ = Pitch.parse("F6").frequency
+DEFAULT_PRECISION_CENTS = None
 
 
 class SpectrumAnalyzer(object):
+    """Finds the peaks of the spectrum and their pitches.
+
+    ``spectrum`` and ``spectrum_amp`` are the rfft of the signal, only the non negative frequencies.
+    A multi channel source_signal (channels x samples) is transformed with one batched rfft, and the peaks
+    are returned as one list per channel.
+
+    With ``precision_cents`` the bin width is not given by ``fft_resolution_hz``: a PeakInterpolator chooses
+    the fft size for each signal length and refines the peaks of its hann windowed rfft, ``spectrum_peaks_idx``
+    being the nearest bins.
+    """
+
+    OUTPUTS = ("spectrum", "spectrum_amp", "spectrum_peaks_idx", "spectrum_peaks_freq", "pitches")
+
     def __init__(self, sample_rate, fft_resolution_hz=DEFAULT_FFT_RESOLUTION_HZ,
                  min_freq=DEFAULT_MIN_FREQ_HZ,
                  max_freq=DEFAULT_MAX_FREQ_HZ,
                  min_relative_peak_height=DEFAULT_FFT_MIN_RELATIVE_PEAK_HEIGHT,
-                 min_absolute_peak_height=DEFAULT_FFT_MIN_ABSOLUTE_PEAK_HEIGHT):
+                 min_absolute_peak_height=DEFAULT_FFT_MIN_ABSOLUTE_PEAK_HEIGHT,
+                 precision_cents=DEFAULT_PRECISION_CENTS):
         self.sample_rate = sample_rate
         self.fft_resolution_hz = fft_resolution_hz
         self.min_freq = min_freq
@@ -42,23 +59,56 @@ class SpectrumAnalyzer(object):
         self.min_relative_peak_height = min_relative_peak_height
         self.min_absolute_peak_height = min_absolute_peak_height
         self.fft_size = int(sample_rate / fft_resolution_hz)
-        self.idx_to_freq = float(sample_rate) * np.fft.fftfreq(self.fft_size)
+        # only the non negative frequencies are computed, with rfft
+        self.idx_to_freq = float(sample_rate) * np.fft.rfftfreq(self.fft_size)
+        self.peak_interpolator = None
+        if precision_cents is not None:
+            self.peak_interpolator = PeakInterpolator(sample_rate, precision_cents, min_freq)
 
-    def process(self, source_signal, **other_signals):
-        spectrum = np.fft.fft(source_signal, self.fft_size)
-        spectrum_amp = np.abs(spectrum)
-        max_amp = spectrum_amp[np.argmax(spectrum_amp)]
-        min_peaks_height = max(max_amp * self.min_relative_peak_height,
-                               len(source_signal) * self.min_absolute_peak_height)
-        peaks_idx, _ = find_peaks(spectrum_amp, min_peaks_height)
-        peaks_idx = [p for p in peaks_idx
-                     if self.min_freq <= self.idx_to_freq[p] <= self.max_freq]
-        peaks_freq = [self.idx_to_freq[p] for p in peaks_idx]
-        pitches = [Pitch(p) for p in peaks_freq]
+    def process(self, source_signal, spectrum_cache=None, **other_signals):
+        if spectrum_cache is None:
+            spectrum_cache = SpectrumCache()
+        if self.peak_interpolator is not None:
+            spectrum_amp = self.peak_interpolator.spectrum_amp(source_signal, spectrum_cache)
+            spectrum = self.peak_interpolator.spectrum(source_signal, spectrum_cache)
+        else:
+            spectrum = spectrum_cache.spectrum(source_signal, self.fft_size, real=True)
+            spectrum_amp = spectrum_cache.spectrum_amp(source_signal, self.fft_size, real=True)
+        if spectrum_amp.ndim > 1:
+            peaks = [self._find_peaks(channel_spectrum_amp, channel_signal, spectrum_cache)
+                     for channel_spectrum_amp, channel_signal in zip(spectrum_amp, source_signal)]
+            return {
+                "spectrum": spectrum,
+                "spectrum_amp": spectrum_amp,
+                "spectrum_peaks_idx": [peaks_idx for peaks_idx, _ in peaks],
+                "spectrum_peaks_freq": [peaks_freq for _, peaks_freq in peaks],
+                "pitches": [PitchArray(peaks_freq) for _, peaks_freq in peaks]
+            }
+        peaks_idx, peaks_freq = self._find_peaks(spectrum_amp, source_signal, spectrum_cache)
         return {
             "spectrum": spectrum,
             "spectrum_amp": spectrum_amp,
             "spectrum_peaks_idx": peaks_idx,
             "spectrum_peaks_freq": peaks_freq,
-            "pitches": pitches
+            "pitches": PitchArray(peaks_freq)
         }
+
+    def process_batch(self, source_signal, **other_signals):
+        """Processes many chunks at once, source_signal has one chunk per row.
+
+        The spectra of all the chunks are computed with one batched fft, each output has one item per chunk,
+        equal to the output of ``process`` on that chunk.
+        """
+        return self.process(source_signal, SpectrumCache())
+
+    def _find_peaks(self, spectrum_amp, signal, spectrum_cache):
+        max_amp = spectrum_amp[np.argmax(spectrum_amp)]
+        min_peaks_height = max(max_amp * self.min_relative_peak_height,
+                               len(signal) * self.min_absolute_peak_height)
+        peaks_idx, _ = find_peaks(spectrum_amp, min_peaks_height)
+        if self.peak_interpolator is not None:
+            peaks_freq = self.peak_interpolator.peaks_freq(signal, spectrum_amp, peaks_idx, spectrum_cache)
+        else:
+            peaks_freq = self.idx_to_freq[peaks_idx]
+        in_range = (self.min_freq <= peaks_freq) & (peaks_freq <= self.max_freq)
+        return peaks_idx[in_range], peaks_freq[in_range]
@@ -0,0 +1,112 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+from scipy.signal import get_window
+
+logger = logging.getLogger(__name__)
+
+
+class SpectrumCache(object):
+    """Shares the spectra computed during one frame among the processors of an application.
+
+    Spectra are keyed by the identity of the signal (memory address, shape, strides and type of the array),
+    the window, the fft size and the real/complex mode. The application clears the cache at the beginning
+    of every frame, hence the same memory can be safely reused by the next frames.
+
+    The returned arrays are shared, processors must not modify them in place.
+
+    ``stats`` counts a miss for every transform computed, and a hit for every request of a spectrum or magnitude
+    already returned in the frame. The magnitude of a cached spectrum is computed without counting either.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._spectra = {}
+        self._spectra_amp = {}
+        self._returned_spectra = set()
+        self._windows = {}
+
+    def clear(self):
+        self._spectra = {}
+        self._spectra_amp = {}
+        self._returned_spectra = set()
+
+    def spectrum(self, signal, fft_size, window=None, real=False):
+        """Returns the fft (or rfft if real is True) of the signal, computed at most once per frame
+
+        :param signal: the signal, transformed on the last axis
+        :param fft_size: size of the transform, the signal is zero padded or truncated to this length
+        :param window: None for a rectangular window, otherwise a window name accepted by scipy get_window
+        :param real: True to compute only the non negative frequencies with rfft
+        """
+        key = self._key(signal, fft_size, window, real)
+        if key in self._returned_spectra:
+            self.hits += 1
+        self._returned_spectra.add(key)
+        return self._spectrum(key, signal, fft_size, window, real)
+
+    def spectrum_amp(self, signal, fft_size, window=None, real=False):
+        """Returns the magnitude of the spectrum, see ``spectrum`` for the parameters
+        """
+        key = self._key(signal, fft_size, window, real)
+        entry = self._spectra_amp.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+        spectrum_amp = np.abs(self._spectrum(key, signal, fft_size, window, real))
+        self._spectra_amp[key] = (signal, spectrum_amp)
+        return spectrum_amp
+
+    def _spectrum(self, key, signal, fft_size, window, real):
+        entry = self._spectra.get(key)
+        if entry is not None:
+            return entry[1]
+        self.misses += 1
+        windowed_signal = signal
+        if window is not None:
+            windowed_signal = signal * self._get_window(window, np.shape(signal)[-1])
+        if real:
+            spectrum = np.fft.rfft(windowed_signal, fft_size)
+        else:
+            spectrum = np.fft.fft(windowed_signal, fft_size)
+        # the signal is kept in the entry, so that its memory can't be reused within the frame
+        self._spectra[key] = (signal, spectrum)
+        return spectrum
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": float(self.hits) / float(requests) if requests > 0 else 0.0,
+        }
+
+    def _get_window(self, window, length):
+        key = (window, length)
+        if key not in self._windows:
+            self._windows[key] = get_window(window, length)
+        return self._windows[key]
+
+    @staticmethod
+    def _key(signal, fft_size, window, real):
+        if isinstance(signal, np.ndarray):
+            signal_key = (signal.__array_interface__["data"][0], signal.shape, signal.strides, signal.dtype.str)
+        else:
+            signal_key = id(signal)
+        return signal_key, fft_size, window, real
@@ -0,0 +1,143 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+
+from ..model.pitch import Pitch
+from .buffer import Buffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_FREQ_HZ = 70.0
+DEFAULT_MAX_FREQ_HZ = 1000.0
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_MAX_APERIODICITY = 0.5
+DEFAULT_MIN_RMS = 0.001
+
+
+class YinPitchDetector(object):
+    """Detects the fundamental frequency of the last few periods of the signal with the YIN algorithm.
+
+    The difference function of a window of one longest period is computed for all the lags at once, from the
+    energies of the shifted windows (cumulative sums) and their cross correlation (one rfft). The first minimum
+    of the cumulative mean normalized difference below ``threshold`` gives the period, refined by a parabola
+    through its neighbours. Only ``2 * sample_rate / min_freq`` samples are needed, e.g. 29 ms for 70 Hz.
+
+    ``yin_frequency`` is nan and ``yin_pitch`` None when the signal is too quiet or not periodic enough.
+    ``yin_aperiodicity`` is the normalized difference at the period, 0.0 for a perfectly periodic signal.
+    Multi channel signals (channels x samples) get one value per channel, in lists.
+    """
+
+    OUTPUTS = ("yin_frequency", "yin_pitch", "yin_aperiodicity")
+
+    def __init__(self, sample_rate, min_freq=DEFAULT_MIN_FREQ_HZ, max_freq=DEFAULT_MAX_FREQ_HZ,
+                 threshold=DEFAULT_THRESHOLD, max_aperiodicity=DEFAULT_MAX_APERIODICITY, min_rms=DEFAULT_MIN_RMS):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.max_aperiodicity = max_aperiodicity
+        self.min_rms = min_rms
+        self.min_lag = max(2, int(np.floor(sample_rate / max_freq)))
+        self.max_lag = int(np.ceil(sample_rate / min_freq)) + 1
+        self.window_len = self.max_lag
+        self.fft_size = 1 << int(np.ceil(np.log2(self.window_len + self.max_lag)))
+        self.buffer = Buffer(sample_rate, float(self.window_len + self.max_lag) / sample_rate)
+
+    def process(self, source_signal, **other_signals):
+        buffered = self.buffer.process(source_signal)
+        if not buffered:
+            return {}
+        frequency, aperiodicity = self.detect(buffered["buffered_signal"])
+        if np.ndim(frequency) == 0:
+            frequency, aperiodicity = float(frequency), float(aperiodicity)
+            pitch = self._pitch(frequency)
+        else:
+            pitch = [self._pitch(f) for f in frequency]
+            frequency, aperiodicity = list(frequency), list(aperiodicity)
+        return {
+            "yin_frequency": frequency,
+            "yin_pitch": pitch,
+            "yin_aperiodicity": aperiodicity,
+        }
+
+    def detect(self, signal):
+        """Returns the frequency and the aperiodicity of the last ``window_len + max_lag`` samples of signal,
+        arrays of one value per row for 2-D signals.
+        """
+        signal = np.asarray(signal, dtype=np.float64)[..., -(self.window_len + self.max_lag):]
+        cmnd = self.cumulative_mean_normalized_difference(signal)
+        rows = cmnd.reshape(-1, cmnd.shape[-1])
+        rms = np.sqrt(np.mean(np.square(signal), axis=-1)).reshape(-1)
+        frequency = np.full(len(rows), np.nan)
+        aperiodicity = np.ones(len(rows))
+        for i, row in enumerate(rows):
+            if rms[i] < self.min_rms:
+                continue
+            lag = self._period_lag(row)
+            aperiodicity[i] = row[lag]
+            if row[lag] <= self.max_aperiodicity:
+                frequency[i] = self.sample_rate / self._refine(row, lag)
+        return frequency.reshape(cmnd.shape[:-1]), aperiodicity.reshape(cmnd.shape[:-1])
+
+    def difference(self, signal):
+        """Returns the difference function d(lag) = sum_j (x[j] - x[j + lag])^2 for lags 0..max_lag,
+        over the first ``window_len`` samples.
+        """
+        w = self.window_len
+        cumulative_energy = np.concatenate([np.zeros(signal.shape[:-1] + (1,)), np.cumsum(np.square(signal), axis=-1)],
+                                           axis=-1)
+        lags = np.arange(self.max_lag + 1)
+        shifted_energy = cumulative_energy[..., lags + w] - cumulative_energy[..., lags]
+        spectrum = np.fft.rfft(signal, self.fft_size, axis=-1)
+        window_spectrum = np.fft.rfft(signal[..., :w], self.fft_size, axis=-1)
+        cross_correlation = np.fft.irfft(np.conj(window_spectrum) * spectrum, self.fft_size, axis=-1)
+        difference = shifted_energy[..., :1] + shifted_energy - 2.0 * cross_correlation[..., :self.max_lag + 1]
+        # rounding errors of the fft can make it slightly negative for the silent parts
+        return np.maximum(difference, 0.0)
+
+    def cumulative_mean_normalized_difference(self, signal):
+        difference = self.difference(signal)
+        cumulative = np.cumsum(difference[..., 1:], axis=-1)
+        lags = np.arange(1, difference.shape[-1])
+        cmnd = np.ones_like(difference)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cmnd[..., 1:] = np.where(cumulative > 0.0, difference[..., 1:] * lags / cumulative, 1.0)
+        return cmnd
+
+    def _period_lag(self, cmnd):
+        """Returns the first local minimum below threshold, or the global minimum if there is none
+        """
+        candidates = self.min_lag + np.flatnonzero(cmnd[self.min_lag:self.max_lag] < self.threshold)
+        if len(candidates) == 0:
+            return self.min_lag + int(np.argmin(cmnd[self.min_lag:self.max_lag]))
+        lag = int(candidates[0])
+        while lag + 1 < self.max_lag and cmnd[lag + 1] < cmnd[lag]:
+            lag += 1
+        return lag
+
+    @staticmethod
+    def _refine(cmnd, lag):
+        left, center, right = cmnd[lag - 1], cmnd[lag], cmnd[lag + 1]
+        curvature = left - 2.0 * center + right
+        if curvature <= 0.0:
+            return float(lag)
+        return lag + 0.5 * (left - right) / curvature
+
+    @staticmethod
+    def _pitch(frequency):
+        if np.isnan(frequency):
+            return None
+        return Pitch(frequency)
@@ -0,0 +1,123 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import numpy as np
+from scipy.signal import firwin, freqz
+
+logger = logging.getLogger(__name__)
+
+# the decimated sample rate is at least this multiple of the band width
+OVERSAMPLING = 4
+# taps of the low pass filter for each decimated sample
+FILTER_TAPS_PER_PHASE = 8
+FILTER_KAISER_BETA = 9.0
+# cost of a multiply-add of the low pass filter, in the unit of fft_cost
+FILTER_TAP_COST = 0.05
+
+
+def fft_cost(size):
+    """Rough cost of a complex fft of the given size, size * log2(size)
+    """
+    return size * np.log2(max(size, 2))
+
+
+class ZoomFFT(object):
+    """Computes only a band of bins of a (zero padded) fft, by mixing the band down to baseband, low pass
+    filtering and decimating the signal, then taking a small fft at the same resolution.
+
+    ``ZoomFFT(fft_size, min_idx, max_idx).transform(signal)`` approximates
+    ``np.fft.fft(signal, fft_size)[..., min_idx:max_idx]``. The signal is decimated by the largest divisor of
+    ``fft_size`` leaving a sample rate of at least ``OVERSAMPLING`` times the band width, so the fft has
+    ``fft_size / decimation`` points, and its cost depends on the band width instead of the signal length.
+    Mixing and filtering are a matrix product of about ``2 * FILTER_TAPS_PER_PHASE`` multiply-adds per sample.
+    ``cost`` estimates the whole, to be compared with ``fft_cost(fft_size)``.
+
+    The filter response is compensated on each bin, so the results differ from the full fft only by the
+    components outside the band aliased by the decimation, attenuated by the filter stop band (about 90 dB).
+
+    https://en.wikipedia.org/wiki/Zoom_FFT
+    """
+
+    def __init__(self, fft_size, min_idx, max_idx):
+        if not 0 <= min_idx < max_idx <= fft_size:
+            raise ValueError("invalid band [{}, {}) for fft size {}".format(min_idx, max_idx, fft_size))
+        self.fft_size = fft_size
+        self.min_idx = min_idx
+        self.max_idx = max_idx
+        self.n_bins = max_idx - min_idx
+        self.center_idx = (min_idx + max_idx) // 2
+
+        decimation = max(1, fft_size // (OVERSAMPLING * self.n_bins))
+        while fft_size % decimation != 0:
+            decimation -= 1
+        self.decimation = decimation
+        self.decimated_fft_size = fft_size // decimation
+        self.taps_per_phase = FILTER_TAPS_PER_PHASE if decimation > 1 else 1
+
+        window = np.ones(1)
+        if decimation > 1:
+            window = firwin(self.taps_per_phase * decimation, 1.0 / decimation, window=("kaiser", FILTER_KAISER_BETA))
+        # the filter shifted to the band, split in one column per decimated sample it spans
+        n = np.arange(len(window), dtype=np.int64)
+        kernel = window * np.exp(-2j * np.pi * ((self.center_idx * n) % fft_size) / fft_size)
+        kernel = np.reshape(kernel, (self.taps_per_phase, decimation)).T
+        self._kernel = np.concatenate([kernel.real, kernel.imag], axis=1)
+
+        offsets = np.arange(min_idx, max_idx) - self.center_idx
+        self._bins_idx = offsets % self.decimated_fft_size
+        # undoes the filter response and the time shift of the first decimated sample
+        omega = 2.0 * np.pi * offsets / fft_size
+        response = np.conj(freqz(window, worN=omega)[1])
+        shift = np.exp(2j * np.pi * offsets * (self.taps_per_phase - 1) / self.decimated_fft_size)
+        self._bins_scale = decimation * shift / response
+        logger.debug("zoom fft of bins %r - %r decimated by %r", min_idx, max_idx, decimation)
+
+    def transform(self, signal):
+        """Transforms the signal on the last axis, returning the bins [min_idx, max_idx) of its fft
+        """
+        # like np.fft.fft, longer signals are truncated to the fft size
+        signal = np.asarray(signal, dtype=np.float64)[..., :self.fft_size]
+        decimation = self.decimation
+        n_blocks = -(-signal.shape[-1] // decimation)
+        n_decimated = n_blocks + self.taps_per_phase - 1
+        padding = [(0, 0)] * (signal.ndim - 1) + [(
+            (self.taps_per_phase - 1) * decimation,
+            (n_blocks + self.taps_per_phase - 1) * decimation - signal.shape[-1])]
+        blocks = np.pad(signal, padding)
+        blocks = np.reshape(blocks, blocks.shape[:-1] + (-1, decimation))
+
+        # each decimated sample is the product of taps_per_phase consecutive blocks with the kernel columns
+        products = blocks @ self._kernel
+        products = products[..., :self.taps_per_phase] + 1j * products[..., self.taps_per_phase:]
+        decimated = sum(products[..., k:k + n_decimated, k] for k in range(self.taps_per_phase))
+        m = np.arange(n_decimated, dtype=np.int64) - (self.taps_per_phase - 1)
+        decimated *= np.exp(-2j * np.pi * ((self.center_idx * decimation * m) % self.fft_size) / self.fft_size)
+
+        # the fft of the decimated signal is periodic in time, a longer signal is folded on its size
+        n_folds = -(-n_decimated // self.decimated_fft_size)
+        if n_folds > 1:
+            padding[-1] = (0, n_folds * self.decimated_fft_size - n_decimated)
+            decimated = np.pad(decimated, padding)
+            decimated = np.sum(np.reshape(decimated, decimated.shape[:-1] + (n_folds, -1)), axis=-2)
+        spectrum = np.fft.fft(decimated, self.decimated_fft_size)
+        return spectrum[..., self._bins_idx] * self._bins_scale
+
+    def cost(self, signal_len):
+        """Estimated cost of transforming a signal of signal_len samples, in the unit of fft_cost
+        """
+        signal_len = min(signal_len, self.fft_size)
+        return 2 * FILTER_TAP_COST * self.taps_per_phase * signal_len + fft_cost(self.decimated_fft_size)
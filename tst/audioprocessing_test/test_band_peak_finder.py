@@ -0,0 +1,77 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.application.guitar_tuner import SIX_STRINGS_GUITAR_BANDS, SIX_STRINGS_GUITAR_STANDARD_TUNING
+from audioprocessing.io.synthesizer import SoundSynthesizer
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.band_peak_finder import BandPeakFinder
+from audioprocessing.processor.zoom_fft import fft_cost
+
+SAMPLE_RATE = 44100
+
+
+class BandPeakFinderTest(unittest.TestCase):
+
+    def test_zoom_fft_same_as_full_fft(self):
+        synt = SoundSynthesizer(SAMPLE_RATE, 120)
+        chord = sum([synt.generate_note(0.5, p.add_semitones(0.1 * i).frequency, 1.0 / 4.0)
+                     for i, p in enumerate(SIX_STRINGS_GUITAR_STANDARD_TUNING)])
+        zoom_peaks = BandPeakFinder(SAMPLE_RATE, bands=SIX_STRINGS_GUITAR_BANDS, use_zoom_fft=True).process(chord)
+        full_peaks = BandPeakFinder(SAMPLE_RATE, bands=SIX_STRINGS_GUITAR_BANDS, use_zoom_fft=False).process(chord)
+        self.assertEqual(full_peaks["bands_peak"], zoom_peaks["bands_peak"])
+        for i, p in enumerate(SIX_STRINGS_GUITAR_STANDARD_TUNING):
+            self.assertAlmostEqual(p.add_semitones(0.1 * i).frequency, zoom_peaks["bands_peak"][i], delta=0.2)
+
+    def test_zoom_fft_chosen_for_tuner_sounds(self):
+        band_peak_finder = BandPeakFinder(SAMPLE_RATE, bands=SIX_STRINGS_GUITAR_BANDS)
+        full_cost = fft_cost(band_peak_finder.fft_size)
+        for duration in (0.05, 0.5, 2.0, 20.0):
+            zoom_cost = sum(zoom_fft.cost(int(duration * SAMPLE_RATE)) for zoom_fft in band_peak_finder.bands_zoom_fft)
+            self.assertLess(zoom_cost, full_cost)
+        self.assertFalse(BandPeakFinder(SAMPLE_RATE, bands=[(50.0, 20000.0)])._zoom_fft_cheaper(SAMPLE_RATE))
+        signal = SoundSynthesizer(SAMPLE_RATE, 120).generate_note(0.5, Pitch.parse("A2").frequency, 1.0 / 4.0)
+        self.assertEqual(BandPeakFinder(SAMPLE_RATE, bands=SIX_STRINGS_GUITAR_BANDS, use_zoom_fft=False).process(signal),
+                         band_peak_finder.process(signal))
+
+    def test_precision_cents(self):
+        synt = SoundSynthesizer(SAMPLE_RATE, 120)
+        chord = sum([synt.generate_note(0.5, p.add_semitones(0.1 * i).frequency, 1.0 / 4.0)
+                     for i, p in enumerate(SIX_STRINGS_GUITAR_STANDARD_TUNING)])
+        band_peak_finder = BandPeakFinder(SAMPLE_RATE, bands=SIX_STRINGS_GUITAR_BANDS, precision_cents=1.0)
+        bands_peak = band_peak_finder.process(chord)["bands_peak"]
+        self.assertLess(band_peak_finder.peak_interpolator.fft_size(len(chord)), band_peak_finder.fft_size / 10)
+        for i, p in enumerate(SIX_STRINGS_GUITAR_STANDARD_TUNING):
+            self.assertAlmostEqual(p.add_semitones(0.1 * i).offset_from_c0, Pitch(bands_peak[i]).offset_from_c0,
+                                   delta=0.01)
+        self.assertEqual([None] * 6, band_peak_finder.process(np.zeros(1000))["bands_peak"])
+
+    def test_no_peak_on_silence(self):
+        bands_peak = BandPeakFinder(SAMPLE_RATE).process(np.zeros(1000))["bands_peak"]
+        self.assertEqual([None, None], bands_peak)
+
+    def test_multi_channel_same_as_single_channel(self):
+        synt = SoundSynthesizer(SAMPLE_RATE, 120)
+        strings = np.array([synt.generate_note(0.5, p.add_semitones(0.2).frequency, 1.0 / 4.0)
+                            for p in SIX_STRINGS_GUITAR_STANDARD_TUNING])
+        for use_zoom_fft in (True, False):
+            band_peak_finder = BandPeakFinder(SAMPLE_RATE, bands=SIX_STRINGS_GUITAR_BANDS, use_zoom_fft=use_zoom_fft)
+            bands_peak = band_peak_finder.process(strings)["bands_peak"]
+            self.assertEqual([band_peak_finder.process(string)["bands_peak"] for string in strings], bands_peak)
+            for i, p in enumerate(SIX_STRINGS_GUITAR_STANDARD_TUNING):
+                self.assertAlmostEqual(p.add_semitones(0.2).frequency, bands_peak[i][i], delta=0.2)
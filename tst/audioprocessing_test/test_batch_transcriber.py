@@ -0,0 +1,101 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from scipy.io import wavfile
+
+from audioprocessing.application.batch_transcriber import analyze_file, analyze_files, find_wav_files, main, \
+    tuner_collector
+from audioprocessing.io.synthesizer import SoundSynthesizer, ZERO_TIMBRE
+from audioprocessing.model.pitch import Pitch
+
+SAMPLE_RATE = 44100
+
+
+class BatchTranscriberTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        synthesizer = SoundSynthesizer(SAMPLE_RATE, 120, default_timbre=ZERO_TIMBRE)
+        os.makedirs(os.path.join(self.tmp_dir.name, "sub"))
+        self.wav_files = []
+        for name, note in (("a.wav", "A3"), (os.path.join("sub", "c.wav"), "C4")):
+            filename = os.path.join(self.tmp_dir.name, name)
+            signal = synthesizer.generate_note(0.5, Pitch.parse(note).frequency, 1.0)
+            wavfile.write(filename, SAMPLE_RATE, signal.astype(np.float32))
+            self.wav_files.append(filename)
+        self.broken_file = os.path.join(self.tmp_dir.name, "broken.wav")
+        with open(self.broken_file, "w") as f:
+            f.write("not a wav file")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_find_wav_files(self):
+        self.assertEqual(sorted(self.wav_files + [self.broken_file]), find_wav_files([self.tmp_dir.name]))
+        self.assertEqual([self.wav_files[0]], find_wav_files([os.path.join(self.tmp_dir.name, "a*.wav")]))
+
+    def test_analyze_file(self):
+        result = analyze_file(self.wav_files[0])
+        self.assertEqual(self.wav_files[0], result["file"])
+        self.assertEqual("notes", result["application"])
+        self.assertNotIn("error", result)
+        self.assertAlmostEqual(2.0, result["duration_s"], delta=0.2)
+        self.assertEqual(["A3"], [n["pitch"] for n in result["results"]])
+        self.assertAlmostEqual(Pitch.parse("A3").frequency, result["results"][0]["frequency"], delta=1.0)
+
+    def test_error_reported_per_file(self):
+        result = analyze_file(self.broken_file)
+        self.assertIn("error", result)
+        self.assertNotIn("results", result)
+        self.assertIn("error", analyze_file(self.wav_files[0], application="unknown"))
+
+    def test_worker_pool_writes_one_json_line_per_file(self):
+        output = io.StringIO()
+        stats = analyze_files(self.wav_files + [self.broken_file], output, workers=2)
+        results = {r["file"]: r for r in map(json.loads, output.getvalue().splitlines())}
+        self.assertEqual(set(self.wav_files + [self.broken_file]), set(results))
+        self.assertIn("error", results[self.broken_file])
+        for filename, note in zip(self.wav_files, ("A3", "C4")):
+            self.assertEqual([note], [n["pitch"] for n in results[filename]["results"]])
+        self.assertEqual(3, stats["files"])
+        self.assertEqual(1, stats["failures"])
+        self.assertAlmostEqual(sum(results[f]["duration_s"] for f in self.wav_files), stats["duration_s"])
+
+    def test_tuner_bands_peak_only_for_the_last_sound(self):
+        results = []
+        tuner_collector(results)([(0, 22050), (22050, 44100)], [110.0, None], SAMPLE_RATE)
+        self.assertEqual([(0.0, 0.5, None), (0.5, 1.0, [110.0, None])],
+                         [(r["start_s"], r["end_s"], r["bands_peak"]) for r in results])
+
+    def test_main(self):
+        output_filename = os.path.join(self.tmp_dir.name, "out.jsonl")
+        self.assertEqual(0, main(["--application", "tuner", "--workers", "2", "--output", output_filename] +
+                                 self.wav_files))
+        with open(output_filename) as f:
+            results = [json.loads(line) for line in f]
+        self.assertEqual(sorted(self.wav_files), sorted(r["file"] for r in results))
+        self.assertEqual(["tuner", "tuner"], [r["application"] for r in results])
+        self.assertEqual(1, main(["--workers", "1", "--output", output_filename, self.broken_file]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+import numpy as np
+
+from audioprocessing.io.block_ring import BlockRing
+
+# like SoundCard.read, the threads sleep while the ring is full or empty instead of spinning on it
+POLL_INTERVAL = 0.0001
+
+
+class BlockRingTest(unittest.TestCase):
+
+    def test_fifo_and_dropped_blocks(self):
+        ring = BlockRing(3, (2, 4))
+        self.assertIsNone(ring.get())
+        for i in range(5):
+            self.assertEqual(i < 3, ring.put(np.full((2, 4), i)))
+        self.assertEqual(3, ring.depth())
+        self.assertEqual(2, ring.dropped_blocks)
+        np.testing.assert_array_equal(np.zeros((2, 4)), ring.get())
+        self.assertTrue(ring.put(np.full((2, 4), 5)))
+        self.assertEqual([1, 2, 5], [ring.get()[0, 0] for _ in range(3)])
+        self.assertEqual(0, ring.depth())
+
+    def test_producer_thread(self):
+        ring = BlockRing(4, 16, dtype=np.int64)
+        n_blocks = 2000
+
+        def produce():
+            i = 0
+            while i < n_blocks:
+                if ring.put(np.full(16, i)):
+                    i += 1
+                else:
+                    time.sleep(POLL_INTERVAL)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        received = []
+        block = np.empty(16, dtype=np.int64)
+        while len(received) < n_blocks:
+            if ring.get_into(block):
+                self.assertTrue(np.all(block == block[0]))
+                received.append(block[0])
+            else:
+                time.sleep(POLL_INTERVAL)
+        producer.join()
+        self.assertEqual(list(range(n_blocks)), received)
@@ -0,0 +1,65 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.processor.buffer import Buffer
+
+
+def naive_buffer(chunks, buffer_len):
+    buffered_signal = np.zeros(buffer_len, dtype=np.float32)
+    for chunk in chunks:
+        buffered_signal = np.concatenate([buffered_signal, chunk])[-buffer_len:]
+    return buffered_signal
+
+
+class BufferTest(unittest.TestCase):
+
+    def test_same_output_as_concatenation(self):
+        buffer = Buffer(sample_rate=10, buffer_duration=2.0)
+        chunks = [np.arange(i * 7, i * 7 + 7, dtype=np.float32) for i in range(10)]
+        for i in range(len(chunks)):
+            signals = buffer.process(chunks[i])
+            np.testing.assert_array_equal(naive_buffer(chunks[:i + 1], 20), signals["buffered_signal"])
+            self.assertEqual(7 * (i + 1) - 20, signals["buffered_signal_start"])
+
+    def test_chunk_longer_than_buffer(self):
+        buffer = Buffer(sample_rate=10, buffer_duration=1.0)
+        buffer.process(np.ones(3, dtype=np.float32))
+        signals = buffer.process(np.arange(25, dtype=np.float32))
+        np.testing.assert_array_equal(np.arange(15, 25), signals["buffered_signal"])
+        self.assertEqual(18, signals["buffered_signal_start"])
+
+    def test_get_window(self):
+        buffer = Buffer(sample_rate=10, buffer_duration=1.0)
+        buffer.process(np.arange(15, dtype=np.float32))
+        window = buffer.get_window(8, 12, copy=True)
+        np.testing.assert_array_equal([8, 9, 10, 11], window)
+        buffer.process(np.zeros(10, dtype=np.float32))
+        np.testing.assert_array_equal([8, 9, 10, 11], window)
+        np.testing.assert_array_equal([0, 0], buffer.get_window(0, 17))
+
+    def test_multi_channel(self):
+        buffer = Buffer(sample_rate=10, buffer_duration=2.0)
+        chunks = [np.arange(i * 14, i * 14 + 14, dtype=np.float32).reshape(2, 7) for i in range(10)]
+        for i in range(len(chunks)):
+            signals = buffer.process(chunks[i])
+            self.assertEqual((2, 20), signals["buffered_signal"].shape)
+            for c in range(2):
+                np.testing.assert_array_equal(naive_buffer([chunk[c] for chunk in chunks[:i + 1]], 20),
+                                              signals["buffered_signal"][c])
+        self.assertEqual((2, 3), buffer.get_window(buffer.buffered_signal_start, buffer.buffered_signal_start + 3).shape)
@@ -0,0 +1,78 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.constant_q import ConstantQTransform, ConstantQAnalyzer
+from audioprocessing.processor.harmony_analyzer import HarmonyAnalyzer
+
+SAMPLE_RATE = 44100
+
+
+def sines(freqs, amp=0.5, duration=0.5):
+    t = np.arange(int(SAMPLE_RATE * duration)) / float(SAMPLE_RATE)
+    return sum(amp * np.sin(2.0 * np.pi * freq * t) for freq in freqs).astype(np.float32)
+
+
+class ConstantQTest(unittest.TestCase):
+
+    def test_sine_peaks_at_its_bin_with_half_amplitude(self):
+        transform = ConstantQTransform(SAMPLE_RATE, bins_per_semitone=2)
+        freq = Pitch.parse("A3").frequency
+        constant_q_amp = np.abs(transform.transform(sines([freq], amp=0.8)))
+        peak_idx = np.argmax(constant_q_amp)
+        self.assertAlmostEqual(transform.freqs[peak_idx], freq, delta=0.01 * freq)
+        self.assertAlmostEqual(constant_q_amp[peak_idx], 0.4, delta=0.02)
+
+    def test_rows_are_transformed_separately(self):
+        transform = ConstantQTransform(SAMPLE_RATE)
+        signal = np.stack([sines([220.0]), sines([440.0])])
+        constant_q = transform.transform(signal)
+        self.assertEqual(constant_q.shape, (2, transform.n_bins))
+        np.testing.assert_allclose(constant_q[1], transform.transform(signal[1]), rtol=1e-4, atol=1e-4)
+
+    def test_analyzer_pitches(self):
+        analyzer = ConstantQAnalyzer(SAMPLE_RATE)
+        signals = analyzer.process(sines([Pitch.parse("A3").frequency, Pitch.parse("E4").frequency]))
+        self.assertEqual(Pitch.parse_all("A3 E4"), list(signals["pitches"]))
+
+    def test_harmony_analyzer_same_semitones_as_fft(self):
+        signal = sines([Pitch.parse(name).frequency for name in ("C3", "E4", "G4")])
+        for use_constant_q in [False, True]:
+            analyzer = HarmonyAnalyzer(SAMPLE_RATE, use_constant_q=use_constant_q)
+            self.assertEqual([0, 4, 7], [pitch.semitone for pitch in analyzer.process(signal)["powerful_semitones"]])
+
+    def test_harmony_analyzer_power_of_short_chunks(self):
+        # a steady sinusoid of amplitude A has the power of its fft peak, A / 2 per sample, in the bins whose
+        # window fits in the chunk: A4 always, E2 only in chunks longer than its window of ~0.41 s
+        analyzer = HarmonyAnalyzer(SAMPLE_RATE, use_constant_q=True, compute_octave_power=True)
+        e2, a4 = Pitch.parse("E2"), Pitch.parse("A4")
+        for duration in (0.25, 1.0):
+            signal = sines([e2.frequency, a4.frequency], duration=duration)
+            octave_power = analyzer.process(signal)["octave_semitone_power"]
+            fft_peak_power = 0.25 * len(signal)
+            self.assertAlmostEqual(1.0, octave_power[a4.octave - 2, a4.semitone] / fft_peak_power, delta=0.02)
+            e2_power_ratio = octave_power[e2.octave - 2, e2.semitone] / fft_peak_power
+            if duration < 0.5:
+                self.assertAlmostEqual(0.7, e2_power_ratio, delta=0.05)
+            else:
+                self.assertAlmostEqual(1.0, e2_power_ratio, delta=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.application.guitar_tuner import NotesTranscriber as GuitarTuner
+from audioprocessing.io.synthesizer import GeneratedSoundReader, SoundSynthesizer
+from audioprocessing.processor.buffer import Buffer
+from audioprocessing.processor.envelope import EnvelopeProcessor
+from audioprocessing.processor.rms_processor import RmsProcessor
+from audioprocessing.processor.sound_splitter import SoundSplitter
+
+SAMPLE_RATE = 44100
+
+
+def tone(synthesizer, freq, duration):
+    value = duration / synthesizer.value_to_duration(1.0)
+    oscillator_bank = synthesizer.create_oscillator_bank([(0.0, 0.5, freq, value)])
+    return np.concatenate(list(oscillator_bank.blocks()))
+
+
+def silence(duration):
+    return np.zeros(int(duration * SAMPLE_RATE))
+
+
+def notes_and_silences():
+    """An A2 struck twice without silence in between, then an E2 after a silence
+    """
+    synthesizer = SoundSynthesizer(SAMPLE_RATE, 120)
+    return np.concatenate([tone(synthesizer, 110.0, 0.6), tone(synthesizer, 110.0, 0.6), silence(0.3),
+                           tone(synthesizer, 82.41, 0.7), silence(0.4)]).astype(np.float32)
+
+
+def process_in_chunks(signal, chunk_len, envelope_processor=None, buffer_duration=20.0):
+    buffer = Buffer(SAMPLE_RATE, buffer_duration)
+    rms_processor = RmsProcessor()
+    sound_splitter = SoundSplitter()
+    outputs = []
+    for start in range(0, len(signal), chunk_len):
+        chunk = signal[start:start + chunk_len]
+        signals = {"source_signal": chunk, "current_sample": start, "sample_rate": SAMPLE_RATE}
+        signals.update(buffer.process(chunk))
+        signals.update(rms_processor.process(chunk))
+        if envelope_processor is not None:
+            signals.update(envelope_processor.process(chunk, start))
+        signals.update(sound_splitter.process(**signals))
+        outputs.append(signals)
+    return outputs
+
+
+class EnvelopeProcessorTest(unittest.TestCase):
+
+    def test_envelope_rms_of_every_hop(self):
+        signal = np.random.RandomState(0).uniform(-1.0, 1.0, 10000)
+        envelope_processor = EnvelopeProcessor(SAMPLE_RATE)
+        hop_size = envelope_processor.hop_size
+        envelope_rms = np.concatenate([envelope_processor.process(signal[start:start + 3000], start)["envelope_rms"]
+                                       for start in range(0, len(signal), 3000)])
+        n_hops = len(signal) // hop_size
+        self.assertEqual(n_hops, len(envelope_rms))
+        expected = np.sqrt(np.mean(np.square(signal[:n_hops * hop_size].reshape(n_hops, hop_size)), axis=-1))
+        np.testing.assert_allclose(expected, envelope_rms)
+
+    def test_onsets_independent_of_chunk_size(self):
+        signal = notes_and_silences()
+        all_onsets = []
+        for chunk_len in (5512, 4410, 700):
+            envelope_processor = EnvelopeProcessor(SAMPLE_RATE)
+            onsets = [envelope_processor.process(signal[start:start + chunk_len], start)["onsets"]
+                      for start in range(0, len(signal), chunk_len)]
+            all_onsets.append(np.concatenate(onsets))
+        for onsets in all_onsets:
+            np.testing.assert_array_equal(all_onsets[0], onsets)
+        np.testing.assert_allclose([0.0, 0.6, 1.5], all_onsets[0] / float(SAMPLE_RATE), atol=0.025)
+
+    def test_split_points_within_chunks(self):
+        signal = notes_and_silences()
+        outputs = process_in_chunks(signal, 5512, EnvelopeProcessor(SAMPLE_RATE))
+        split_points = [points for signals in outputs for points in signals["sounds_split_points"]]
+        np.testing.assert_allclose([(0.0, 0.6), (0.6, 1.2), (1.5, 2.2)], np.array(split_points) / float(SAMPLE_RATE),
+                                   atol=0.01)
+        for signals in outputs:
+            for (start, end), split_sound in zip(signals["sounds_split_points"], signals["split_sounds"]):
+                self.assertEqual(end - start, len(split_sound))
+
+    def test_split_sounds_kept_after_the_buffer_moves_on(self):
+        signal = np.concatenate([notes_and_silences()] * 2)
+        outputs = process_in_chunks(signal, 5512, EnvelopeProcessor(SAMPLE_RATE), buffer_duration=1.0)
+        split_sounds = [(points, sound) for signals in outputs
+                        for points, sound in zip(signals["sounds_split_points"], signals["split_sounds"])]
+        self.assertEqual(6, len(split_sounds))
+        for (start, end), split_sound in split_sounds:
+            np.testing.assert_array_equal(signal[start:end], split_sound)
+
+    def test_split_points_without_envelope_on_chunk_boundaries(self):
+        signal = notes_and_silences()
+        outputs = process_in_chunks(signal, 5512)
+        split_points = [points for signals in outputs for points in signals["sounds_split_points"]]
+        self.assertEqual([(0, 5512 * 10), (5512 * 12, 5512 * 18)], split_points)
+
+    def test_batch_mode_same_as_streaming(self):
+        split_points = {"run": [], "run_batch": []}
+        for mode in split_points:
+            def collect_output(sounds_split_points, split_sound, bands_peak, **_other_signals):
+                split_points[mode].extend(sounds_split_points)
+            audio_source = GeneratedSoundReader(SAMPLE_RATE, 8.0, 120.0, lambda _synthesizer: notes_and_silences())
+            getattr(GuitarTuner(audio_source, update_output=collect_output), mode)()
+        self.assertEqual(3, len(split_points["run"]))
+        self.assertEqual(split_points["run"], split_points["run_batch"])
+
+    def test_batch_larger_than_buffer(self):
+        signal = np.concatenate([notes_and_silences(), silence(20.0), notes_and_silences()])
+        outputs = {"run": [], "run_batch": []}
+        for mode, kwargs in (("run", {}), ("run_batch", {"batch_size": 1000})):
+            def collect_output(sounds_split_points, split_sounds, bands_peak, **_other_signals):
+                outputs[mode].extend((points, len(sound)) for points, sound in zip(sounds_split_points, split_sounds))
+                if len(split_sounds) > 0:
+                    outputs[mode].append(bands_peak)
+            audio_source = GeneratedSoundReader(SAMPLE_RATE, 8.0, 120.0, lambda _synthesizer: signal)
+            getattr(GuitarTuner(audio_source, update_output=collect_output), mode)(**kwargs)
+        self.assertEqual(12, len(outputs["run"]))
+        self.assertEqual(outputs["run"], outputs["run_batch"])
+
+    def test_batch_mode_same_as_streaming_with_all_outputs(self):
+        # an update_output taking only **kwargs consumes every signal, the batched processors must not run again
+        outputs = {"run": [], "run_batch": []}
+        buffered_signal_start = {}
+        for mode in outputs:
+            def collect_output(**signals):
+                if len(signals["split_sound"]) > 0:
+                    outputs[mode].append((len(signals["split_sound"]), signals["bands_peak"]))
+            audio_source = GeneratedSoundReader(SAMPLE_RATE, 8.0, 120.0, lambda _synthesizer: notes_and_silences())
+            app = GuitarTuner(audio_source, update_output=collect_output)
+            getattr(app, mode)()
+            buffered_signal_start[mode] = app.buffer.buffered_signal_start
+        self.assertEqual(3, len(outputs["run"]))
+        self.assertEqual(outputs["run"], outputs["run_batch"])
+        self.assertEqual(buffered_signal_start["run"], buffered_signal_start["run_batch"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from audioprocessing.application.graph import ProcessingGraph, ProcessorNode, consumed_signals
+
+
+class Counter(object):
+    OUTPUTS = ("count",)
+
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, source_signal, **other_signals):
+        self.calls += 1
+        return {"count": len(source_signal)}
+
+
+class Doubler(object):
+    OUTPUTS = ("double",)
+
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, value, offset=0, **other_signals):
+        self.calls += 1
+        return {"double": 2 * value + offset}
+
+
+class ProcessingGraphTest(unittest.TestCase):
+
+    def test_only_needed_processors_are_evaluated(self):
+        counter, doubler = Counter(), Doubler()
+        nodes = [ProcessorNode(doubler, inputs={"value": "count"}), ProcessorNode(counter)]
+        signals = ProcessingGraph(nodes, ["double"]).evaluate({"source_signal": [1, 2, 3]})
+        self.assertEqual(6, signals["double"])
+        self.assertEqual((1, 1), (counter.calls, doubler.calls))
+
+        signals = ProcessingGraph(nodes, ["count"]).evaluate({"source_signal": [1, 2, 3]})
+        self.assertNotIn("double", signals)
+        self.assertEqual((2, 1), (counter.calls, doubler.calls))
+
+    def test_available_signals_are_not_computed(self):
+        counter, doubler = Counter(), Doubler()
+        graph = ProcessingGraph([ProcessorNode(counter), ProcessorNode(doubler, inputs={"value": "count"})])
+        signals = graph.evaluate({"count": 5, "offset": 1})
+        self.assertEqual(11, signals["double"])
+        self.assertEqual(0, counter.calls)
+
+    def test_skipped_processors_are_not_evaluated(self):
+        counter, doubler = Counter(), Doubler()
+        graph = ProcessingGraph([ProcessorNode(counter), ProcessorNode(doubler, inputs={"value": "count"})])
+        signals = graph.evaluate({"source_signal": [1, 2, 3], "double": 4}, skipped=(counter,))
+        self.assertNotIn("count", signals)
+        self.assertEqual((0, 0), (counter.calls, doubler.calls))
+
+    def test_missing_required_signal(self):
+        graph = ProcessingGraph([ProcessorNode(Counter())])
+        with self.assertRaises(ValueError):
+            graph.evaluate({})
+
+    def test_consumed_signals(self):
+        def update_output(notes, pitches=None, **other_signals):
+            pass
+        self.assertEqual(["notes", "pitches"], consumed_signals(update_output))
+        self.assertIsNone(consumed_signals(lambda **other_signals: None))
@@ -0,0 +1,66 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from tst_utils import path_for_test_output
+
+from audioprocessing.application.guitar_tuner import HexaphonicTuner, SIX_STRINGS_GUITAR_STANDARD_TUNING
+from audioprocessing.io.synthesizer import SoundSynthesizer
+from audioprocessing.io.wav_file import WavFileReader, WavFileWriter
+from audioprocessing.model.pitch import Pitch
+
+SAMPLE_RATE = 44100
+DETUNING = 0.2
+
+
+def write_hexaphonic_strings(filename, silent_string):
+    """Writes a wav file with one channel per string, each string detuned by DETUNING semitones
+    """
+    synthesizer = SoundSynthesizer(SAMPLE_RATE, 120)
+    strings = np.array([synthesizer.generate_note(0.5, p.add_semitones(DETUNING).frequency, 1.0)
+                        for p in SIX_STRINGS_GUITAR_STANDARD_TUNING], dtype=np.float32)
+    strings[silent_string] = 0.0
+    with WavFileWriter(filename, sample_rate=SAMPLE_RATE) as writer:
+        writer.write(strings.T)
+
+
+class HexaphonicTunerTest(unittest.TestCase):
+
+    def test_each_channel_tunes_its_string(self):
+        filename = path_for_test_output("hexaphonic_test.wav")
+        write_hexaphonic_strings(filename, silent_string=3)
+        outputs = []
+
+        def collect_output(strings_peak, rms, **_other_signals):
+            outputs.append((strings_peak, rms))
+        audio_source = WavFileReader(filename, processing_rate=4.0, all_channels=True)
+        HexaphonicTuner(audio_source, update_output=collect_output).run()
+
+        strings_peak, rms = outputs[len(outputs) // 2]
+        self.assertEqual(6, len(strings_peak))
+        self.assertEqual(6, len(rms))
+        for i, p in enumerate(SIX_STRINGS_GUITAR_STANDARD_TUNING):
+            if i == 3:
+                self.assertIsNone(strings_peak[i])
+            else:
+                self.assertAlmostEqual(DETUNING, Pitch(strings_peak[i]).offset_from_c0 - p.offset_from_c0,
+                                       delta=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
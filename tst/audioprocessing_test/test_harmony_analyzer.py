@@ -0,0 +1,76 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.io.synthesizer import SoundSynthesizer
+from audioprocessing.model.pitch import Pitch, FREQ_C0
+from audioprocessing.processor.harmony_analyzer import HarmonyAnalyzer
+
+SAMPLE_RATE = 44100
+
+
+def chord(notes):
+    synthesizer = SoundSynthesizer(SAMPLE_RATE, 120)
+    return sum(synthesizer.generate_note(0.2, Pitch.parse(n).frequency, 1.0 / 4.0) for n in notes).astype(np.float64)
+
+
+def semitone_masks(fft_size, min_octave, max_octave):
+    """The boolean masks of the bins of each (octave, semitone) on the full fft, as before the reduceat table
+    """
+    idx_to_freq = float(SAMPLE_RATE) * np.fft.fftfreq(fft_size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        semitones_from_c0 = np.log2(idx_to_freq / FREQ_C0) * 12.0
+    semitone_idx = (semitones_from_c0 + 0.5) % 12 - 0.5
+    octave = np.floor((semitones_from_c0 + 0.5) / 12.0)
+    in_octaves = (12 * min_octave <= semitones_from_c0) & (semitones_from_c0 <= 12 * max_octave)
+    return {(o, i): in_octaves & (octave == o) & (i - 0.1 <= semitone_idx) & (semitone_idx <= i + 0.1)
+            for o in range(min_octave, max_octave + 1) for i in range(12)}
+
+
+class HarmonyAnalyzerTest(unittest.TestCase):
+
+    def test_powerful_semitones(self):
+        signals = HarmonyAnalyzer(SAMPLE_RATE).process(chord(["C3", "E4", "G4"]))
+        self.assertEqual([0, 4, 7], [p.semitone for p in signals["powerful_semitones"]])
+
+    def test_reduceat_same_as_masks(self):
+        signal = chord(["E2", "C3", "E4", "G4", "A#5"])
+        harmony_analyzer = HarmonyAnalyzer(SAMPLE_RATE, compute_octave_power=True)
+        signals = harmony_analyzer.process(signal)
+        spectrum_amp = np.abs(np.fft.fft(signal, harmony_analyzer.fft_size))
+        masks = semitone_masks(harmony_analyzer.fft_size, harmony_analyzer.min_octave, harmony_analyzer.max_octave)
+
+        expected_semitone_power = [np.sum(spectrum_amp * sum(masks[o, i] for o in range(2, 7))) for i in range(12)]
+        np.testing.assert_allclose(expected_semitone_power, signals["semitone_power"], rtol=1e-9)
+        expected_octave_power = [[np.sum(spectrum_amp[masks[o, i]]) for i in range(12)] for o in range(2, 7)]
+        np.testing.assert_allclose(expected_octave_power, signals["octave_semitone_power"], rtol=1e-9, atol=1e-9)
+        self.assertGreater(np.count_nonzero(signals["octave_semitone_power"] > 50), 4)
+
+    def test_batch_same_as_single_chunks(self):
+        chunks = np.reshape(chord(["C3", "E4", "G4"]), (2, 11025))
+        harmony_analyzer = HarmonyAnalyzer(SAMPLE_RATE, compute_octave_power=True)
+        batch_signals = harmony_analyzer.process_batch(chunks)
+        for i, chunk in enumerate(chunks):
+            signals = harmony_analyzer.process(chunk)
+            np.testing.assert_allclose(signals["semitone_power"], batch_signals["semitone_power"][i])
+            np.testing.assert_allclose(signals["octave_semitone_power"], batch_signals["octave_semitone_power"][i])
+            self.assertEqual(signals["powerful_semitones"], batch_signals["powerful_semitones"][i])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+import unittest
+
+from tst_utils import path_for_audio_sample
+
+from audioprocessing.application.metrics import ApplicationMetrics, LatencyHistogram
+from audioprocessing.application.notes_transcriber import NotesTranscriber
+from audioprocessing.io.wav_file import WavFileReader
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        for latency in [0.001] * 90 + [0.1] * 10:
+            histogram.record(latency)
+        self.assertAlmostEqual(0.001, histogram.percentile(50), delta=0.0002)
+        self.assertAlmostEqual(0.1, histogram.percentile(99), delta=0.02)
+        self.assertEqual(0.1, histogram.to_dict()["max"])
+        self.assertEqual(100, histogram.to_dict()["count"])
+
+    def test_deadline_misses(self):
+        metrics = ApplicationMetrics()
+        metrics.record_frame(0.0, 0.1, end=0.05)
+        metrics.record_frame(1.0, 0.1, end=1.2)
+        snapshot = metrics.snapshot()
+        self.assertEqual(2, snapshot["frames"])
+        self.assertEqual(1, snapshot["deadline_misses"])
+        self.assertAlmostEqual(2.0, snapshot["budget_fraction"]["max"])
+
+    def test_application_stages(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            metrics = ApplicationMetrics(dump_filename=os.path.join(tmp_dir, "metrics.json"))
+            audio_source = WavFileReader(filename=path_for_audio_sample("cmaj_scale_32bit_pcm_float.wav"))
+            app = NotesTranscriber(audio_source, update_output=lambda notes, **_other_signals: None, metrics=metrics)
+            app.run()
+            with open(metrics.dump_filename) as f:
+                dumped = json.load(f)
+        self.assertEqual(app.iteration, dumped["frames"])
+        for stage in ["read", "process", "update_output", "frame", "SpectrumAnalyzer.process",
+                      "PitchTracker.process", "NoteTracker.process"]:
+            self.assertEqual(app.iteration, dumped["stages"][stage]["count"])
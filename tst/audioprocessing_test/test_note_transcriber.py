@@ -53,3 +53,23 @@ class NoteTranscriberTest(unittest.TestCase):
             output_pitches.extend(pitches)
             logging.info("pitches: %r", pitches)
         NotesTranscriber(audio_source, update_output=collect_output).run()
+
+    def test_batch_mode_same_as_streaming(self):
+        output_notes = {"run": [], "run_batch": []}
+        for mode in output_notes:
+            def collect_output(notes, **_other_signals):
+                output_notes[mode].extend(repr(n) for n in notes)
+            audio_source = WavFileReader(filename=path_for_audio_sample("cmaj_scale_32bit_pcm_float.wav"))
+            getattr(NotesTranscriber(audio_source, update_output=collect_output), mode)()
+        self.assertGreater(len(output_notes["run"]), 0)
+        self.assertEqual(output_notes["run"], output_notes["run_batch"])
+
+    def test_batch_mode_same_as_streaming_with_all_outputs(self):
+        output_notes = {"run": [], "run_batch": []}
+        for mode in output_notes:
+            def collect_output(**signals):
+                output_notes[mode].extend(repr(n) for n in signals["notes"])
+            audio_source = WavFileReader(filename=path_for_audio_sample("cmaj_scale_32bit_pcm_float.wav"))
+            getattr(NotesTranscriber(audio_source, update_output=collect_output), mode)()
+        self.assertGreater(len(output_notes["run"]), 0)
+        self.assertEqual(output_notes["run"], output_notes["run_batch"])
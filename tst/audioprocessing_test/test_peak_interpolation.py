@@ -0,0 +1,89 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.note_tracker import NoteTracker
+from audioprocessing.processor.peak_interpolation import PeakInterpolator, fft_size_for_precision, \
+    min_signal_len_for_precision
+from audioprocessing.processor.spectrum_analyzer import SpectrumAnalyzer
+
+SAMPLE_RATE = 44100
+MIN_FREQ = Pitch.parse("D2").frequency
+
+
+def sines(freqs, amps, n_samples):
+    t = np.arange(n_samples) / float(SAMPLE_RATE)
+    return sum(amp * np.sin(2.0 * np.pi * freq * t + 1.0) for freq, amp in zip(freqs, amps)).astype(np.float32)
+
+
+def cents(freq, expected_freq):
+    return 1200.0 * np.log2(np.asarray(freq) / expected_freq)
+
+
+class PeakInterpolatorTest(unittest.TestCase):
+
+    def test_fft_size_for_precision(self):
+        self.assertEqual(8192, fft_size_for_precision(SAMPLE_RATE, 5512, 1.0, MIN_FREQ, use_phase_refinement=True))
+        self.assertEqual(16384, fft_size_for_precision(SAMPLE_RATE, 5512, 1.0, MIN_FREQ))
+        self.assertEqual(32768, fft_size_for_precision(SAMPLE_RATE, 5512, 0.1, MIN_FREQ))
+
+    def test_fft_size_for_precision_with_phase_refinement(self):
+        # the phase refinement needs 5 periods of min_freq for 1 cent, 12 for 0.1 cents
+        self.assertEqual(3004, min_signal_len_for_precision(SAMPLE_RATE, 1.0, MIN_FREQ))
+        self.assertEqual(7209, min_signal_len_for_precision(SAMPLE_RATE, 0.1, MIN_FREQ))
+        self.assertIsNone(min_signal_len_for_precision(SAMPLE_RATE, 0.01, MIN_FREQ))
+        self.assertEqual(16384, fft_size_for_precision(SAMPLE_RATE, 5512, 0.1, MIN_FREQ, use_phase_refinement=True))
+        self.assertEqual(4096, fft_size_for_precision(SAMPLE_RATE, 2756, 2.0, MIN_FREQ, use_phase_refinement=True))
+        self.assertEqual(8192, fft_size_for_precision(SAMPLE_RATE, 2756, 1.0, MIN_FREQ, use_phase_refinement=True))
+
+    def test_single_sinusoid_within_precision(self):
+        for use_phase_refinement in (False, True):
+            peak_interpolator = PeakInterpolator(SAMPLE_RATE, 1.0, MIN_FREQ, use_phase_refinement=use_phase_refinement)
+            for freq in np.linspace(MIN_FREQ, 1000.0, 23):
+                signal = sines([freq], [0.8], 5512)
+                spectrum_amp = peak_interpolator.spectrum_amp(signal)
+                peak_freq = peak_interpolator.peaks_freq(signal, spectrum_amp, [np.argmax(spectrum_amp)])[0]
+                self.assertLess(abs(cents(peak_freq, freq)), 1.0)
+                # normalized by the window, like the peaks of the rectangular window, up to the scalloping loss
+                self.assertAlmostEqual(0.4, np.max(spectrum_amp) / len(signal), delta=0.07)
+
+    def test_spectrum_analyzer_precision_cents(self):
+        freqs = [110.3, 329.1]
+        signal = sines(freqs, [0.4, 0.3], 5512)
+        spectrum_analyzer = SpectrumAnalyzer(SAMPLE_RATE, precision_cents=1.0)
+        signals = spectrum_analyzer.process(signal)
+        self.assertLess(len(signals["spectrum"]), spectrum_analyzer.fft_size / 10)
+        self.assertEqual(2, len(signals["spectrum_peaks_freq"]))
+        np.testing.assert_array_less(np.abs(cents(signals["spectrum_peaks_freq"], freqs)), 1.0)
+        batch_signals = spectrum_analyzer.process_batch(np.stack([signal, signal]))
+        for peaks_freq in batch_signals["spectrum_peaks_freq"]:
+            np.testing.assert_allclose(signals["spectrum_peaks_freq"], peaks_freq)
+
+    def test_note_tracker_precision_cents(self):
+        freq = Pitch.parse("A2").add_semitones(0.3).frequency
+        signal = sines([freq], [0.5], 2 * SAMPLE_RATE)
+        note_tracker = NoteTracker(use_streaming_dft_optimization=False, precision_cents=1.0)
+        notes = note_tracker.process({Pitch.parse("A2"): 0}, len(signal), SAMPLE_RATE,
+                                     buffered_signal=signal, buffered_signal_start=0)["notes"]
+        self.assertEqual(1, len(notes))
+        self.assertLess(abs(cents(notes[0].pitch.frequency, freq)), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,8 +15,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import unittest
+import numpy as np
 
-from audioprocessing.model.pitch import Pitch, MIN_FREQUENCY, MAX_FREQUENCY
+from audioprocessing.model.pitch import Pitch, PitchArray, MIN_FREQUENCY, MAX_FREQUENCY
 
 
 class NoteTest(unittest.TestCase):
@@ -37,3 +38,43 @@ class NoteTest(unittest.TestCase):
 
     def test_parse(self):
         self.assertAlmostEqual(440.0, Pitch.parse("A").frequency, delta=0.0000001)
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ValueError):
+            Pitch.parse("H")
+
+    def test_nominal_pitches_are_shared(self):
+        self.assertIs(Pitch.parse("A"), Pitch.parse("A4"))
+        self.assertIs(Pitch.parse("C#3"), Pitch.from_octave_semitone(3, 1))
+        self.assertEqual([Pitch.parse("C5"), Pitch.parse("Bb")], Pitch.parse_all("C5 Bb"))
+
+    def test_equal_by_nominal_pitch(self):
+        self.assertEqual(Pitch(441.0), Pitch.parse("A4"))
+        self.assertEqual(hash(Pitch(441.0)), hash(Pitch.parse("A4")))
+        self.assertNotEqual(Pitch(470.0), Pitch.parse("A4"))
+
+
+class PitchArrayTest(unittest.TestCase):
+    def test_same_attributes_as_pitch(self):
+        frequencies = [10.0, 16.3, 27.5, 82.41, 440.0, 450.0, 1046.5, 19999.0]
+        pitch_array = PitchArray(frequencies)
+        for i, f in enumerate(frequencies):
+            pitch = Pitch(f)
+            self.assertAlmostEqual(pitch.offset_from_c0, pitch_array.offset_from_c0[i], delta=0.0000001)
+            self.assertEqual(pitch.octave, pitch_array.octave[i])
+            self.assertEqual(pitch.semitone, pitch_array.semitone[i])
+            self.assertEqual(pitch.note, pitch_array.note[i])
+            self.assertAlmostEqual(pitch.nominal_frequency, pitch_array.nominal_frequency[i], delta=0.0000001)
+            self.assertAlmostEqual(pitch.error_in_semitones, pitch_array.error_in_semitones[i], delta=0.0000001)
+            self.assertEqual(pitch, pitch_array[i])
+
+    def test_sequence(self):
+        pitch_array = PitchArray(np.array([440.0, 261.63, 329.63]))
+        self.assertEqual(3, len(pitch_array))
+        self.assertEqual([Pitch.parse("A4"), Pitch.parse("C4"), Pitch.parse("E4")], list(pitch_array))
+        self.assertEqual([Pitch.parse("A4")], pitch_array[0:1].to_pitches())
+        self.assertEqual(0, len(PitchArray([])))
+
+    def test_invalid_frequency(self):
+        with self.assertRaises(ValueError):
+            PitchArray([440.0, MAX_FREQUENCY + 1])
@@ -0,0 +1,42 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from audioprocessing.model.pitch import Pitch, PitchArray
+from audioprocessing.processor.pitch_tracker import PitchTracker
+
+
+class PitchTrackerTest(unittest.TestCase):
+
+    def test_started_ongoing_finished(self):
+        tracker = PitchTracker()
+        a4, c4, e4 = Pitch.parse("A4"), Pitch.parse("C4"), Pitch.parse("E4")
+        signals = tracker.process(PitchArray([a4.frequency, c4.frequency]), current_sample=0)
+        self.assertEqual({a4: 0, c4: 0}, signals["started_pitches"])
+        signals = tracker.process(PitchArray([441.0, e4.frequency]), current_sample=10)
+        self.assertEqual({e4: 10}, signals["started_pitches"])
+        self.assertEqual({a4: 0}, signals["ongoing_pitches"])
+        self.assertEqual({c4: 0}, signals["finished_pitches"])
+        signals = tracker.process([], current_sample=20)
+        self.assertEqual({a4: 0, e4: 10}, signals["finished_pitches"])
+        self.assertEqual({}, tracker.current_pitches)
+
+    def test_match_nearest_pitch(self):
+        tracker = PitchTracker(max_delta=0.5)
+        tracker.process([Pitch(440.0), Pitch(440.0 * 2.0 ** (0.6 / 12.0))], current_sample=0)
+        signals = tracker.process([Pitch(440.0 * 2.0 ** (0.4 / 12.0))], current_sample=10)
+        self.assertEqual([440.0 * 2.0 ** (0.6 / 12.0)], [p.frequency for p in signals["ongoing_pitches"]])
@@ -0,0 +1,69 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import functools
+import unittest
+import numpy as np
+
+from audioprocessing.io.synthesizer import GeneratedSoundReader, create_melody_generator
+from audioprocessing.player.player import DefaultPlayerApplication, PlayerWorker
+from audioprocessing.player.spectrum_decimator import SpectrumDecimator
+
+
+def semitones_to_x(semitones):
+    return ((semitones + 0.5) % 12) * 100.0 / 12.0
+
+
+class SpectrumDecimatorTest(unittest.TestCase):
+
+    def test_min_max_per_pixel(self):
+        semitones = np.linspace(30.0, 80.0, 5001)
+        spectrum = np.random.uniform(0.0, 1.0, len(semitones))
+        decimator = SpectrumDecimator(semitones, [3, 4], semitones_to_x)
+        for octave, (x, y_min, y_max) in zip([3, 4], decimator.decimate(spectrum)):
+            mask = (semitones >= octave * 12.0 - 0.5) & (semitones < octave * 12.0 + 11.5)
+            pixels = np.floor(semitones_to_x(semitones[mask])).astype(int)
+            np.testing.assert_array_equal(np.unique(pixels), x)
+            for i, pixel in enumerate(x):
+                self.assertEqual(np.min(spectrum[mask][pixels == pixel]), y_min[i])
+                self.assertEqual(np.max(spectrum[mask][pixels == pixel]), y_max[i])
+
+
+class PlayerWorkerTest(unittest.TestCase):
+
+    def test_latest_frame_without_playback(self):
+        audio_source = GeneratedSoundReader(8000, 20.0, 480, create_melody_generator("A4 C5"))
+        worker = PlayerWorker(audio_source, DefaultPlayerApplication, semitones_to_x, play=False)
+        worker.start()
+        worker._thread.join(timeout=10.0)
+        self.assertFalse(worker._thread.is_alive())
+        self.assertEqual(worker.processed_frames, worker.latest_frame["frame"])
+        self.assertEqual(5, worker.processed_frames)
+        self.assertEqual(3, len(worker.latest_frame["octaves"]))
+
+    def test_sliding_dft_same_as_rfft(self):
+        frames = {}
+        for use_sliding_dft in (False, True):
+            audio_source = GeneratedSoundReader(8000, 20.0, 480, create_melody_generator("A4 C5"))
+            application_cls = functools.partial(DefaultPlayerApplication, use_sliding_dft=use_sliding_dft)
+            worker = PlayerWorker(audio_source, application_cls, semitones_to_x, play=False)
+            worker.start()
+            worker._thread.join(timeout=10.0)
+            frames[use_sliding_dft] = worker.latest_frame["octaves"]
+        for (x, y_min, y_max), (sliding_x, sliding_y_min, sliding_y_max) in zip(frames[False], frames[True]):
+            np.testing.assert_array_equal(x, sliding_x)
+            np.testing.assert_allclose(y_min, sliding_y_min, atol=1e-6)
+            np.testing.assert_allclose(y_max, sliding_y_max, atol=1e-6)
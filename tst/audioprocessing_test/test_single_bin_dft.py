@@ -0,0 +1,51 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.note_tracker import NoteTracker
+from audioprocessing.processor.single_bin_dft import DftBasis, SingleBinDftBank
+
+SAMPLE_RATE = 44100
+CHUNK_SIZE = 5512
+
+
+class SingleBinDftBankTest(unittest.TestCase):
+
+    def test_peak_frequency_of_chunked_sine(self):
+        signal = np.sin(2.0 * np.pi * 440.33 * np.arange(20 * CHUNK_SIZE) / SAMPLE_RATE)
+        bank = SingleBinDftBank(440.0, DftBasis(SAMPLE_RATE, 0.05, 39))
+        for start in range(0, len(signal), CHUNK_SIZE):
+            bank.update(signal[start:start + CHUNK_SIZE], start)
+        self.assertAlmostEqual(440.33, bank.peak_frequency(), delta=0.025)
+        self.assertAlmostEqual(440.33, bank.peak_frequency(5 * CHUNK_SIZE, 15 * CHUNK_SIZE), delta=0.025)
+
+    def test_note_tracker_bank_created_for_ongoing_pitch(self):
+        # the pitch started before the note tracker got any source_signal, it has no bank yet
+        a4 = Pitch.parse("A4")
+        signal = np.sin(2.0 * np.pi * 440.33 * np.arange(20 * CHUNK_SIZE) / SAMPLE_RATE)
+        note_tracker = NoteTracker(bpm=120.0, use_long_fft_optimization=False)
+        for start in range(0, len(signal), CHUNK_SIZE):
+            note_tracker.process({}, start, SAMPLE_RATE, ongoing_pitches={a4: 0},
+                                 source_signal=signal[start:start + CHUNK_SIZE])
+        notes = note_tracker.process({a4: 0}, len(signal), SAMPLE_RATE)["notes"]
+        self.assertEqual(1, len(notes))
+        self.assertAlmostEqual(440.33, notes[0].pitch.frequency, delta=0.05)
+
+    def test_empty_bank(self):
+        self.assertIsNone(SingleBinDftBank(440.0, DftBasis(SAMPLE_RATE, 0.05, 39)).peak_frequency())
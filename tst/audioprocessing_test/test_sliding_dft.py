@@ -0,0 +1,68 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.processor.buffer import Buffer
+from audioprocessing.processor.sliding_dft import SlidingDft
+
+SAMPLE_RATE = 8000
+
+
+class SlidingDftTest(unittest.TestCase):
+
+    def test_same_as_rfft_of_buffer(self):
+        signal = np.random.RandomState(1).uniform(-1.0, 1.0, 40000).astype(np.float32)
+        sliding_dft = SlidingDft(SAMPLE_RATE, window_duration=0.5, min_freq=100.0, max_freq=200.0,
+                                 reanchor_interval=1000)
+        self.assertGreater(sliding_dft.max_sliding_hop, 700)
+        buffer = Buffer(SAMPLE_RATE, 0.5)
+        hops = [300, 300, 700, 1, 4000, 250] * 6
+        start = 0
+        previous_spectrum = None
+        for hop in hops:
+            chunk = signal[start:start + hop]
+            start += hop
+            sliding = sliding_dft.process(chunk)
+            expected = np.fft.rfft(buffer.process(chunk)["buffered_signal"].astype(np.float64))
+            np.testing.assert_allclose(expected[sliding_dft.min_idx:sliding_dft.max_idx],
+                                       sliding["sliding_spectrum"], atol=1e-8)
+            # the outputs of the previous frame are not overwritten
+            if previous_spectrum is not None:
+                np.testing.assert_array_equal(previous_spectrum[1], previous_spectrum[0])
+            previous_spectrum = (sliding["sliding_spectrum"], sliding["sliding_spectrum"].copy())
+        np.testing.assert_allclose(np.arange(100.0, 200.0, 2.0), sliding["sliding_spectrum_freq"])
+
+    def test_long_hops_transformed_with_rfft(self):
+        signal = np.random.RandomState(1).uniform(-1.0, 1.0, 20000)
+        sliding_dft = SlidingDft(SAMPLE_RATE, window_duration=0.5, min_freq=100.0, max_freq=1000.0)
+        buffer = Buffer(SAMPLE_RATE, 0.5)
+        hop = 800
+        self.assertLess(sliding_dft.max_sliding_hop, hop)
+        for start in range(0, len(signal), hop):
+            chunk = signal[start:start + hop]
+            sliding = sliding_dft.process(chunk)
+            self.assertEqual(0, sliding_dft.frames_since_anchor)
+            expected = np.fft.rfft(buffer.process(chunk)["buffered_signal"])
+            np.testing.assert_allclose(expected[sliding_dft.min_idx:sliding_dft.max_idx], sliding["sliding_spectrum"])
+
+    def test_reanchor(self):
+        sliding_dft = SlidingDft(SAMPLE_RATE, window_duration=0.1, max_freq=100.0, reanchor_interval=4)
+        for i in range(10):
+            sliding_dft.process(np.ones(100))
+            self.assertEqual((i + 1) % 4, sliding_dft.frames_since_anchor)
+        self.assertAlmostEqual(800.0, sliding_dft.spectrum[0].real)
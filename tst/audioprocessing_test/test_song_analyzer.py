@@ -0,0 +1,44 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.application.song_analyzer import SongAnalyzer
+from audioprocessing.io.synthesizer import GeneratedSoundReader, create_melody_generator
+
+SAMPLE_RATE = 44100
+
+
+class SongAnalyzerTest(unittest.TestCase):
+
+    def test_batch_mode_same_as_streaming(self):
+        outputs = {"run": [], "run_batch": []}
+        for mode in outputs:
+            def collect_output(**signals):
+                outputs[mode].append((signals["semitone_power"], [p.note for p in signals["powerful_semitones"]]))
+            melody_generator = create_melody_generator("C4 E4 G4 C5")
+            audio_source = GeneratedSoundReader(SAMPLE_RATE, 10.0, 120.0, melody_generator)
+            getattr(SongAnalyzer(audio_source, update_output=collect_output), mode)()
+        self.assertEqual(len(outputs["run"]), len(outputs["run_batch"]))
+        self.assertGreater(len([notes for _, notes in outputs["run"] if len(notes) > 0]), 0)
+        for (power, notes), (batch_power, batch_notes) in zip(outputs["run"], outputs["run_batch"]):
+            np.testing.assert_allclose(power, batch_power, rtol=1e-5, atol=1e-3)
+            self.assertEqual(notes, batch_notes)
+
+
+if __name__ == '__main__':
+    unittest.main()
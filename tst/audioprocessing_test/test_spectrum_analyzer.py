@@ -0,0 +1,63 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.application.guitar_tuner import SIX_STRINGS_GUITAR_STANDARD_TUNING
+from audioprocessing.io.synthesizer import SoundSynthesizer
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.spectrum_analyzer import SpectrumAnalyzer
+
+SAMPLE_RATE = 44100
+
+
+class SpectrumAnalyzerTest(unittest.TestCase):
+
+    def test_batch_same_as_single_chunks(self):
+        synthesizer = SoundSynthesizer(SAMPLE_RATE, 120)
+        signal = synthesizer.generate_note(0.5, Pitch.parse("C4").frequency, 1.0 / 4.0) + \
+            synthesizer.generate_note(0.3, Pitch.parse("G4").frequency, 1.0 / 4.0)
+        chunks = np.reshape(signal, (2, -1))
+        for precision_cents in (None, 1.0):
+            spectrum_analyzer = SpectrumAnalyzer(SAMPLE_RATE, precision_cents=precision_cents)
+            batch_signals = spectrum_analyzer.process_batch(chunks)
+            self.assertEqual(set(SpectrumAnalyzer.OUTPUTS), set(batch_signals))
+            for i, chunk in enumerate(chunks):
+                signals = spectrum_analyzer.process(chunk)
+                for name in ("spectrum", "spectrum_amp", "spectrum_peaks_idx", "spectrum_peaks_freq"):
+                    np.testing.assert_allclose(signals[name], batch_signals[name][i], rtol=1e-5, atol=1e-5)
+                self.assertEqual(list(signals["pitches"]), list(batch_signals["pitches"][i]))
+                self.assertIn(Pitch.parse("C4"), signals["pitches"])
+
+    def test_multi_channel_same_as_single_channel(self):
+        synthesizer = SoundSynthesizer(SAMPLE_RATE, 120)
+        strings = np.array([synthesizer.generate_note(0.5, p.frequency, 1.0 / 4.0)
+                            for p in SIX_STRINGS_GUITAR_STANDARD_TUNING])
+        for precision_cents in (None, 1.0):
+            spectrum_analyzer = SpectrumAnalyzer(SAMPLE_RATE, precision_cents=precision_cents)
+            signals = spectrum_analyzer.process(strings)
+            self.assertEqual(strings.shape[0], signals["spectrum_amp"].shape[0])
+            for i, (string, p) in enumerate(zip(strings, SIX_STRINGS_GUITAR_STANDARD_TUNING)):
+                channel_signals = spectrum_analyzer.process(string)
+                np.testing.assert_allclose(channel_signals["spectrum_amp"], signals["spectrum_amp"][i], atol=1e-6)
+                np.testing.assert_array_equal(channel_signals["spectrum_peaks_idx"], signals["spectrum_peaks_idx"][i])
+                self.assertEqual(list(channel_signals["pitches"]), list(signals["pitches"][i]))
+                self.assertEqual(p, signals["pitches"][i][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.processor.spectrum_cache import SpectrumCache
+
+
+class SpectrumCacheTest(unittest.TestCase):
+
+    def test_transform_computed_once_per_frame(self):
+        cache = SpectrumCache()
+        signal = np.sin(np.arange(100, dtype=np.float32))
+        spectrum = cache.spectrum(signal, 256)
+        np.testing.assert_allclose(np.fft.fft(signal, 256), spectrum)
+        self.assertIs(spectrum, cache.spectrum(signal, 256))
+        np.testing.assert_allclose(np.abs(spectrum), cache.spectrum_amp(signal, 256))
+        self.assertEqual({"hits": 1, "misses": 1, "hit_rate": 0.5}, cache.stats())
+        self.assertIs(cache.spectrum_amp(signal, 256), cache.spectrum_amp(signal, 256))
+        self.assertEqual({"hits": 3, "misses": 1, "hit_rate": 0.75}, cache.stats())
+
+    def test_magnitude_counted_once(self):
+        cache = SpectrumCache()
+        signal = np.ones(64)
+        cache.spectrum_amp(signal, 128)
+        self.assertEqual({"hits": 0, "misses": 1, "hit_rate": 0.0}, cache.stats())
+        cache.spectrum(signal, 128)
+        self.assertEqual({"hits": 0, "misses": 1, "hit_rate": 0.0}, cache.stats())
+        cache.spectrum(signal, 128)
+        self.assertEqual({"hits": 1, "misses": 1, "hit_rate": 0.5}, cache.stats())
+
+    def test_key_includes_size_window_and_mode(self):
+        cache = SpectrumCache()
+        signal = np.ones(64)
+        cache.spectrum(signal, 128)
+        cache.spectrum(signal, 256)
+        cache.spectrum(signal, 128, real=True)
+        cache.spectrum(signal, 128, window="hann")
+        cache.spectrum(signal[:32], 128)
+        self.assertEqual(5, cache.misses)
+        cache.clear()
+        cache.spectrum(signal, 128)
+        self.assertEqual(6, cache.misses)
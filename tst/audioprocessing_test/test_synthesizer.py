@@ -15,8 +15,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import unittest
+import numpy as np
 
-from audioprocessing.io.synthesizer import SoundSynthesizer
+from audioprocessing.io.synthesizer import SoundSynthesizer, OscillatorBank, GeneratedSoundReader, GUITAR_TIMBRE, \
+    ZERO_TIMBRE
 from audioprocessing.io.wav_file import WavFileWriter
 from tst_utils import path_for_test_output
 
@@ -47,3 +49,57 @@ class SoundSynthesizerTest(unittest.TestCase):
         melody = synt.parse_and_generate_melody(INNO_ALLA_GIOIA_MELODIA)
         WavFileWriter(path_for_test_output("simple_test.wav")).write(melody)
 
+    def test_oscillator_bank_same_as_generate_note(self):
+        synt = SoundSynthesizer(44100, 120)
+        note = synt.generate_note(0.5, 440.0, 1.0 / 4.0, timbre=ZERO_TIMBRE)
+        oscillator_bank = OscillatorBank(44100, block_size=1000)
+        oscillator_bank.add_voice(0.5, 440.0, 0.0, synt.value_to_duration(1.0 / 4.0), timbre=ZERO_TIMBRE)
+        rendered = np.concatenate(list(oscillator_bank.blocks()))
+        np.testing.assert_allclose(note, rendered, atol=0.0001)
+
+    def test_oscillator_bank_overlapping_voices(self):
+        sample_rate = 8000
+        oscillator_bank = OscillatorBank(sample_rate, block_size=256)
+        oscillator_bank.add_voice(0.3, 220.0, 0.1, 0.2, timbre=ZERO_TIMBRE, fade_in=0.0, fade_out=0.0)
+        oscillator_bank.add_voice(0.5, 100.0, 0.0, 0.5, timbre=GUITAR_TIMBRE, fade_in=0.0, fade_out=0.0)
+        rendered = np.concatenate(list(oscillator_bank.blocks()))
+        t = np.arange(len(rendered)) / float(sample_rate)
+        expected = sum(amp * np.sin(2.0 * np.pi * 100.0 * overtone * t)
+                       for overtone, amp in [(1.0, 1.0)] + GUITAR_TIMBRE) * 0.5 / 2.6 * (t < 0.5)
+        expected += 0.3 * np.sin(2.0 * np.pi * 220.0 * (t - 0.1)) * (t >= 0.1) * (t < 0.3)
+        np.testing.assert_allclose(expected, rendered, atol=0.0001)
+
+    def test_chords(self):
+        synt = SoundSynthesizer(44100, 120)
+        notes = synt.parse_melody("C4+E4+G4 D4")
+        self.assertEqual([0.0, 0.0, 0.0, 0.5], [start for start, _, _, _ in notes])
+        self.assertEqual(len(synt.parse_and_generate_melody("C4 D4")), len(synt.parse_and_generate_melody("C4+E4 D4")))
+
+    def test_reader_with_block_generator(self):
+        def blocks_generator(_synthesizer):
+            for i in range(10):
+                yield np.arange(i * 7, i * 7 + 7, dtype=np.float32)
+
+        with GeneratedSoundReader(100, 4.0, 120, blocks_generator) as reader:
+            self.assertEqual(25, reader.chunk_size)
+            chunks = []
+            while not reader.eos():
+                chunks.append(reader.read()["source_signal"])
+        self.assertEqual([25, 25, 20], [len(c) for c in chunks])
+        np.testing.assert_array_equal(np.arange(70), np.concatenate(chunks))
+
+        with GeneratedSoundReader(100, 4.0, 120, blocks_generator) as reader:
+            self.assertEqual((2, 25), reader.read_frames(2).shape)
+            self.assertEqual((1, 20), reader.read_frames(2).shape)
+            self.assertTrue(reader.eos())
+
+    def test_reader_is_lazy(self):
+        def endless_generator(_synthesizer):
+            while True:
+                yield np.zeros(1000, dtype=np.float32)
+
+        with GeneratedSoundReader(44100, 10.0, 120, endless_generator) as reader:
+            for _ in range(100):
+                self.assertEqual(4410, len(reader.read()["source_signal"]))
+            self.assertFalse(reader.eos())
+            self.assertLessEqual(reader._pending_len, 1000)
@@ -0,0 +1,72 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+from scipy.io import wavfile
+
+from tst_utils import path_for_audio_sample, path_for_test_output
+
+from audioprocessing.io.wav_file import WavFileReader, WavFileWriter
+
+
+class WavFileReaderTest(unittest.TestCase):
+
+    def test_integer_format_normalized(self):
+        with WavFileReader(path_for_audio_sample("cmaj_scale.wav")) as int_reader, \
+                WavFileReader(path_for_audio_sample("cmaj_scale_32bit_pcm_float.wav")) as float_reader:
+            while not float_reader.eos():
+                int_chunk = int_reader.read()["source_signal"]
+                float_chunk = float_reader.read()["source_signal"]
+                self.assertEqual(np.float32, int_chunk.dtype)
+                np.testing.assert_allclose(float_chunk, int_chunk, atol=0.00001)
+            self.assertTrue(int_reader.eos())
+
+    def test_read_frames(self):
+        with WavFileReader(path_for_audio_sample("sin440_1sec.wav"), processing_rate=4.0) as reader:
+            frames = reader.read_frames(3)
+            self.assertEqual((3, reader.chunk_size), frames.shape)
+            self.assertEqual((1, reader.chunk_size), reader.read_frames(3).shape)
+            self.assertTrue(reader.eos())
+
+
+class WavFileWriterTest(unittest.TestCase):
+
+    def test_blocks_written_to_file(self):
+        for dtype in (np.float32, np.int16, np.uint8):
+            signal = (np.arange(1001) % 100).astype(dtype)
+            filename = path_for_test_output("writer_test.wav")
+            with WavFileWriter(filename, sample_rate=8000) as writer:
+                for i in range(0, len(signal), 300):
+                    writer.write(signal[i:i + 300])
+            sample_rate, written = wavfile.read(filename)
+            self.assertEqual(8000, sample_rate)
+            self.assertEqual(np.dtype(dtype), written.dtype)
+            np.testing.assert_array_equal(signal, written)
+
+    def test_stereo(self):
+        signal = np.random.uniform(-1.0, 1.0, (500, 2)).astype(np.float32)
+        filename = path_for_test_output("writer_stereo_test.wav")
+        with WavFileWriter(filename) as writer:
+            writer.write(signal[:200])
+            writer.write(signal[200:])
+        np.testing.assert_array_equal(signal, wavfile.read(filename)[1])
+
+    def test_buffer_outside_context(self):
+        writer = WavFileWriter(path_for_test_output("unused.wav"))
+        for i in range(10):
+            writer.write(np.full(7, i, dtype=np.float32))
+        np.testing.assert_array_equal(np.repeat(np.arange(10), 7), writer.audio_signal)
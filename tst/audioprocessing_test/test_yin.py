@@ -0,0 +1,84 @@
+# Floyd Rose Tuner
+# Copyright (C) 2019  Daniele Rigato
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy as np
+
+from audioprocessing.application.guitar_tuner import LowLatencyTuner, LOW_LATENCY_PROCESSING_RATE
+from audioprocessing.io.synthesizer import GeneratedSoundReader, create_melody_generator
+from audioprocessing.model.pitch import Pitch
+from audioprocessing.processor.yin import YinPitchDetector
+
+SAMPLE_RATE = 44100
+CHUNK_LEN = 882
+HARMONIC_TIMBRE = [(2.0, 0.5), (3.0, 0.2)]
+
+
+def harmonic_sound(freq, duration=0.2):
+    t = np.arange(int(SAMPLE_RATE * duration)) / float(SAMPLE_RATE)
+    return (0.5 * np.sin(2.0 * np.pi * freq * t) + 0.3 * np.sin(4.0 * np.pi * freq * t + 1.0)
+            + 0.2 * np.sin(6.0 * np.pi * freq * t)).astype(np.float32)
+
+
+def process_in_chunks(detector, signal):
+    signals = {}
+    for start in range(0, signal.shape[-1], CHUNK_LEN):
+        signals = detector.process(signal[..., start:start + CHUNK_LEN])
+    return signals
+
+
+class YinPitchDetectorTest(unittest.TestCase):
+
+    def test_cent_accurate_fundamental(self):
+        for freq in [82.41, 110.0, 246.94, 440.0]:
+            signals = process_in_chunks(YinPitchDetector(SAMPLE_RATE), harmonic_sound(freq))
+            self.assertLess(abs(1200.0 * np.log2(signals["yin_frequency"] / freq)), 1.0)
+            self.assertEqual(Pitch(freq), signals["yin_pitch"])
+            self.assertLess(signals["yin_aperiodicity"], 0.01)
+
+    def test_few_periods_are_enough(self):
+        detector = YinPitchDetector(SAMPLE_RATE)
+        self.assertLess(detector.buffer.buffer_duration, 0.03)
+        signals = detector.process(harmonic_sound(110.0, detector.buffer.buffer_duration))
+        self.assertAlmostEqual(110.0, signals["yin_frequency"], delta=0.1)
+
+    def test_silence_and_noise_have_no_pitch(self):
+        noise = np.random.RandomState(0).normal(0.0, 0.1, SAMPLE_RATE // 5).astype(np.float32)
+        for signal in [np.zeros(SAMPLE_RATE // 5, dtype=np.float32), noise]:
+            signals = process_in_chunks(YinPitchDetector(SAMPLE_RATE), signal)
+            self.assertTrue(np.isnan(signals["yin_frequency"]))
+            self.assertIsNone(signals["yin_pitch"])
+
+    def test_multi_channel(self):
+        signal = np.stack([harmonic_sound(110.0), np.zeros(SAMPLE_RATE // 5, dtype=np.float32), harmonic_sound(196.0)])
+        signals = process_in_chunks(YinPitchDetector(SAMPLE_RATE), signal)
+        self.assertEqual([Pitch.parse("A2"), None, Pitch.parse("G3")], signals["yin_pitch"])
+
+    def test_low_latency_tuner(self):
+        melody_generator = create_melody_generator("A2", timbre=HARMONIC_TIMBRE)
+        audio_source = GeneratedSoundReader(SAMPLE_RATE, LOW_LATENCY_PROCESSING_RATE, 120.0, melody_generator)
+        frequencies = []
+
+        def collect_output(yin_frequency, **_other_signals):
+            frequencies.append(yin_frequency)
+        LowLatencyTuner(audio_source, update_output=collect_output).run()
+        detected = np.flatnonzero(~np.isnan(frequencies))
+        self.assertLessEqual(detected[0], 2)
+        self.assertLess(np.max(np.abs(np.log2(np.array(frequencies)[detected] / 110.0))) * 1200.0, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,7 +21,9 @@ PROJECT_PATH = Path(__file__).parent.parent
 
 
 def path_for_test_output(file_name):
-    return os.path.join(PROJECT_PATH, "var/output", file_name)
+    output_dir = os.path.join(PROJECT_PATH, "var/output")
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, file_name)
 
 
 def path_for_audio_sample(file_name):